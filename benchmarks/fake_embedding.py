@@ -0,0 +1,32 @@
+import hashlib
+import time
+
+import numpy as np
+
+
+class FakeEmbeddingFunction:
+    """Deterministic stand-in for OpenAIEmbeddingFunction.
+
+    Each text maps to a unit vector seeded from its sha256, so repeated runs
+    produce identical indexes. `latency` adds a fixed delay per request to
+    approximate the remote API.
+    """
+
+    def __init__(self, dimensions=512, latency=0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.calls = 0
+
+    def _embed(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+        vector = np.random.default_rng(seed).standard_normal(self.dimensions).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def encode_documents(self, documents):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(document) for document in documents]
+
+    def encode_queries(self, queries):
+        return self.encode_documents(queries)
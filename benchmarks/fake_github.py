@@ -0,0 +1,164 @@
+import base64
+import hashlib
+import io
+import json
+import random
+import tarfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+_WORDS = ['user', 'repo', 'index', 'vector', 'chunk', 'token', 'batch', 'query', 'score', 'node', 'cache', 'file',
+          'path', 'tree', 'blob', 'embed', 'search', 'result', 'config', 'client', 'parse', 'load', 'store', 'item']
+
+
+def synthetic_repo(num_files, functions_per_file=8, files_per_dir=25, seed=0):
+    """Return {path: bytes} for a deterministic repository of Python modules.
+
+    Files are spread over `pkgN/` folders of `files_per_dir` files each and
+    contain a module docstring, imports, a class and `functions_per_file`
+    functions, so chunkers see realistic boundaries.
+    """
+    rng = random.Random(seed)
+
+    def name():
+        return '_'.join(rng.sample(_WORDS, 2))
+
+    files = {}
+    for file_index in range(num_files):
+        lines = [f'"""Synthetic module {file_index}."""', 'import os', 'import json', '', '']
+        lines += [f'class {name().title().replace("_", "")}:', f'    """Holds {name()} state."""', '',
+                  '    def __init__(self, value):', '        self.value = value', '', '']
+        for _ in range(functions_per_file):
+            function = name()
+            lines.append(f'def {function}_{file_index}({name()}, {name()}=None):')
+            lines.append(f'    """Compute the {name()} for a {name()}."""')
+            for statement in range(rng.randint(3, 12)):
+                lines.append(f'    {name()} = {name()}_{statement} + {rng.randint(0, 1000)}')
+            lines += [f'    return {name()}', '', '']
+        files[f"pkg{file_index // files_per_dir}/module_{file_index}.py"] = '\n'.join(lines).encode('utf-8')
+    return files
+
+
+def _blob_sha(data):
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+class FakeGitHubServer:
+    """Local stand-in for the GitHub contents, git trees and tarball endpoints.
+
+    Serves `files` ({path: bytes}) for one repository on 127.0.0.1. `latency`
+    adds a fixed delay per request to approximate a remote API.
+    """
+
+    def __init__(self, files, owner='bench', name='repo', latency=0.0):
+        self.files = files
+        self.owner = owner
+        self.name = name
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.shas = {path: _blob_sha(data) for path, data in files.items()}
+        self.commit = hashlib.sha1(''.join(sorted(self.shas.values())).encode('utf-8')).hexdigest()
+        self.directories = {}
+        for path in files:
+            parts = path.split('/')
+            for depth in range(len(parts)):
+                parent = '/'.join(parts[:depth])
+                self.directories.setdefault(parent, set()).add('/'.join(parts[:depth + 1]))
+        self._tarball = None
+        self.server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server.lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                status, content_type, body = server.route(urlparse(self.path).path)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def route(self, path):
+        """Return (status, content type, body) for a request path."""
+        prefix = f"/repos/{self.owner}/{self.name}/"
+        if not path.startswith(prefix):
+            return self._json(404, {'message': 'Not Found'})
+        endpoint = unquote(path[len(prefix):])
+        if endpoint.startswith('git/trees/'):
+            return self._json(200, self.tree())
+        if endpoint.startswith('tarball'):
+            return 200, 'application/x-gzip', self.tarball()
+        if endpoint == 'contents' or endpoint.startswith('contents/'):
+            return self.contents(endpoint[len('contents'):].strip('/'))
+        return self._json(404, {'message': 'Not Found'})
+
+    def _json(self, status, payload):
+        return status, 'application/json', json.dumps(payload).encode('utf-8')
+
+    def _item(self, path):
+        name = path.rsplit('/', 1)[-1]
+        html_url = f"https://github.com/{self.owner}/{self.name}/blob/HEAD/{path}"
+        if path in self.files:
+            return {'name': name, 'path': path, 'sha': self.shas[path], 'size': len(self.files[path]),
+                    'type': 'file', 'html_url': html_url}
+        return {'name': name, 'path': path, 'sha': hashlib.sha1(path.encode('utf-8')).hexdigest(), 'size': 0,
+                'type': 'dir', 'html_url': html_url}
+
+    def contents(self, path):
+        if path in self.files:
+            item = self._item(path)
+            item.update(encoding='base64', content=base64.b64encode(self.files[path]).decode('ascii'))
+            return self._json(200, item)
+        if path in self.directories:
+            return self._json(200, [self._item(child) for child in sorted(self.directories[path])])
+        return self._json(404, {'message': 'Not Found'})
+
+    def tree(self):
+        entries = []
+        for parent in sorted(self.directories):
+            for child in sorted(self.directories[parent]):
+                item = self._item(child)
+                entries.append({'path': child, 'type': 'blob' if item['type'] == 'file' else 'tree',
+                                'sha': item['sha'], 'size': item['size']})
+        return {'sha': self.commit, 'truncated': False, 'tree': entries}
+
+    def tarball(self):
+        if self._tarball is None:
+            buffer = io.BytesIO()
+            with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+                for path, data in sorted(self.files.items()):
+                    info = tarfile.TarInfo(f"{self.owner}-{self.name}-{self.commit[:7]}/{path}")
+                    info.size = len(data)
+                    archive.addfile(info, io.BytesIO(data))
+            self._tarball = buffer.getvalue()
+        return self._tarball
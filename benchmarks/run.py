@@ -0,0 +1,195 @@
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+import fire
+import numpy as np
+import yaml
+
+from benchmarks.fake_embedding import FakeEmbeddingFunction
+from benchmarks.fake_github import FakeGitHubServer, synthetic_repo
+from data.github_loader import GitHubRepoLoader
+from pipeline.streaming import StreamingIngestPipeline
+from utils.metrics import get_metrics
+from vectordb.faiss_vdb import FaissDBHandle
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = 'bench_chunks'
+
+# Metric -> True when larger is better.
+COMPARED_METRICS = {
+    'files_per_second': True,
+    'chunks_per_second': True,
+    'peak_rss_mb': False,
+    'query_p50_ms': False,
+    'query_p99_ms': False,
+    'batch_queries_per_second': True,
+}
+
+
+class BenchmarkDBHandle(FaissDBHandle):
+    """FaissDBHandle plus the embedding entry point the pipelines call, backed by a fake embedder."""
+
+    def __init__(self, data_dir, embedding_function):
+        super().__init__(data_dir, embedding_function.dimensions)
+        self.openai_ef = embedding_function
+
+    def create_embeddings(self, documents):
+        return self.openai_ef.encode_documents(documents)
+
+
+def _write_config(directory, api_url, owner, name, batch_size, chunk_size):
+    config = {
+        'repository': {'owner': owner, 'name': name, 'ref': 'HEAD', 'api_url': api_url},
+        'loader': {'max_workers': 8, 'max_retries': 0},
+        'rate_limits': {'github': {'rate': 1e9, 'capacity': 1e9}, 'openai': {'rate': 1e9, 'capacity': 1e9}},
+        'extraction': {'skip_extractors': True},
+        'chunking': {'chunk_size': chunk_size, 'chunk_overlap': 0},
+        'streaming': {'collection': COLLECTION, 'batch_size': batch_size, 'queue_size': 4},
+        'options': {},
+    }
+    config_file = os.path.join(directory, 'config.yaml')
+    with open(config_file, 'w') as file:
+        yaml.safe_dump(config, file)
+    return config_file
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_size(size, queries=200, top_k=10, bulk=False, index_type='FLAT', dimensions=256, batch_size=16,
+             chunk_size=512, latency=0.0, embed_latency=0.0, seed=0):
+    """Ingest a synthetic repository of `size` files end to end, then time queries against it."""
+    # Per-call INFO logging would dominate sub-millisecond search timings.
+    for name in ('data', 'models', 'pipeline', 'vectordb'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    get_metrics().reset()
+    embedding_function = FakeEmbeddingFunction(dimensions, embed_latency)
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            FakeGitHubServer(synthetic_repo(size, seed=seed), latency=latency) as server:
+        config_file = _write_config(tmp_dir, server.url, server.owner, server.name, batch_size, chunk_size)
+        db_handle = BenchmarkDBHandle(os.path.join(tmp_dir, 'vectors'), embedding_function)
+        db_handle.create_collection(COLLECTION)
+        pipeline = StreamingIngestPipeline(config_file, GitHubRepoLoader(config_file), db_handle, skip_extractors=True)
+        pipeline.bulk = bulk
+
+        start = time.perf_counter()
+        counts = pipeline.run()
+        ingest_seconds = time.perf_counter() - start
+
+        index_params = {'index_type': index_type, 'metric_type': 'IP', 'params': {'nlist': 64, 'M': 16}}
+        index_start = time.perf_counter()
+        db_handle.create_index(COLLECTION, 'vector_field', index_params)
+        index_seconds = time.perf_counter() - index_start
+
+        query_vectors = embedding_function.encode_queries([f"query {seed} {i}" for i in range(queries)])
+        search_params = {'params': {'nprobe': 8, 'ef': 64}}
+        latencies = []
+        for query_vector in query_vectors:
+            query_start = time.perf_counter()
+            db_handle.search_vectors(COLLECTION, query_vector, top_k, 'IP', search_params)
+            latencies.append(time.perf_counter() - query_start)
+        batch_start = time.perf_counter()
+        db_handle.search_many(COLLECTION, query_vectors, top_k, 'IP', search_params)
+        batch_seconds = time.perf_counter() - batch_start
+        requests = server.requests
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'size': size,
+        'files': counts['files'],
+        'chunks': counts['chunks'],
+        'github_requests': requests,
+        'embedding_requests': embedding_function.calls,
+        'ingest_seconds': ingest_seconds,
+        'files_per_second': counts['files'] / ingest_seconds,
+        'chunks_per_second': counts['chunks'] / ingest_seconds,
+        'index_seconds': index_seconds,
+        'query_p50_ms': float(np.percentile(latencies_ms, 50)),
+        'query_p99_ms': float(np.percentile(latencies_ms, 99)),
+        'batch_queries_per_second': queries / batch_seconds,
+        'peak_rss_mb': _peak_rss_mb(),
+        'stages': get_metrics().snapshot()['stages'],
+    }
+
+
+def compare(results, baseline, tolerance=0.1):
+    """Compare two result documents (dicts or JSON paths) and list metrics that regressed beyond `tolerance`."""
+    if isinstance(results, str):
+        with open(results, 'r') as file:
+            results = json.load(file)
+    if isinstance(baseline, str):
+        with open(baseline, 'r') as file:
+            baseline = json.load(file)
+    baseline_runs = {run['size']: run for run in baseline['results']}
+    comparison = []
+    regressions = []
+    for run in results['results']:
+        reference = baseline_runs.get(run['size'])
+        if reference is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if not reference.get(metric):
+                continue
+            change = (run[metric] - reference[metric]) / reference[metric]
+            entry = {'size': run['size'], 'metric': metric, 'baseline': reference[metric], 'current': run[metric],
+                     'change': change}
+            comparison.append(entry)
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(entry)
+    return {'tolerance': tolerance, 'comparison': comparison, 'regressions': regressions}
+
+
+def run(sizes=(100, 1000, 5000), output='benchmark_results.json', baseline=None, tolerance=0.1, isolate=True,
+        **options):
+    """Benchmark each corpus size and write the results (and a baseline comparison) to `output`.
+
+    With `isolate` every size runs in a fresh process so peak RSS is measured
+    per size. Extra keyword arguments are passed through to `run_size`.
+    """
+    if isinstance(sizes, int):
+        sizes = [sizes]
+    results = []
+    for size in sizes:
+        logger.info("Benchmarking %d files", size)
+        if isolate:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                result = executor.submit(run_size, size, **options).result()
+        else:
+            result = run_size(size, **options)
+        logger.info("%d files: %.1f files/s, %.1f chunks/s, p50 %.2f ms, p99 %.2f ms, peak RSS %.0f MB",
+                    size, result['files_per_second'], result['chunks_per_second'], result['query_p50_ms'],
+                    result['query_p99_ms'], result['peak_rss_mb'])
+        results.append(result)
+    document = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count()},
+        'options': options,
+        'results': results,
+    }
+    if baseline:
+        document['baseline'] = compare(document, baseline, tolerance)
+        for entry in document['baseline']['regressions']:
+            logger.warning("Regression at %d files: %s %.4g -> %.4g (%+.1f%%)", entry['size'], entry['metric'],
+                           entry['baseline'], entry['current'], entry['change'] * 100)
+    if output:
+        with open(output, 'w') as file:
+            json.dump(document, file, indent=2)
+    return document
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    fire.Fire({'run': run, 'compare': compare})
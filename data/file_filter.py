@@ -0,0 +1,87 @@
+import fnmatch
+import os
+
+BINARY_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.tiff', '.psd',
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.tar', '.jar', '.war',
+    '.exe', '.dll', '.so', '.dylib', '.o', '.a', '.lib', '.bin', '.class', '.pyc', '.pyd', '.whl',
+    '.mp3', '.mp4', '.wav', '.ogg', '.mov', '.avi', '.mkv', '.flac',
+    '.ttf', '.otf', '.woff', '.woff2', '.eot',
+    '.db', '.sqlite', '.parquet', '.npy', '.npz', '.pkl', '.h5', '.onnx', '.pt', '.ckpt',
+}
+
+
+def _in_folders(path, folders):
+    """True when `path` lies in one of `folders`.
+
+    Entries with a slash are matched as path prefixes; bare names (glob
+    patterns allowed) match any folder of that name at any depth.
+    """
+    parts = path.split('/') if path else []
+    for folder in folders:
+        folder = folder.strip('/')
+        if '/' in folder:
+            if path == folder or path.startswith(folder + '/'):
+                return True
+        elif any(fnmatch.fnmatch(part, folder) for part in parts):
+            return True
+    return False
+
+
+class FileFilter:
+    """Decide from listing metadata alone whether a folder is walked and a file is fetched.
+
+    Built from the `options` section of config.yaml. Empty include lists mean
+    "everything"; exclusions always win over inclusions except for files
+    named explicitly in `include_files`.
+    """
+
+    def __init__(self, options):
+        self.include_files = options.get('include_files') or []
+        self.exclude_files = options.get('exclude_files') or []
+        self.include_folders = options.get('include_folders') or []
+        self.exclude_folders = options.get('exclude_folders') or []
+        self.include_extensions = {ext.lower() for ext in options.get('include_file_extensions') or []}
+        self.exclude_extensions = {ext.lower() for ext in options.get('exclude_file_extensions') or []}
+        self.max_file_size = (options.get('max_file_size_kb') or 0) * 1024
+
+    def allow_dir(self, path):
+        """Whether the folder at `path` should be listed at all."""
+        if _in_folders(path, self.exclude_folders):
+            return False
+        if not self.include_folders or self.include_files:
+            return True
+        for folder in self.include_folders:
+            folder = folder.strip('/')
+            if '/' not in folder or path == folder or path.startswith(folder + '/') or folder.startswith(path + '/'):
+                return True
+        return False
+
+    def allow_file(self, path, size=None):
+        """Whether the file at `path` should be fetched."""
+        directory, name = os.path.split(path)
+        extension = os.path.splitext(name)[1].lower()
+        if _in_folders(directory, self.exclude_folders):
+            return False
+        if self._matches(path, name, self.exclude_files) or extension in self.exclude_extensions:
+            return False
+        if extension in BINARY_EXTENSIONS:
+            return False
+        if self.max_file_size and size and size > self.max_file_size:
+            return False
+        if self._matches(path, name, self.include_files):
+            return True
+        if self.include_files and not self.include_folders and not self.include_extensions:
+            return False
+        if self.include_folders and not _in_folders(directory, self.include_folders):
+            return False
+        return not self.include_extensions or extension in self.include_extensions
+
+    def _matches(self, path, name, patterns):
+        return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(path, pattern) for pattern in patterns)
+
+
+def is_binary(raw):
+    """Sniff file content the way git does: a NUL byte in the first 8KB means binary."""
+    return b'\x00' in raw[:8192]
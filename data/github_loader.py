@@ -3,16 +3,28 @@ import os
 import yaml
 import fire
 import base64
-from models.code_chunker import LlamaDoc
-
+import json
+import logging
+import tarfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from requests.adapters import HTTPAdapter
+from data.file_filter import FileFilter, is_binary
+from data.http_cache import HTTPCache
+from utils.metrics import get_metrics
+from utils.rate_limiter import get_rate_limiter
 
+logger = logging.getLogger(__name__)
 
 
 class GitHubRepoLoader:
     def __init__(self, config_file='../config/config.yaml'):
         self._parse_config(config_file)
         self.access_token = os.getenv('GITHUB_ACCESS_TOKEN')
-        self.api_url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/contents"
+        self.repo_url = f"{self.api_base_url}/repos/{self.repo_owner}/{self.repo_name}"
+        self.api_url = f"{self.repo_url}/contents"
+        self.session = self._create_session()
+        self.rate_limiter = get_rate_limiter('github', **self.rate_limit)
+        self.cache = HTTPCache(self.cache_dir, self.cache_max_mb * 1024 * 1024) if self.cache_dir else None
 
     def _get_headers(self):
         headers = {}
@@ -26,50 +38,263 @@ class GitHubRepoLoader:
             config = yaml.safe_load(file)
             self.repo_owner = config.get('repository', {}).get('owner')
             self.repo_name = config.get('repository', {}).get('name')
+            self.ref = config.get('repository', {}).get('ref', 'HEAD')
+            self.api_base_url = config.get('repository', {}).get('api_url', 'https://api.github.com').rstrip('/')
+            self.max_workers = (config.get('loader') or {}).get('max_workers', 8)
+            self.max_retries = (config.get('loader') or {}).get('max_retries', 3)
+            self.cache_dir = (config.get('loader') or {}).get('cache_dir')
+            self.cache_max_mb = (config.get('loader') or {}).get('cache_max_mb', 512)
+            self.file_filter = FileFilter(config.get('options') or {})
+            self.rate_limit = (config.get('rate_limits') or {}).get('github', {})
+
+    def _create_session(self):
+        """Create an HTTP session that keeps one pooled connection per worker alive."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update(self._get_headers())
+        return session
+
+    def _get(self, url, **kwargs):
+        """GET `url` through the shared GitHub rate limiter, retrying when GitHub asks to back off."""
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            response = self.session.get(url, **kwargs)
+            delay = self.rate_limiter.update_from_headers(response.headers)
+            if response.status_code not in (403, 429) or delay is None or attempt == self.max_retries:
+                return response
+            response.close()
+
+    def _get_json(self, url, params=None):
+        """GET a JSON document, revalidating a cached copy with If-None-Match when a cache is set.
+
+        GitHub does not count 304 Not Modified responses against the rate limit.
+        """
+        with get_metrics().stage('fetch', items=1) as stage:
+            if self.cache is None:
+                response = self._get(url, params=params)
+                response.raise_for_status()
+                stage.bytes = len(response.content)
+                return response.json()
+            key = f"{url}?{json.dumps(params, sort_keys=True)}" if params else url
+            cached = self.cache.get(key)
+            headers = {'If-None-Match': cached[0]} if cached else {}
+            response = self._get(url, params=params, headers=headers)
+            if cached and response.status_code == 304:
+                self.cache.record(hit=True)
+                return json.loads(cached[1])
+            response.raise_for_status()
+            self.cache.record(hit=False)
+            stage.bytes = len(response.content)
+            self.cache.put(key, response.headers.get('ETag'), response.text)
+            return response.json()
 
     def get_file_list(self, path=""):
         """Fetch the list of files in the given path of the repository."""
         url = f"{self.api_url}/{path}"
-        response = requests.get(url, headers=self._get_headers())
-        response.raise_for_status()
-        return response.json()
+        return self._get_json(url)
 
     def get_file_data(self, file_path):
         """Fetch the content of a specific file in the repository."""
-        status = False
         url = f"{self.api_url}/{file_path}"
-        file_extension = os.path.splitext(file_path)[1]
-        response = requests.get(url, headers=self._get_headers())
-        response.raise_for_status()
-        file_info = response.json()
-        lines = base64.b64decode(file_info['content']).decode('utf-8').splitlines()
-        num_lines = len(lines)
-        file_info['lines_of_code'] = num_lines
-        file_info['extension'] = file_extension
+        file_info = self._get_json(url)
+        if 'content' not in file_info:
+            return False, file_info
+        return self._to_module(file_info, base64.b64decode(file_info['content']))
+
+    def get_tree(self, ref=None):
+        """Fetch the whole file list of the repository with one recursive Git Trees API call."""
+        url = f"{self.repo_url}/git/trees/{ref or self.ref}"
+        return self._get_json(url, params={'recursive': 1})
+
+    def iter_tarball(self, ref=None):
+        """Download the repository tarball once and yield (path, bytes) for every file in it."""
+        url = f"{self.repo_url}/tarball/{ref or self.ref}"
+        with self._get(url, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            with tarfile.open(fileobj=response.raw, mode='r|gz') as archive:
+                for member in archive:
+                    if not member.isfile() or '/' not in member.name:
+                        continue
+                    # Entries are prefixed with a "<owner>-<repo>-<sha>/" folder.
+                    get_metrics().count('fetch', items=1, bytes=member.size)
+                    yield member.name.split('/', 1)[1], archive.extractfile(member).read()
+
+    def _to_module(self, file_info, raw):
+        """Decode raw file bytes into the module dict consumed by LlamaDoc."""
+        with get_metrics().stage('decode', items=1, bytes=len(raw)):
+            if is_binary(raw):
+                return False, file_info
+            try:
+                lines = raw.decode('utf-8').splitlines()
+            except UnicodeDecodeError:
+                return False, file_info
+        file_info['lines_of_code'] = len(lines)
+        file_info['extension'] = os.path.splitext(file_info['path'])[1]
         file_info['content'] = lines
-        if 'content' in file_info:
-            status = True
-        return status, file_info
+        return True, file_info
 
-    
     def traverse_repo(self, path=""):
         """Traverse the repository and produce a graph of each file and folder."""
-        graph = {self.repo_name: {}}
+        tree, llama_doc = self._traverse(path)
+        return {self.repo_name: tree}, llama_doc
+
+    def _traverse(self, path):
+        """Depth-first walk of `path` returning its sub-tree and the decoded files below it."""
+        tree = {}
         llama_doc = []
-        items = self.get_file_list(path)
+        items = self._filter_listing(self.get_file_list(path))
         for item in items:
             if item['type'] == 'dir':
-                graph[self.repo_name][item['name']] = self.traverse_repo(item['path'])
+                tree[item['name']], modules = self._traverse(item['path'])
+                llama_doc.extend(modules)
             else:
-                graph[self.repo_name][item['name']] = 'file'
+                tree[item['name']] = 'file'
                 status, content = self.get_file_data(item['path'])
                 if status:
                     llama_doc.append(content)
-        return graph, llama_doc
+        return tree, llama_doc
+
+    def traverse_repo_concurrent(self, path="", max_workers=None):
+        """Traverse the repository fetching directory listings and files in parallel.
+
+        Returns the same (graph, modules) pair as `traverse_repo`, with modules in
+        the same depth-first order.
+        """
+        listings, file_data = self._crawl(path, fetch_files=True, max_workers=max_workers)
+        tree, llama_doc = self._assemble(path, listings, file_data)
+        return {self.repo_name: tree}, llama_doc
+
+    def _crawl(self, path, fetch_files, max_workers=None):
+        """Fetch every directory listing below `path` (and optionally every file) on a thread pool."""
+        listings = {}
+        file_data = {}
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+            pending = {executor.submit(self.get_file_list, path): ('dir', path)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, item_path = pending.pop(future)
+                    if kind == 'file':
+                        file_data[item_path] = future.result()
+                        continue
+                    listings[item_path] = self._filter_listing(future.result())
+                    for item in listings[item_path]:
+                        if item['type'] == 'dir':
+                            pending[executor.submit(self.get_file_list, item['path'])] = ('dir', item['path'])
+                        elif fetch_files:
+                            pending[executor.submit(self.get_file_data, item['path'])] = ('file', item['path'])
+        return listings, file_data
+
+    def list_files(self, path=""):
+        """List every file below `path` with its blob sha, without fetching any content."""
+        tree_info = self.get_tree()
+        if tree_info.get('truncated'):
+            listings, _ = self._crawl(path, fetch_files=False)
+        else:
+            listings = self._listings_from_tree(tree_info['tree'], path)
+        return [item for items in listings.values() for item in items if item['type'] == 'file']
+
+    def fetch_files(self, paths, max_workers=None):
+        """Fetch and decode the given files in parallel, returning modules in the order of `paths`."""
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+            results = list(executor.map(self.get_file_data, paths))
+        return [module for status, module in results if status]
+
+    def iter_repo(self, path="", bulk=False, max_workers=None):
+        """Yield decoded modules as they arrive instead of collecting the whole repository.
+
+        With `bulk` the bodies are streamed out of the repository tarball;
+        otherwise files are fetched with at most two requests per worker in flight.
+        """
+        files = {item['path']: item for item in self.list_files(path)}
+        if bulk:
+            for file_path, raw in self.iter_tarball():
+                if file_path in files:
+                    status, module = self._to_module(dict(files[file_path]), raw)
+                    if status:
+                        yield module
+            return
+        max_workers = max_workers or self.max_workers
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = set()
+            for file_path in files:
+                if len(pending) >= 2 * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from (module for status, module in (future.result() for future in done) if status)
+                pending.add(executor.submit(self.get_file_data, file_path))
+            for future in as_completed(pending):
+                status, module = future.result()
+                if status:
+                    yield module
+
+    def traverse_repo_bulk(self, path=""):
+        """Traverse the repository with one tree request and one tarball download.
+
+        Returns the same (graph, modules) pair as `traverse_repo` without a
+        request per directory or file. Falls back to `traverse_repo_concurrent`
+        when GitHub truncates the tree listing.
+        """
+        tree_info = self.get_tree()
+        if tree_info.get('truncated'):
+            logger.warning("Tree listing for %s/%s is truncated, falling back to per-directory crawl",
+                           self.repo_owner, self.repo_name)
+            return self.traverse_repo_concurrent(path)
+        listings = self._listings_from_tree(tree_info['tree'], path)
+        files = {item['path']: item for items in listings.values() for item in items if item['type'] == 'file'}
+        file_data = {}
+        for file_path, raw in self.iter_tarball():
+            if file_path in files:
+                file_data[file_path] = self._to_module(dict(files[file_path]), raw)
+        tree, llama_doc = self._assemble(path, listings, file_data)
+        return {self.repo_name: tree}, llama_doc
+
+    def _filter_listing(self, items):
+        """Drop listing entries excluded by the config filters before anything below them is fetched."""
+        return [item for item in items
+                if (self.file_filter.allow_dir(item['path']) if item['type'] == 'dir'
+                    else self.file_filter.allow_file(item['path'], item.get('size')))]
+
+    def _listings_from_tree(self, entries, path=""):
+        """Group Git Trees API entries into per-directory listings shaped like the contents API."""
+        prefix = f"{path.rstrip('/')}/" if path else ""
+        listings = {}
+        for entry in entries:
+            if not entry['path'].startswith(prefix) or entry['type'] not in ('blob', 'tree'):
+                continue
+            parent, _, name = entry['path'].rpartition('/')
+            listings.setdefault(parent, []).extend(self._filter_listing([{
+                'name': name,
+                'path': entry['path'],
+                'type': 'dir' if entry['type'] == 'tree' else 'file',
+                'sha': entry['sha'],
+                'size': entry.get('size', 0),
+                'html_url': f"https://github.com/{self.repo_owner}/{self.repo_name}/blob/{self.ref}/{entry['path']}",
+            }]))
+        return listings
+
+    def _assemble(self, path, listings, file_data):
+        """Rebuild the depth-first (tree, modules) result from pre-fetched listings and files."""
+        tree = {}
+        llama_doc = []
+        for item in listings.get(path, []):
+            if item['type'] == 'dir':
+                tree[item['name']], modules = self._assemble(item['path'], listings, file_data)
+                llama_doc.extend(modules)
+            else:
+                tree[item['name']] = 'file'
+                status, content = file_data.get(item['path'], (False, None))
+                if status:
+                    llama_doc.append(content)
+        return tree, llama_doc
 
 
 if __name__ == '__main__':
-    graph, modules = GitHubRepoLoader().traverse_repo()
+    # llama_index is slow to import and only needed to build documents here.
+    from models.code_chunker import LlamaDoc
+    graph, modules = GitHubRepoLoader().traverse_repo_bulk()
     doc = LlamaDoc(graph, modules)
     doc.create_doc()
     fire.Fire(GitHubRepoLoader)
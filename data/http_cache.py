@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from utils.metrics import get_metrics
+
+
+class HTTPCache:
+    """On-disk cache of response bodies and their ETags with LRU eviction by total size.
+
+    Each entry is one JSON file named after the hash of its key; the file
+    mtime doubles as the last-used timestamp, so eviction order survives
+    restarts.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.entries = {}
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                stat = os.stat(os.path.join(directory, name))
+                self.entries[name] = (stat.st_size, stat.st_mtime)
+        self.total_bytes = sum(size for size, _ in self.entries.values())
+
+    def _file_name(self, key):
+        return f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json"
+
+    def get(self, key):
+        """Return the cached (etag, body) for `key`, or None."""
+        name = self._file_name(key)
+        path = os.path.join(self.directory, name)
+        with self.lock:
+            if name not in self.entries:
+                return None
+            try:
+                with open(path, 'r') as file:
+                    entry = json.load(file)
+            except (OSError, ValueError):
+                self._remove(name)
+                return None
+            now = time.time()
+            os.utime(path, (now, now))
+            self.entries[name] = (self.entries[name][0], now)
+        return entry['etag'], entry['body']
+
+    def put(self, key, etag, body):
+        """Store `body` (text) under `key` and evict least recently used entries over the cap."""
+        if not etag:
+            return
+        name = self._file_name(key)
+        path = os.path.join(self.directory, name)
+        data = json.dumps({'key': key, 'etag': etag, 'body': body})
+        with self.lock:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+            self._remove(name, delete_file=False)
+            self.entries[name] = (os.path.getsize(path), time.time())
+            self.total_bytes += self.entries[name][0]
+            self._evict()
+
+    def record(self, hit):
+        """Count a revalidation outcome; 304s are hits."""
+        get_metrics().cache('http', hits=int(hit), misses=int(not hit))
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _remove(self, name, delete_file=True):
+        size, _ = self.entries.pop(name, (0, 0))
+        self.total_bytes -= size
+        if delete_file:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        for name, _ in sorted(self.entries.items(), key=lambda item: item[1][1]):
+            self._remove(name)
+            if self.total_bytes <= self.max_bytes:
+                break
@@ -0,0 +1,46 @@
+import hashlib
+import json
+import os
+
+from utils.files import atomic_write_json
+
+
+def chunk_id(repo, path, sha, index):
+    """Deterministic 63-bit vector id for the `index`-th chunk of a file revision."""
+    digest = hashlib.sha1(f"{repo}:{path}:{sha}:{index}".encode('utf-8')).hexdigest()
+    return int(digest[:16], 16) & 0x7FFFFFFFFFFFFFFF
+
+
+class RepoManifest:
+    """Persistent record of the blob sha and vector ids indexed for every file of a repository."""
+
+    def __init__(self, manifest_file):
+        self.manifest_file = manifest_file
+        self.files = {}
+        if os.path.exists(manifest_file):
+            with open(manifest_file, 'r') as file:
+                self.files = json.load(file)
+
+    def diff(self, entries):
+        """Compare listing entries (dicts with `path` and `sha`) against the manifest.
+
+        Returns the (added, modified, removed) lists of paths.
+        """
+        current = {entry['path']: entry['sha'] for entry in entries}
+        added = [path for path in current if path not in self.files]
+        modified = [path for path in current if path in self.files and self.files[path]['sha'] != current[path]]
+        removed = [path for path in self.files if path not in current]
+        return added, modified, removed
+
+    def vector_ids(self, paths):
+        """Return the vector ids currently indexed for the given paths."""
+        return [vector_id for path in paths for vector_id in self.files.get(path, {}).get('ids', [])]
+
+    def update(self, path, sha, ids):
+        self.files[path] = {'sha': sha, 'ids': list(ids)}
+
+    def remove(self, path):
+        self.files.pop(path, None)
+
+    def save(self):
+        atomic_write_json(self.manifest_file, self.files)
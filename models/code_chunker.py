@@ -1,7 +1,7 @@
 from llama_index.core.schema import Document
 from datetime import datetime
-import time
 import yaml
+from utils.metrics import get_metrics
 
 class LlamaDoc:
     def __init__(self, graph, modules, config_file='../config/config.yaml'):
@@ -18,21 +18,34 @@ class LlamaDoc:
             self.repo_name = config.get('repository', {}).get('name')
 
     def create_doc(self):
-        for module in self.modules:
-            now = datetime.now()
-            formatted_now = now.strftime("%Y-%m-%d %H:%M:%S")
-            document = Document(text=module['content'],
-            metadata={
-                "file_name": module["name"],
-                "githubrepo": self.repo_name+"/"+self.repo_owner,
-                "extension": module["extension"],
-                "modifiedOn": formatted_now,
-                "size": module["size"],
-                "github_url": module["html_url"],
-                "lines": module["lines_of_code"],},
-            metadata_seperator="::",
-            metadata_template="{key}=>{value}",
-            text_template="Metadata: {metadata_str}\n-----\nContent: {content}")
-            time.sleep(3)
+        for document in self.iter_docs(self.modules):
             self.doc.append(document)
         return self.doc
+
+    def iter_docs(self, modules):
+        """Lazily build one Document per module so callers can stream them."""
+        for module in modules:
+            yield self.build_doc(module)
+
+    def build_doc(self, module):
+        """Build the Document for a single decoded module."""
+        with get_metrics().stage('document', items=1):
+            return self._build_doc(module)
+
+    def _build_doc(self, module):
+        now = datetime.now()
+        formatted_now = now.strftime("%Y-%m-%d %H:%M:%S")
+        document = Document(text="\n".join(module['content']),
+        metadata={
+            "file_name": module["name"],
+            "file_path": module["path"],
+            "githubrepo": self.repo_name+"/"+self.repo_owner,
+            "extension": module["extension"],
+            "modifiedOn": formatted_now,
+            "size": module["size"],
+            "github_url": module["html_url"],
+            "lines": module["lines_of_code"],},
+        metadata_seperator="::",
+        metadata_template="{key}=>{value}",
+        text_template="Metadata: {metadata_str}\n-----\nContent: {content}")
+        return document
@@ -0,0 +1,162 @@
+import ast
+import logging
+from typing import Any, Callable, List, Sequence
+
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.node_parser import CodeSplitter, TokenTextSplitter
+from llama_index.core.node_parser.interface import TextSplitter
+from llama_index.core.node_parser.node_utils import build_nodes_from_splits
+from llama_index.core.schema import BaseNode
+from llama_index.core.utils import get_tokenizer, get_tqdm_iterable
+
+logger = logging.getLogger(__name__)
+
+# File extension -> tree-sitter grammar used for languages other than Python.
+GRAMMARS = {
+    '.js': 'javascript', '.jsx': 'javascript', '.mjs': 'javascript', '.ts': 'typescript', '.tsx': 'tsx',
+    '.java': 'java', '.kt': 'kotlin', '.scala': 'scala', '.go': 'go', '.rs': 'rust', '.rb': 'ruby',
+    '.php': 'php', '.c': 'c', '.h': 'c', '.cc': 'cpp', '.cpp': 'cpp', '.hpp': 'cpp', '.cs': 'c_sharp',
+}
+
+_DEFINITIONS = (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+def register_grammar(extension, language):
+    """Route files with `extension` through the tree-sitter grammar `language`."""
+    GRAMMARS[extension.lower()] = language
+
+
+class ASTCodeSplitter(TextSplitter):
+    """Split source code on module/class/function boundaries.
+
+    Python is parsed with `ast`; other languages in GRAMMARS go through a
+    tree-sitter CodeSplitter when `tree_sitter_languages` is installed. Each
+    top-level definition becomes a unit, oversized classes and functions are
+    split into their members (falling back to line windows), and adjacent
+    small units are merged up to `chunk_size` tokens. Anything that cannot
+    be parsed falls back to a plain token splitter.
+    """
+
+    chunk_size: int = Field(default=512, description="Token budget per chunk.", gt=0)
+    chunk_overlap: int = Field(default=0, description="Tokens of trailing context repeated from the previous chunk.",
+                               ge=0)
+
+    _tokenizer: Callable = PrivateAttr()
+    _fallback: TokenTextSplitter = PrivateAttr()
+    _grammar_splitters: dict = PrivateAttr(default_factory=dict)
+
+    def __init__(self, chunk_size=512, chunk_overlap=0, **kwargs: Any) -> None:
+        super().__init__(chunk_size=chunk_size, chunk_overlap=chunk_overlap, **kwargs)
+        self._tokenizer = get_tokenizer()
+        self._fallback = TokenTextSplitter(separator=" ", chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self._grammar_splitters = {}
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ASTCodeSplitter"
+
+    def _parse_nodes(self, nodes: Sequence[BaseNode], show_progress: bool = False, **kwargs: Any) -> List[BaseNode]:
+        all_nodes: List[BaseNode] = []
+        for node in get_tqdm_iterable(nodes, show_progress, "Parsing nodes"):
+            splits = self.split_code(node.get_content(), node.metadata.get('extension', '.py'))
+            all_nodes.extend(build_nodes_from_splits(splits, node, id_func=self.id_func))
+        return all_nodes
+
+    def split_text(self, text: str) -> List[str]:
+        return self.split_code(text, '.py')
+
+    def split_code(self, text, extension):
+        """Split `text` using the strategy for files ending in `extension`."""
+        if not text.strip():
+            return []
+        extension = (extension or '').lower()
+        if extension in ('.py', '.pyi'):
+            try:
+                units = self._python_units(text)
+            except SyntaxError:
+                return self._fallback.split_text(text)
+        elif extension in GRAMMARS and self._grammar_splitter(GRAMMARS[extension]) is not None:
+            units = self._grammar_splitter(GRAMMARS[extension]).split_text(text)
+        else:
+            return self._fallback.split_text(text)
+        return self._add_overlap(self._merge(units))
+
+    def _count(self, text):
+        return len(self._tokenizer(text))
+
+    def _grammar_splitter(self, language):
+        if language not in self._grammar_splitters:
+            try:
+                self._grammar_splitters[language] = CodeSplitter(language=language, max_chars=self.chunk_size * 4,
+                                                                 chunk_lines_overlap=0)
+            except Exception as e:
+                logger.debug("No tree-sitter grammar for %s (%s), using token splitting", language, e)
+                self._grammar_splitters[language] = None
+        return self._grammar_splitters[language]
+
+    def _python_units(self, text):
+        lines = text.splitlines(keepends=True)
+        tree = ast.parse(text)
+        units = self._segments(tree.body, lines, 0, len(lines))
+        return units or [text]
+
+    def _segments(self, body, lines, start, end):
+        """Turn a statement list into units, attaching leading comments to the statement below them."""
+        units = []
+        cursor = start
+        for position, statement in enumerate(body):
+            statement_end = end if position == len(body) - 1 else statement.end_lineno
+            segment = ''.join(lines[cursor:statement_end])
+            if self._count(segment) <= self.chunk_size:
+                units.append(segment)
+            elif isinstance(statement, _DEFINITIONS) and statement.body:
+                body_start = statement.body[0].lineno - 1
+                if body_start > cursor:
+                    units.append(''.join(lines[cursor:body_start]))
+                units.extend(self._segments(statement.body, lines, max(body_start, cursor), statement_end))
+            else:
+                units.extend(self._line_windows(lines[cursor:statement_end]))
+            cursor = statement_end
+        return [unit for unit in units if unit.strip()]
+
+    def _line_windows(self, lines):
+        """Last resort for a single oversized statement: consecutive lines up to the token budget."""
+        windows, current, tokens = [], [], 0
+        for line in lines:
+            line_tokens = self._count(line)
+            if current and tokens + line_tokens > self.chunk_size:
+                windows.append(''.join(current))
+                current, tokens = [], 0
+            current.append(line)
+            tokens += line_tokens
+        if current:
+            windows.append(''.join(current))
+        return windows
+
+    def _merge(self, units):
+        """Greedily merge adjacent units while they fit in `chunk_size` tokens."""
+        chunks, current, tokens = [], '', 0
+        for unit in units:
+            unit_tokens = self._count(unit)
+            if current and tokens + unit_tokens > self.chunk_size:
+                chunks.append(current)
+                current, tokens = '', 0
+            current = f"{current}\n{unit}" if current and not current.endswith('\n') else current + unit
+            tokens += unit_tokens
+        if current:
+            chunks.append(current)
+        return [chunk.strip('\n') for chunk in chunks]
+
+    def _add_overlap(self, chunks):
+        if not self.chunk_overlap:
+            return chunks
+        overlapped = chunks[:1]
+        for previous, chunk in zip(chunks, chunks[1:]):
+            context, tokens = [], 0
+            for line in reversed(previous.splitlines()):
+                tokens += self._count(line)
+                if tokens > self.chunk_overlap:
+                    break
+                context.insert(0, line)
+            overlapped.append('\n'.join(context + [chunk]))
+        return overlapped
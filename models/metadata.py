@@ -1,22 +1,55 @@
+import hashlib
+import json
 import os
 import yaml
 
-from llama_index.core.ingestion import IngestionPipeline
+from llama_index.core.callbacks import CallbackManager, CBEventType
+from llama_index.core.callbacks.base_handler import BaseCallbackHandler
+from llama_index.core.async_utils import asyncio_run, run_jobs
+from llama_index.llms.openai import OpenAI
 
-from llama_index.core.node_parser import TokenTextSplitter
-from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.extractors import QuestionsAnsweredExtractor, TitleExtractor
 
+from models.code_splitter import ASTCodeSplitter
+from utils.metrics import get_metrics
+from utils.rate_limiter import get_rate_limiter
+from utils.sqlite_cache import SQLiteCache
 
-from llama_index.core.extractors import SummaryExtractor, QuestionsAnsweredExtractor, TitleExtractor
 
-from llama_index.core.metadata_mode import MetadataMode
+def _digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class RateLimitCallbackHandler(BaseCallbackHandler):
+    """Take a token from the shared rate limiter before every LLM call."""
+
+    def __init__(self, rate_limiter):
+        super().__init__(event_starts_to_ignore=[], event_ends_to_ignore=[])
+        self.rate_limiter = rate_limiter
+
+    def on_event_start(self, event_type, payload=None, event_id="", parent_id="", **kwargs):
+        if event_type == CBEventType.LLM:
+            self.rate_limiter.acquire()
+        return event_id
+
+    def on_event_end(self, event_type, payload=None, event_id="", **kwargs):
+        pass
+
+    def start_trace(self, trace_id=None):
+        pass
+
+    def end_trace(self, trace_id=None, trace_map=None):
+        pass
 
 
 class MetadataExtractors:
-    def __init__(self, document, config_file='../config/config.yaml'):
+    def __init__(self, document, config_file='../config/config.yaml', skip_extractors=None):
         self.openai_key = os.getenv('OPENAI_API_KEY')
         self._parse_config(config_file)
         self.document = document
+        if skip_extractors is not None:
+            self.skip_extractors = skip_extractors
+        self.cache = SQLiteCache(self.cache_file, name='extraction') if self.cache_file and not self.skip_extractors else None
 
 
     def _parse_config(self, config_file):
@@ -25,30 +58,87 @@ class MetadataExtractors:
             config = yaml.safe_load(file)
             self.repo_owner = config.get('repository', {}).get('owner')
             self.repo_name = config.get('repository', {}).get('name')
+            self.llm_model = config.get('openai_llm', {}).get('model', 'gpt-3.5-turbo')
+            self.llm_temperature = config.get('openai_llm', {}).get('temperature', 0.8)
+            self.rate_limit = (config.get('rate_limits') or {}).get('openai', {})
+            extraction = config.get('extraction') or {}
+            self.skip_extractors = extraction.get('skip_extractors', False)
+            self.num_workers = extraction.get('num_workers', 8)
+            self.cache_file = extraction.get('cache_file')
+            chunking = config.get('chunking') or {}
+            self.chunk_size = chunking.get('chunk_size', 512)
+            self.chunk_overlap = chunking.get('chunk_overlap', 0)
 
-    def extract_metadata(self):
+    def _create_llm(self):
+        """Create the extractor LLM, throttled by the limiter shared with the embedding calls."""
+        callback_manager = CallbackManager([RateLimitCallbackHandler(get_rate_limiter('openai', **self.rate_limit))])
+        return OpenAI(model=self.llm_model, temperature=self.llm_temperature, api_key=self.openai_key,
+                      callback_manager=callback_manager)
 
-        text_splitter = TokenTextSplitter(separator=" ", chunk_size=512, chunk_overlap=128)
-        title_extractor = TitleExtractor(nodes=5)
-        qa_extractor = QuestionsAnsweredExtractor(questions=3)
-        pipeline = IngestionPipeline(transformations=[text_splitter, title_extractor, qa_extractor])
-        nodes = pipeline.run(documents=self.document, in_place=True, show_progress=True)
-        return nodes
+    def extract_metadata(self, documents=None):
+        """Split and enrich `documents` (defaults to the documents given at construction).
+
+        Titles are cached per document, keyed on the text of the first nodes
+        the TitleExtractor reads, and questions per node. Only documents whose
+        title key misses are re-titled (all of their nodes get the new title)
+        and only nodes whose own key misses are sent for questions, so editing
+        one function costs one question call. Title jobs for different
+        documents run with up to `num_workers` in flight, as do the question calls.
+        """
+        documents = self.document if documents is None else documents
+        text_splitter = ASTCodeSplitter(chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
+        with get_metrics().stage('split', items=len(documents)):
+            nodes = text_splitter.get_nodes_from_documents(documents, show_progress=True)
+        if self.skip_extractors:
+            return nodes
 
+        llm = self._create_llm()
+        title_extractor = TitleExtractor(nodes=5, llm=llm, num_workers=self.num_workers)
+        qa_extractor = QuestionsAnsweredExtractor(questions=3, llm=llm, num_workers=self.num_workers)
+        settings = f"{self.llm_model}:{self.llm_temperature}:{title_extractor.nodes}:{qa_extractor.questions}"
+        nodes_by_doc = {}
+        for node in nodes:
+            nodes_by_doc.setdefault(node.ref_doc_id or node.node_id, []).append(node)
+        title_keys = {doc_id: _digest(f"{settings}:title:" + "\0".join(node.get_content()
+                                                                       for node in doc_nodes[:title_extractor.nodes]))
+                      for doc_id, doc_nodes in nodes_by_doc.items()}
+        node_keys = {node.node_id: _digest(f"{settings}:{node.get_content()}") for node in nodes}
+        cached = self.cache.get_many(list(title_keys.values()) + list(node_keys.values())) if self.cache else {}
 
-"""
-        self.node_parser = TokenTextSplitter(
-            separator=" ", chunk_size=256, chunk_overlap=128
-        )
-        self.extractors_1 = [
-            QuestionsAnsweredExtractor(
-                questions=3, llm=self.llm, metadata_mode=MetadataMode.EMBED
-            ),
-        ]
-        self.extractors_2 = [
-            SummaryExtractor(summaries=["prev", "self", "next"], llm=self.llm),
-            QuestionsAnsweredExtractor(
-                questions=3, llm=self.llm, metadata_mode=MetadataMode.EMBED
-            ),
-        ]
-"""
\ No newline at end of file
+        stale_titles = []
+        for doc_id, doc_nodes in nodes_by_doc.items():
+            if title_keys[doc_id] in cached:
+                for node in doc_nodes:
+                    node.metadata.update(json.loads(cached[title_keys[doc_id]]))
+            else:
+                stale_titles.append(doc_id)
+        stale_nodes = []
+        for node in nodes:
+            if node_keys[node.node_id] in cached:
+                node.metadata.update(json.loads(cached[node_keys[node.node_id]]))
+            else:
+                stale_nodes.append(node)
+        if not stale_titles and not stale_nodes:
+            return nodes
+
+        with get_metrics().stage('extract', items=len(stale_nodes)):
+            if stale_titles:
+                # TitleExtractor handles documents one at a time, so each document is its own job.
+                titles = asyncio_run(run_jobs([title_extractor.aextract(nodes_by_doc[doc_id])
+                                               for doc_id in stale_titles], workers=self.num_workers))
+                for doc_id, doc_titles in zip(stale_titles, titles):
+                    for node, metadata in zip(nodes_by_doc[doc_id], doc_titles):
+                        node.metadata.update(metadata)
+            originals = [set(node.metadata) for node in stale_nodes]
+            if stale_nodes:
+                for node, metadata in zip(stale_nodes, qa_extractor.extract(stale_nodes)):
+                    node.metadata.update(metadata)
+        if self.cache:
+            entries = {title_keys[doc_id]: json.dumps({'document_title':
+                                                       nodes_by_doc[doc_id][0].metadata['document_title']})
+                       for doc_id in stale_titles}
+            entries.update({node_keys[node.node_id]: json.dumps({name: value for name, value in node.metadata.items()
+                                                                 if name not in original})
+                            for node, original in zip(stale_nodes, originals)})
+            self.cache.put_many(entries)
+        return nodes
@@ -0,0 +1,95 @@
+import logging
+import os
+import yaml
+import fire
+from llama_index.core.schema import MetadataMode
+from data.github_loader import GitHubRepoLoader
+from data.manifest import RepoManifest, chunk_id
+from models.code_chunker import LlamaDoc
+from models.metadata import MetadataExtractors
+from utils.ingest import IngestPipeline
+from utils.metrics import get_metrics
+from vectordb.code_schema import chunk_metadata
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalIndexer(IngestPipeline):
+    """Re-index a repository by blob sha so only added or modified files are fetched and embedded."""
+
+    def __init__(self, config_file='../config/config.yaml', loader=None, db_handle=None, skip_extractors=None):
+        self.config_file = config_file
+        self.skip_extractors = skip_extractors
+        self._parse_config(config_file)
+        get_metrics().configure(**self.metrics_options)
+        self.loader = loader or GitHubRepoLoader(config_file)
+        self.db_handle = db_handle or self._create_db_handle()
+        self.manifest = RepoManifest(os.path.join(self.manifest_dir, f"{self.repo_owner}_{self.repo_name}.json"))
+
+    def _parse_config(self, config_file):
+        """Parse the config file and assign instance variables."""
+        with open(config_file, 'r') as file:
+            config = yaml.safe_load(file)
+            self._parse_shared_config(config)
+            sync = config.get('sync') or {}
+            self.manifest_dir = sync.get('manifest_dir', '../.cache/manifests')
+            self.collection_name = sync.get('collection', 'code_chunks')
+            self.batch_size = sync.get('batch_size', 100)
+            self.compression = sync.get('compression')
+
+    def create_collection(self, dimensions=None, num_partitions=64, num_vectors=None):
+        """Create the target collection with the code-chunk schema, scalar indexes and the configured compression."""
+        return self.db_handle.create_code_collection(self.collection_name, dimensions or self.dimensions,
+                                                     num_partitions, self.compression, num_vectors)
+
+    def sync(self):
+        """Bring the collection in line with the repository and return the changed paths."""
+        entries = self.loader.list_files()
+        shas = {entry['path']: entry['sha'] for entry in entries}
+        added, modified, removed = self.manifest.diff(entries)
+        logger.info("Sync %s/%s: %d added, %d modified, %d removed",
+                    self.repo_owner, self.repo_name, len(added), len(modified), len(removed))
+
+        stale_ids = self.manifest.vector_ids(modified + removed)
+        if stale_ids:
+            self.db_handle.delete_vectors(self.collection_name, stale_ids)
+        for path in removed:
+            self.manifest.remove(path)
+        self.manifest.save()
+
+        changed = added + modified
+        for start in range(0, len(changed), self.batch_size):
+            self._index(changed[start:start + self.batch_size], shas)
+            self.manifest.save()
+        if added or modified or removed:
+            self._invalidate_query_cache()
+        get_metrics().report(self.metrics_options.get('json_file'))
+        return {'added': added, 'modified': modified, 'removed': removed}
+
+    def _index(self, paths, shas):
+        """Fetch, chunk and embed one batch of files, then record them in the manifest."""
+        modules = self.loader.fetch_files(paths)
+        nodes_by_path = {}
+        if modules:
+            documents = LlamaDoc(None, modules, self.config_file).create_doc()
+            for node in MetadataExtractors(documents, self.config_file, self.skip_extractors).extract_metadata():
+                nodes_by_path.setdefault(node.metadata['file_path'], []).append(node)
+
+        texts = []
+        ids = []
+        metadata = []
+        repo = f"{self.repo_owner}/{self.repo_name}"
+        for path in paths:
+            nodes = nodes_by_path.get(path, [])
+            path_ids = [chunk_id(repo, path, shas[path], index) for index in range(len(nodes))]
+            texts.extend(node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes)
+            metadata.extend(chunk_metadata(node.metadata, node.get_content()) for node in nodes)
+            ids.extend(path_ids)
+            # Files that fail to decode are recorded with no ids so they are not re-fetched.
+            self.manifest.update(path, shas[path], path_ids)
+        if texts:
+            self.db_handle.insert_documents_with_embeddings(self.collection_name, texts, ids, metadata=metadata)
+
+
+if __name__ == '__main__':
+    fire.Fire(IncrementalIndexer)
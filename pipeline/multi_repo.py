@@ -0,0 +1,196 @@
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import fire
+import yaml
+
+from pipeline.incremental import IncrementalIndexer
+from utils.files import atomic_write_json
+from utils.rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+def parse_repository(spec):
+    """Normalise "owner/name", "owner/name@ref" or {owner, name, ref} into a dict."""
+    if isinstance(spec, dict):
+        return {'owner': spec['owner'], 'name': spec['name'], 'ref': spec.get('ref', 'HEAD')}
+    spec, _, ref = spec.partition('@')
+    owner, _, name = spec.strip().strip('/').partition('/')
+    if not owner or not name:
+        raise ValueError(f"Expected a repository as owner/name, got: {spec}")
+    return {'owner': owner, 'name': name, 'ref': ref or 'HEAD'}
+
+
+class RepoQueue:
+    """Durable work queue of repositories, persisted as JSON after every state change.
+
+    Each entry records its status (pending, running, done or failed), the
+    number of attempts, the last error and the sync counts. Entries left
+    running by an interrupted driver go back to pending when it is reopened.
+    """
+
+    def __init__(self, queue_file):
+        self.queue_file = queue_file
+        self.entries = {}
+        if os.path.exists(queue_file):
+            with open(queue_file, 'r') as file:
+                self.entries = json.load(file)
+        for entry in self.entries.values():
+            if entry['status'] == 'running':
+                entry['status'] = 'pending'
+
+    def sync_repositories(self, repositories, max_attempts, restart=False):
+        """Make the queue hold exactly `repositories`, keeping the progress of ones already queued.
+
+        When nothing is left to sync (the previous pass finished) or `restart`
+        is set, all entries go back to pending for a new pass.
+        """
+        repositories = [parse_repository(spec) for spec in repositories]
+        keys = [f"{repo['owner']}/{repo['name']}" for repo in repositories]
+        if restart or not self.pending(max_attempts):
+            self.entries = {}
+        self.entries = {key: self.entries.get(key) or {'repository': repo, 'status': 'pending', 'attempts': 0,
+                                                       'error': None, 'result': None, 'updated': None}
+                        for key, repo in zip(keys, repositories)}
+        self.save()
+
+    def pending(self, max_attempts):
+        """Keys of repositories still to sync: pending ones and failed ones with attempts left."""
+        return [key for key, entry in self.entries.items()
+                if entry['status'] == 'pending' or (entry['status'] == 'failed' and entry['attempts'] < max_attempts)]
+
+    def mark(self, key, status, error=None, result=None):
+        entry = self.entries[key]
+        entry['status'] = status
+        entry['updated'] = time.time()
+        if status == 'running':
+            entry['attempts'] += 1
+        else:
+            entry['error'] = error
+            entry['result'] = result
+        self.save()
+
+    def counts(self):
+        counts = {}
+        for entry in self.entries.values():
+            counts[entry['status']] = counts.get(entry['status'], 0) + 1
+        return counts
+
+    def save(self):
+        atomic_write_json(self.queue_file, self.entries, indent=1)
+
+
+def sync_repository(config_file):
+    """Sync one repository in a worker process and return the number of added, modified and removed files."""
+    with open(config_file, 'r') as file:
+        config = yaml.safe_load(file)
+    # Register this worker's share of the budgets before any client creates a limiter with defaults.
+    for name, limits in (config.get('rate_limits') or {}).items():
+        get_rate_limiter(name, **limits)
+    changes = IncrementalIndexer(config_file).sync()
+    return {key: len(paths) for key, paths in changes.items()}
+
+
+class MultiRepoIndexer:
+    """Incrementally index a list of repositories across a pool of worker processes.
+
+    Repositories are synced by IncrementalIndexer, whose per-repo manifest is
+    saved after every batch, so an interrupted repository resumes at its next
+    unindexed batch and the RepoQueue skips repositories already done. The
+    GitHub and embedding rate limits, loader workers, embedding concurrency
+    and extraction workers in the config are global budgets split evenly
+    between the worker processes.
+    """
+    worker = staticmethod(sync_repository)
+
+    def __init__(self, config_file='../config/config.yaml'):
+        self.config_file = config_file
+        self._parse_config(config_file)
+
+    def _parse_config(self, config_file):
+        """Parse the config file and assign instance variables."""
+        with open(config_file, 'r') as file:
+            self.config = yaml.safe_load(file)
+            multi_repo = self.config.get('multi_repo') or {}
+            self.repositories = multi_repo.get('repositories') or []
+            self.queue_file = multi_repo.get('queue_file', '../.cache/repo_queue.json')
+            self.processes = multi_repo.get('processes', 4)
+            self.max_attempts = multi_repo.get('max_attempts', 3)
+
+    def _worker_config(self, repository, processes):
+        """Config for one repository with every global budget divided by the number of processes."""
+        config = json.loads(json.dumps(self.config))
+        config['repository'] = {**(config.get('repository') or {}), **repository}
+        config['rate_limits'] = {name: {key: value / processes for key, value in limits.items()}
+                                 for name, limits in (config.get('rate_limits') or {}).items()}
+        for section, key, default in (('loader', 'max_workers', 8), ('embeddings', 'max_concurrency', 4),
+                                      ('extraction', 'num_workers', 8)):
+            config[section] = config.get(section) or {}
+            config[section][key] = max(1, config[section].get(key, default) // processes)
+        metrics = config['metrics'] = dict(config.get('metrics') or {})
+        # Workers would all bind the same port and overwrite the same file.
+        metrics['prometheus_port'] = None
+        if metrics.get('json_file'):
+            root, extension = os.path.splitext(metrics['json_file'])
+            metrics['json_file'] = f"{root}.{repository['owner']}_{repository['name']}{extension}"
+        return config
+
+    def _write_config(self, key, processes):
+        repository = self.queue.entries[key]['repository']
+        directory = os.path.join(os.path.dirname(os.path.abspath(self.queue_file)), 'repo_configs')
+        os.makedirs(directory, exist_ok=True)
+        config_file = os.path.join(directory, f"{repository['owner']}_{repository['name']}.yaml")
+        with open(config_file, 'w') as file:
+            yaml.safe_dump(self._worker_config(repository, processes), file)
+        return config_file
+
+    def _finish(self, key, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.exception("Sync of %s failed", key)
+            self.queue.mark(key, 'failed', error=f"{type(e).__name__}: {e}")
+        else:
+            logger.info("Synced %s: %s", key, result)
+            self.queue.mark(key, 'done', result=result)
+
+    def run(self, repositories=None, processes=None, restart=False):
+        """Sync every repository not yet done in this pass and return the queue status counts.
+
+        `repositories` overrides the configured list; `restart` starts a new
+        pass even if the previous one did not finish.
+        """
+        self.queue = RepoQueue(self.queue_file)
+        self.queue.sync_repositories(repositories or self.repositories, self.max_attempts, restart)
+        pending = self.queue.pending(self.max_attempts)
+        processes = max(1, min(processes or self.processes, len(pending) or 1))
+        logger.info("Syncing %d of %d repositories with %d processes", len(pending), len(self.queue.entries),
+                    processes)
+        # spawn: workers must not inherit the driver's threads and open connections.
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn')) as executor:
+            running = {}
+            while pending or running:
+                while pending and len(running) < processes:
+                    key = pending.pop(0)
+                    self.queue.mark(key, 'running')
+                    running[executor.submit(self.worker, self._write_config(key, processes))] = key
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    self._finish(key, future)
+                    if self.queue.entries[key]['status'] == 'failed' and \
+                            self.queue.entries[key]['attempts'] < self.max_attempts:
+                        pending.append(key)
+        counts = self.queue.counts()
+        logger.info("Multi-repository sync finished: %s", counts)
+        return counts
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    fire.Fire(MultiRepoIndexer)
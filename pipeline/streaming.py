@@ -0,0 +1,177 @@
+import logging
+import queue
+import threading
+import time
+import yaml
+import fire
+from llama_index.core.schema import MetadataMode
+from data.github_loader import GitHubRepoLoader
+from data.manifest import chunk_id
+from models.code_chunker import LlamaDoc
+from models.metadata import MetadataExtractors
+from utils.ingest import IngestPipeline
+from utils.metrics import get_metrics
+from vectordb.code_schema import chunk_metadata
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class _StageError:
+    def __init__(self, error):
+        self.error = error
+
+
+class StreamingIngestPipeline(IngestPipeline):
+    """Ingest a repository as a chain of generator stages joined by bounded queues.
+
+    loader -> Document builder -> splitter/extractors -> embedder -> Milvus insert.
+    Each stage runs on its own thread and blocks once its output queue is full,
+    so memory stays at roughly `queue_size` batches per stage and vectors become
+    searchable while the crawl is still running.
+    """
+
+    def __init__(self, config_file='../config/config.yaml', loader=None, db_handle=None, skip_extractors=None):
+        self.config_file = config_file
+        self.skip_extractors = skip_extractors
+        self._parse_config(config_file)
+        get_metrics().configure(**self.metrics_options)
+        self.loader = loader or GitHubRepoLoader(config_file)
+        self.db_handle = db_handle or self._create_db_handle()
+
+    def _parse_config(self, config_file):
+        """Parse the config file and assign instance variables."""
+        with open(config_file, 'r') as file:
+            config = yaml.safe_load(file)
+            self._parse_shared_config(config)
+            streaming = config.get('streaming') or {}
+            self.collection_name = streaming.get('collection', 'code_chunks')
+            self.batch_size = streaming.get('batch_size', 16)
+            self.queue_size = streaming.get('queue_size', 4)
+            self.bulk = streaming.get('bulk', False)
+
+    def run(self, path=""):
+        """Run the pipeline to completion and return the number of files and chunks inserted."""
+        start = time.perf_counter()
+        modules = self._threaded(self.loader.iter_repo(path, bulk=self.bulk))
+        documents = self._threaded(self._document_batches(modules))
+        nodes = self._threaded(self._extract(documents))
+        embedded = self._threaded(self._embed(nodes))
+        files = chunks = 0
+        try:
+            for file_count, ids, embeddings, metadata in embedded:
+                if ids:
+                    self.db_handle.insert_vectors(self.collection_name, embeddings, ids, metadata=metadata)
+                files += file_count
+                chunks += len(ids)
+                logger.info("Inserted %d chunks (%d files so far)", chunks, files)
+        finally:
+            # Stop the stage threads from the bottom up if the insert loop failed; each close
+            # waits for that stage's worker, so the stage above is idle when it is closed.
+            for stage in (embedded, nodes, documents, modules):
+                stage.close()
+        logger.info("Streamed %d files / %d chunks in %.1fs", files, chunks, time.perf_counter() - start)
+        if chunks:
+            self._invalidate_query_cache()
+        get_metrics().report(self.metrics_options.get('json_file'))
+        return {'files': files, 'chunks': chunks}
+
+    def _threaded(self, iterable):
+        """Drain `iterable` on a worker thread, handing items over through a bounded queue.
+
+        When the consumer stops early (an error downstream, or the generator is closed)
+        the worker is told to stop and its queue is drained so a blocked `put` returns;
+        the worker then closes `iterable` so e.g. the loader releases its connections.
+        """
+        items = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    items.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produce():
+            try:
+                for item in iterable:
+                    if not put(item):
+                        return
+            except BaseException as e:
+                put(_StageError(e))
+                return
+            finally:
+                close = getattr(iterable, 'close', None)
+                if close is not None:
+                    close()
+            put(_DONE)
+
+        worker = threading.Thread(target=produce, daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = items.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _StageError):
+                    raise item.error
+                yield item
+        finally:
+            stop.set()
+            while worker.is_alive():
+                try:
+                    items.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            worker.join()
+
+    def _document_batches(self, modules):
+        """Group modules into batches of `batch_size` Documents plus their blob shas."""
+        llama_doc = LlamaDoc(None, [], self.config_file)
+        documents, shas = [], {}
+        for module in modules:
+            documents.append(llama_doc.build_doc(module))
+            shas[module['path']] = module.get('sha')
+            if len(documents) >= self.batch_size:
+                yield documents, shas
+                documents, shas = [], {}
+        if documents:
+            yield documents, shas
+
+    def _extract(self, document_batches):
+        extractors = MetadataExtractors(None, self.config_file, self.skip_extractors)
+        for documents, shas in document_batches:
+            yield len(documents), shas, extractors.extract_metadata(documents)
+
+    def _embed(self, node_batches):
+        repo = f"{self.repo_owner}/{self.repo_name}"
+        for file_count, shas, nodes in node_batches:
+            ids = []
+            chunk_index = {}
+            for node in nodes:
+                path = node.metadata['file_path']
+                chunk_index[path] = chunk_index.get(path, -1) + 1
+                ids.append(chunk_id(repo, path, shas[path], chunk_index[path]))
+            texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+            metadata = [chunk_metadata(node.metadata, node.get_content()) for node in nodes]
+            yield file_count, ids, self._embed_texts(texts, ids), metadata
+
+    def _embed_texts(self, texts, ids):
+        """Embed through the handle's scheduler (token-bounded, concurrent, shrinking on 429) when it has one."""
+        if not texts:
+            return []
+        scheduler = getattr(self.db_handle, 'embedding_scheduler', None)
+        if scheduler is None:
+            return self.db_handle.create_embeddings(texts)
+        embeddings = {}
+        for batch_ids, batch_embeddings in scheduler.run(texts, ids):
+            embeddings.update(zip(batch_ids, batch_embeddings))
+        return [embeddings[row_id] for row_id in ids]
+
+
+if __name__ == '__main__':
+    fire.Fire(StreamingIngestPipeline)
@@ -1,5 +1,12 @@
+import argparse
+import json
 import sys
-import platform
+import urllib.error
+
+# utils.ingest only imports the standard library, so the client starts instantly;
+# models, embeddings and Milvus stay warm in the query server (src/server.py).
+from utils.ingest import DEFAULT_SERVER, request
+
 
 def print_banner():
     print("Welcome to Code Assistant Based on Llama-Index OSS Framework!")
@@ -11,32 +18,53 @@ def check_python_version(required_version):
         return False
     return True
 
-def check_pip_modules(required_modules):
-    installed_modules = [module.split('==')[0] for module in sys.modules.keys()]
-    missing_modules = [module for module in required_modules if module not in installed_modules]
-    if missing_modules:
-        print("The following pip modules are required but not installed:")
-        for module in missing_modules:
-            print(f"- {module}")
-        return False
-    return True
+def search(query, server=DEFAULT_SERVER, top_k=None, filters=None):
+    return request(server, '/search', {'query': query, 'top_k': top_k, 'filters': filters})
+
+def print_results(response):
+    for rank, row in enumerate(response['results'], 1):
+        score = row.get('rerank_score', row['score'])
+        location = row.get('github_url') or row.get('file_path') or row['id']
+        print(f"{rank:>2}. {score:.4f}  {location}")
+    print(f"({len(response['results'])} results in {response['took_ms']:.1f} ms)")
 
-def main():
-    print_banner()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search an indexed codebase through the query server.")
+    parser.add_argument('query', nargs='*', help="search text; omit to check the server")
+    parser.add_argument('--server', default=DEFAULT_SERVER)
+    parser.add_argument('--top_k', type=int)
+    parser.add_argument('--repo', help="owner/name of the repository to search")
+    parser.add_argument('--extension', action='append', help="file extension to search, e.g. .py (repeatable)")
+    parser.add_argument('--path_prefix')
+    parser.add_argument('--json', action='store_true', help="print the raw JSON response")
+    args = parser.parse_args(argv)
 
     # Check Python version
     required_python_version = (3, 7)  # Example: Python 3.7 or higher
     if not check_python_version(required_python_version):
-        return
-
-    # Check required pip modules
-    required_pip_modules = ["numpy", "pandas", "matplotlib"]  # Example: Required pip modules
-    if not check_pip_modules(required_pip_modules):
-        return
-    
-    print("Python version and pip modules are ready!")
+        return 1
 
-    # Call the backend application
+    try:
+        if not args.query:
+            print_banner()
+            health = request(args.server, '/health')
+            print(f"Query server at {args.server} is {health['status']} (collection: {health['collection']})")
+            return 0
+        filters = {key: value for key, value in (('repo', args.repo), ('extensions', args.extension),
+                                                 ('path_prefix', args.path_prefix)) if value}
+        response = search(' '.join(args.query), args.server, args.top_k, filters or None)
+    except urllib.error.HTTPError as e:
+        print(f"Query server error {e.code}: {e.read().decode('utf-8', 'replace')}", file=sys.stderr)
+        return 1
+    except urllib.error.URLError as e:
+        print(f"Query server at {args.server} is not reachable ({e.reason}). Start it with: "
+              "python -m src.server --config_file=config/config.yaml", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(response, indent=2))
+    else:
+        print_results(response)
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
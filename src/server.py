@@ -0,0 +1,181 @@
+import json
+import logging
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import fire
+import yaml
+
+from utils.metrics import get_metrics
+from vectordb.code_schema import TEXT_FIELD, build_filter
+
+logger = logging.getLogger(__name__)
+
+
+class QueryService:
+    """Warm search state shared by every request: the Milvus connection, embedding client, reranker and query cache.
+
+    Reranking needs the chunk text, so it only runs when `rerank.text_field`
+    (default `text`, where code-chunk collections keep it) names a scalar
+    field of the collection holding it; the ANN search then
+    fetches `rerank.max_candidates` hits and the reranked list is cut to top_k.
+    """
+
+    def __init__(self, config_file='../config/config.yaml', db_handle=None):
+        self._parse_config(config_file)
+        get_metrics().configure(**self.metrics_options)
+        self.db_handle = db_handle or self._create_db_handle()
+
+    def _parse_config(self, config_file):
+        """Parse the config file and assign instance variables."""
+        with open(config_file, 'r') as file:
+            config = yaml.safe_load(file)
+            self.dimensions = (config.get('embeddings') or {}).get('dimensions')
+            self.rate_limit = (config.get('rate_limits') or {}).get('openai', {})
+            self.metrics_options = config.get('metrics') or {}
+            server = config.get('server') or {}
+            self.host = server.get('host', '127.0.0.1')
+            self.port = server.get('port', 8765)
+            self.milvus_host = server.get('milvus_host', 'localhost')
+            self.milvus_port = server.get('milvus_port', '19530')
+            self.collection_name = server.get('collection', 'code_chunks')
+            self.top_k = server.get('top_k', 10)
+            self.metric_type = server.get('metric_type', 'IP')
+            self.search_params = {'params': server.get('search_params') or {}}
+            self.output_fields = list(server.get('output_fields') or [])
+            self.rerank_options = server.get('rerank') or {}
+            self.query_cache_options = server.get('query_cache')
+        self.text_field = self.rerank_options.get('text_field', TEXT_FIELD['name'])
+        if self.text_field and self.text_field not in self.output_fields:
+            self.output_fields.append(self.text_field)
+        self.rerank = bool(self.text_field and
+                           (self.rerank_options.get('model') or self.rerank_options.get('onnx_model')))
+        self.max_candidates = self.rerank_options.get('max_candidates', 50)
+
+    def _create_db_handle(self):
+        # Only needed when no handle is injected.
+        from vectordb.milvusdb_handle import MilvusDBHandle
+
+        start = time.perf_counter()
+        db_handle = MilvusDBHandle(self.milvus_host, self.milvus_port, dimensions=self.dimensions,
+                                   rate_limit=self.rate_limit)
+        db_handle.create_openai_embedding_function()
+        if self.query_cache_options is not None:
+            db_handle.enable_query_cache(**self.query_cache_options)
+        if self.rerank:
+            options = {'max_candidates': self.max_candidates,
+                       'cache_size': self.rerank_options.get('cache_size', 100000)}
+            if self.rerank_options.get('onnx_model'):
+                db_handle.create_onnx_reranker(self.rerank_options['onnx_model'],
+                                               num_threads=self.rerank_options.get('num_threads'), **options)
+            else:
+                db_handle.create_reranker(self.rerank_options['model'], device=self.rerank_options.get('device'),
+                                          **options)
+        db_handle.load_collection(self.collection_name)
+        logger.info("Query service ready in %.1fs", time.perf_counter() - start)
+        return db_handle
+
+    def _rows(self, query, results):
+        """Turn the hits of one query into JSON rows, reranked when configured. Runs before results are cached."""
+        rows = [{'id': hit.id, 'score': hit.distance, **{field: hit.entity.get(field) for field in self.output_fields}}
+                for hit in results[0]]
+        if self.rerank and rows:
+            reranked = self.db_handle.rerank_results(query, [row[self.text_field] or '' for row in rows])
+            rows = [{**rows[result.index], 'rerank_score': result.score} for result in reranked]
+        return rows
+
+    def search(self, query, top_k=None, filters=None):
+        """Search `query`; `filters` is a Milvus expression or build_filter keyword arguments."""
+        start = time.perf_counter()
+        top_k = top_k or self.top_k
+        if isinstance(filters, dict):
+            filters = build_filter(**filters)
+        # Cached entries hold the full candidate list so requests with any top_k can share them.
+        candidates = max(top_k, self.max_candidates) if self.rerank else top_k
+        rows = self.db_handle.search_text(self.collection_name, query, candidates, self.metric_type, self.search_params,
+                                          filters, postprocess=self._rows, output_fields=self.output_fields)
+        return {'results': rows[:top_k], 'took_ms': (time.perf_counter() - start) * 1000}
+
+    def invalidate(self, collection_name=None):
+        """Drop cached results after another process (an ingestion run) has written to the collection."""
+        query_cache = getattr(self.db_handle, 'query_cache', None)
+        if query_cache is not None:
+            query_cache.invalidate(collection_name)
+        logger.info("Query cache invalidated for %s", collection_name or 'all collections')
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """JSON API: POST /search {"query", "top_k", "filters"}, POST /invalidate {"collection"}, GET /health and
+    GET /metrics."""
+
+    def _send(self, status, body, content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/health':
+            self._send(200, {'status': 'ok', 'collection': self.server.service.collection_name})
+        elif path == '/metrics':
+            self._send(200, get_metrics().to_prometheus().encode('utf-8'), 'text/plain; version=0.0.4')
+        else:
+            self._send(404, {'error': f"Unknown path: {path}"})
+
+    def do_POST(self):
+        path = self.path.split('?')[0]
+        if path == '/invalidate':
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                self.server.service.invalidate((request or {}).get('collection'))
+            except (ValueError, AttributeError):
+                self._send(400, {'error': 'Expected a JSON body with an optional "collection" field'})
+                return
+            self._send(200, {'status': 'ok'})
+            return
+        if path != '/search':
+            self._send(404, {'error': f"Unknown path: {self.path}"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            query = request['query']
+        except (ValueError, KeyError, TypeError):
+            self._send(400, {'error': 'Expected a JSON body with a "query" field'})
+            return
+        try:
+            self._send(200, self.server.service.search(query, request.get('top_k'), request.get('filters')))
+        except Exception as e:
+            logger.exception("Search failed")
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class QueryServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, service, host=None, port=None):
+        super().__init__((host or service.host, service.port if port is None else port), QueryHandler)
+        self.service = service
+
+
+def serve(config_file='../config/config.yaml', host=None, port=None):
+    """Start the query service and answer requests until interrupted."""
+    server = QueryServer(QueryService(config_file), host, port)
+    logger.info("Serving queries on http://%s:%d", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    fire.Fire(serve)
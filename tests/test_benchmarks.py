@@ -0,0 +1,41 @@
+import tempfile
+import unittest
+import numpy as np
+from benchmarks.fake_embedding import FakeEmbeddingFunction
+from benchmarks.fake_github import FakeGitHubServer, synthetic_repo
+from benchmarks.run import _write_config, compare, run_size
+from data.github_loader import GitHubRepoLoader
+
+
+class TestBenchmarkStandIns(unittest.TestCase):
+
+    def test_loader_reads_the_fake_server(self):
+        files = synthetic_repo(30, files_per_dir=10)
+        with tempfile.TemporaryDirectory() as tmp_dir, FakeGitHubServer(files) as server:
+            config_file = _write_config(tmp_dir, server.url, server.owner, server.name, 16, 512)
+            loader = GitHubRepoLoader(config_file)
+            self.assertEqual(sorted(item['path'] for item in loader.list_files()), sorted(files))
+            modules = list(loader.iter_repo())
+            bulk_modules = list(loader.iter_repo(bulk=True))
+        self.assertEqual(len(modules), 30)
+        self.assertEqual(sorted(m['path'] for m in bulk_modules), sorted(m['path'] for m in modules))
+        self.assertEqual(modules[0]['content'], files[modules[0]['path']].decode('utf-8').splitlines())
+
+    def test_fake_embeddings_are_deterministic_unit_vectors(self):
+        first = FakeEmbeddingFunction(64).encode_documents(["a", "b"])
+        second = FakeEmbeddingFunction(64).encode_documents(["a"])
+        np.testing.assert_array_equal(first[0], second[0])
+        self.assertAlmostEqual(float(np.linalg.norm(first[1])), 1.0, places=5)
+
+    def test_compare_flags_regressions_in_the_right_direction(self):
+        baseline = {'results': [{'size': 10, 'files_per_second': 100.0, 'query_p99_ms': 1.0}]}
+        current = {'results': [{'size': 10, 'files_per_second': 80.0, 'query_p99_ms': 0.5}]}
+        report = compare(current, baseline, tolerance=0.1)
+        self.assertEqual([entry['metric'] for entry in report['regressions']], ['files_per_second'])
+
+    def test_run_size_end_to_end(self):
+        result = run_size(20, queries=10, dimensions=32)
+        self.assertEqual(result['files'], 20)
+        self.assertGreater(result['chunks'], 0)
+        self.assertLessEqual(result['query_p50_ms'], result['query_p99_ms'])
+        self.assertIn('split', result['stages'])
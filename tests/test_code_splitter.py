@@ -0,0 +1,57 @@
+import unittest
+from llama_index.core.schema import Document
+from models.code_splitter import ASTCodeSplitter
+
+
+def _function(name, statements):
+    body = "".join(f"    value_{i} = compute_something({i}, 'argument number {i}')\n" for i in range(statements))
+    return f"def {name}():\n{body}    return None\n"
+
+
+class TestASTCodeSplitter(unittest.TestCase):
+
+    def test_small_definitions_are_merged(self):
+        source = "import os\n\n\n" + "\n\n".join(_function(f"f{i}", 1) for i in range(5))
+        chunks = ASTCodeSplitter(chunk_size=512).split_text(source)
+        self.assertEqual(chunks, [source.strip("\n")])
+
+    def test_chunks_follow_function_boundaries(self):
+        source = "\n\n".join(_function(f"f{i}", 8) for i in range(6))
+        chunks = ASTCodeSplitter(chunk_size=200).split_text(source)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertTrue(chunk.startswith("def "))
+            self.assertTrue(chunk.endswith("return None"))
+        self.assertEqual("".join(chunks).count("def "), 6)
+
+    def test_oversized_class_is_split_into_methods(self):
+        methods = "\n".join("    " + line for f in range(4) for line in _function(f"m{f}", 8).splitlines(True))
+        source = "@decorator\nclass Big:\n    '''Docstring.'''\n\n" + methods
+        chunks = ASTCodeSplitter(chunk_size=150).split_text(source)
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(chunks[0].startswith("@decorator\nclass Big:"))
+        self.assertEqual(sum(chunk.count("def m") for chunk in chunks), 4)
+        for chunk in chunks[1:]:
+            self.assertTrue(chunk.lstrip().startswith("def m"))
+
+    def test_oversized_function_falls_back_to_line_windows(self):
+        splitter = ASTCodeSplitter(chunk_size=64)
+        chunks = splitter.split_text(_function("huge", 40))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(splitter._count(chunk) <= 64 for chunk in chunks))
+
+    def test_overlap_repeats_trailing_lines(self):
+        source = "\n\n".join(_function(f"f{i}", 8) for i in range(3))
+        chunks = ASTCodeSplitter(chunk_size=150, chunk_overlap=10).split_text(source)
+        self.assertTrue(chunks[1].startswith("    return None"))
+
+    def test_unparseable_and_unknown_files_use_token_splitting(self):
+        splitter = ASTCodeSplitter(chunk_size=512)
+        self.assertEqual(splitter.split_code("def broken(:\n", ".py"), ["def broken(:"])
+        self.assertEqual(splitter.split_code("# Title\n\nSome text.", ".md"), ["# Title\n\nSome text."])
+
+    def test_nodes_keep_document_metadata(self):
+        document = Document(text=_function("f", 1), metadata={"file_path": "a.py", "extension": ".py"})
+        nodes = ASTCodeSplitter().get_nodes_from_documents([document])
+        self.assertEqual(len(nodes), 1)
+        self.assertEqual(nodes[0].metadata["file_path"], "a.py")
@@ -0,0 +1,53 @@
+import unittest
+from data.file_filter import FileFilter, is_binary
+
+
+class TestFileFilter(unittest.TestCase):
+
+    def test_empty_options_allow_text_files(self):
+        file_filter = FileFilter({})
+        self.assertTrue(file_filter.allow_dir("src"))
+        self.assertTrue(file_filter.allow_file("src/app.py", 100))
+        self.assertFalse(file_filter.allow_file("docs/logo.png", 100))
+
+    def test_exclusions(self):
+        file_filter = FileFilter({
+            'exclude_files': ['package-lock.json', '*.min.js'],
+            'exclude_folders': ['node_modules', 'docs/generated'],
+            'exclude_file_extensions': ['.lock'],
+            'max_file_size_kb': 1,
+        })
+        self.assertFalse(file_filter.allow_dir("web/node_modules"))
+        self.assertFalse(file_filter.allow_dir("docs/generated"))
+        self.assertTrue(file_filter.allow_dir("docs"))
+        self.assertFalse(file_filter.allow_file("web/node_modules/x/index.js"))
+        self.assertFalse(file_filter.allow_file("package-lock.json"))
+        self.assertFalse(file_filter.allow_file("static/app.min.js"))
+        self.assertFalse(file_filter.allow_file("Cargo.lock"))
+        self.assertFalse(file_filter.allow_file("big.py", 4096))
+        self.assertTrue(file_filter.allow_file("small.py", 512))
+
+    def test_inclusions(self):
+        file_filter = FileFilter({
+            'include_files': ['README.md'],
+            'include_folders': ['src/app'],
+            'include_file_extensions': ['.py'],
+        })
+        self.assertTrue(file_filter.allow_file("README.md"))
+        self.assertTrue(file_filter.allow_file("src/app/main.py"))
+        self.assertFalse(file_filter.allow_file("src/app/notes.txt"))
+        self.assertFalse(file_filter.allow_file("tests/test_main.py"))
+
+    def test_include_folders_limit_traversal(self):
+        file_filter = FileFilter({'include_folders': ['src/app']})
+        self.assertTrue(file_filter.allow_dir("src"))
+        self.assertTrue(file_filter.allow_dir("src/app/models"))
+        self.assertFalse(file_filter.allow_dir("tests"))
+
+    def test_is_binary(self):
+        self.assertTrue(is_binary(b"\x89PNG\r\n\x1a\n\x00\x00"))
+        self.assertFalse(is_binary("def main():\n    pass\n".encode("utf-8")))
+
+
+if __name__ == '__main__':
+    unittest.main()
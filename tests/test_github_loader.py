@@ -1,5 +1,8 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
+from data.file_filter import FileFilter
 from data.github_loader import GitHubRepoLoader
 class TestGitHubRepoLoader(unittest.TestCase):
 
@@ -38,5 +41,67 @@ class TestGitHubRepoLoader(unittest.TestCase):
         headers = loader._get_headers()
         self.assertNotIn('Authorization', headers)
 
+
+class TestGitHubRepoLoaderTraversal(unittest.TestCase):
+
+    listings = {
+        "": [
+            {"name": "src", "path": "src", "type": "dir"},
+            {"name": "README.md", "path": "README.md", "type": "file"},
+        ],
+        "src": [
+            {"name": "app.py", "path": "src/app.py", "type": "file"},
+            {"name": "util.py", "path": "src/util.py", "type": "file"},
+        ],
+    }
+
+    def setUp(self):
+        config = tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False)
+        config.write("repository:\n  owner: test_owner\n  name: test_repo\nloader:\n  max_workers: 4\n")
+        config.close()
+        self.addCleanup(os.remove, config.name)
+        self.loader = GitHubRepoLoader(config.name)
+        self.loader.get_file_list = MagicMock(side_effect=lambda path="": self.listings[path])
+        self.loader.get_file_data = MagicMock(side_effect=lambda path: (True, {"path": path}))
+
+    def test_traverse_repo_collects_nested_files(self):
+        graph, modules = self.loader.traverse_repo()
+        self.assertEqual(graph, {"test_repo": {"src": {"app.py": "file", "util.py": "file"}, "README.md": "file"}})
+        self.assertEqual([m["path"] for m in modules], ["src/app.py", "src/util.py", "README.md"])
+
+    def test_traverse_repo_concurrent_matches_sequential(self):
+        self.assertEqual(self.loader.traverse_repo_concurrent(), self.loader.traverse_repo())
+        self.assertEqual(self.loader.get_file_data.call_count, 6)
+
+    def test_traverse_repo_bulk_uses_tree_and_tarball(self):
+        self.loader.get_tree = MagicMock(return_value={"truncated": False, "tree": [
+            {"path": "src", "type": "tree", "sha": "t1"},
+            {"path": "src/app.py", "type": "blob", "sha": "b1", "size": 6},
+            {"path": "src/util.py", "type": "blob", "sha": "b2", "size": 6},
+            {"path": "README.md", "type": "blob", "sha": "b3", "size": 5},
+        ]})
+        self.loader.iter_tarball = MagicMock(return_value=iter([
+            ("README.md", b"# hi\n"), ("src/app.py", b"a = 1\n"), ("src/util.py", b"\xff\xfe"),
+        ]))
+        graph, modules = self.loader.traverse_repo_bulk()
+        self.assertEqual(graph, {"test_repo": {"src": {"app.py": "file", "util.py": "file"}, "README.md": "file"}})
+        self.assertEqual([m["path"] for m in modules], ["src/app.py", "README.md"])
+        self.assertEqual(modules[0]["content"], ["a = 1"])
+        self.assertEqual(modules[0]["sha"], "b1")
+        self.loader.get_file_data.assert_not_called()
+
+    def test_traverse_repo_skips_filtered_entries(self):
+        self.loader.file_filter = FileFilter({'exclude_folders': ['src'], 'exclude_files': ['README.md']})
+        graph, modules = self.loader.traverse_repo_concurrent()
+        self.assertEqual(graph, {"test_repo": {}})
+        self.loader.get_file_list.assert_called_once_with("")
+        self.loader.get_file_data.assert_not_called()
+
+    def test_iter_repo_streams_every_file(self):
+        self.loader.list_files = MagicMock(return_value=[{"path": f"f{i}.py"} for i in range(20)])
+        paths = sorted(module["path"] for module in self.loader.iter_repo())
+        self.assertEqual(paths, sorted(f"f{i}.py" for i in range(20)))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
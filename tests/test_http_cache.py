@@ -0,0 +1,61 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock
+from data.github_loader import GitHubRepoLoader
+from data.http_cache import HTTPCache
+
+
+class TestHTTPCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_put_and_get_survive_restart(self):
+        HTTPCache(self.tmp_dir.name).put("https://api/x", '"etag-1"', '{"a": 1}')
+        self.assertEqual(HTTPCache(self.tmp_dir.name).get("https://api/x"), ('"etag-1"', '{"a": 1}'))
+        self.assertIsNone(HTTPCache(self.tmp_dir.name).get("https://api/y"))
+
+    def test_evicts_least_recently_used(self):
+        cache = HTTPCache(self.tmp_dir.name, max_bytes=250)
+        cache.put("a", "e", "x" * 60)
+        time.sleep(0.01)
+        cache.put("b", "e", "x" * 60)
+        time.sleep(0.01)
+        cache.get("a")
+        cache.put("c", "e", "x" * 60)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertLessEqual(cache.total_bytes, 250)
+
+
+class TestGitHubRepoLoaderCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        config = os.path.join(self.tmp_dir.name, "config.yaml")
+        with open(config, "w") as file:
+            file.write(f"repository:\n  owner: o\n  name: r\nloader:\n  cache_dir: {self.tmp_dir.name}/http\n")
+        self.loader = GitHubRepoLoader(config)
+
+    def _response(self, status_code, body=None, etag=None):
+        response = MagicMock(status_code=status_code, text=body, headers={'ETag': etag} if etag else {})
+        response.json.return_value = [{"name": "a.py"}]
+        return response
+
+    def test_not_modified_response_is_served_from_cache(self):
+        self.loader.session.get = MagicMock(side_effect=[
+            self._response(200, '[{"name": "a.py"}]', '"v1"'),
+            self._response(304),
+        ])
+        self.assertEqual(self.loader.get_file_list(), [{"name": "a.py"}])
+        self.assertEqual(self.loader.get_file_list(), [{"name": "a.py"}])
+        self.assertEqual(self.loader.session.get.call_args.kwargs['headers'], {'If-None-Match': '"v1"'})
+        self.assertEqual((self.loader.cache.hits, self.loader.cache.misses), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+from data.manifest import RepoManifest, chunk_id
+
+
+class TestRepoManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.manifest_file = os.path.join(self.tmp_dir.name, "manifests", "repo.json")
+
+    def test_diff_detects_added_modified_and_removed(self):
+        manifest = RepoManifest(self.manifest_file)
+        manifest.update("a.py", "sha-a", [1, 2])
+        manifest.update("b.py", "sha-b", [3])
+        added, modified, removed = manifest.diff([
+            {"path": "a.py", "sha": "sha-a"},
+            {"path": "b.py", "sha": "sha-b2"},
+            {"path": "c.py", "sha": "sha-c"},
+        ])
+        self.assertEqual(added, ["c.py"])
+        self.assertEqual(modified, ["b.py"])
+        self.assertEqual(removed, [])
+        self.assertEqual(manifest.diff([])[2], ["a.py", "b.py"])
+
+    def test_save_and_reload(self):
+        manifest = RepoManifest(self.manifest_file)
+        manifest.update("a.py", "sha-a", [1, 2])
+        manifest.save()
+        reloaded = RepoManifest(self.manifest_file)
+        self.assertEqual(reloaded.vector_ids(["a.py", "missing.py"]), [1, 2])
+
+    def test_chunk_id_is_stable_and_positive(self):
+        first = chunk_id("owner/repo", "a.py", "sha", 0)
+        self.assertEqual(first, chunk_id("owner/repo", "a.py", "sha", 0))
+        self.assertNotEqual(first, chunk_id("owner/repo", "a.py", "sha", 1))
+        self.assertGreaterEqual(first, 0)
+        self.assertLess(first, 2 ** 63)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from llama_index.core.llms import MockLLM
+from llama_index.core.async_utils import run_jobs
+from llama_index.core.extractors import QuestionsAnsweredExtractor
+from llama_index.core.schema import Document
+from models.metadata import MetadataExtractors
+
+
+class TestMetadataExtractors(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.config_file = os.path.join(self.tmp_dir.name, "config.yaml")
+        with open(self.config_file, "w") as file:
+            file.write("repository:\n  owner: o\n  name: r\n"
+                       f"extraction:\n  num_workers: 2\n  cache_file: {self.tmp_dir.name}/extraction.sqlite\n")
+        self.documents = [Document(text=f"def f{i}():\n    return {i}\n", metadata={"file_path": f"{i}.py"})
+                          for i in range(3)]
+        patcher = patch.object(MetadataExtractors, '_create_llm', lambda self: MockLLM(max_tokens=5))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unchanged_nodes_reuse_cached_metadata(self):
+        first = MetadataExtractors(self.documents, self.config_file).extract_metadata()
+        self.assertIn('questions_this_excerpt_can_answer', first[0].metadata)
+        extractors = MetadataExtractors(self.documents, self.config_file)
+        with patch('models.metadata.run_jobs') as mock_run_jobs:
+            second = extractors.extract_metadata()
+        mock_run_jobs.assert_not_called()
+        self.assertEqual([node.metadata for node in second], [node.metadata for node in first])
+        # One title entry per document plus one questions entry per node.
+        self.assertEqual((extractors.cache.hits, extractors.cache.misses), (6, 0))
+
+    def _re_extract_edited(self, functions, edited):
+        """Extract a document of `functions`, edit function `edited`, and re-extract it with a fresh LLM."""
+        with open(self.config_file, "a") as file:
+            file.write("chunking:\n  chunk_size: 32\n")
+        source = "".join(f"def g{i}(value):\n    return value + {i} * {i} - {i}\n\n\n" for i in range(functions))
+        documents = [Document(text=source, metadata={"file_path": "g.py"}), self.documents[0]]
+        first = MetadataExtractors(documents, self.config_file).extract_metadata()
+        self.assertEqual(len([node for node in first if node.ref_doc_id == documents[0].doc_id]), functions)
+
+        documents[0] = Document(text=source.replace(f"+ {edited}", f"- {edited}"), metadata={"file_path": "g.py"},
+                                doc_id=documents[0].doc_id)
+        llm = MockLLM(max_tokens=5)
+        questioned = []
+        extract = QuestionsAnsweredExtractor.extract
+
+        def record_questions(extractor, nodes, **kwargs):
+            questioned.extend(node.get_content() for node in nodes)
+            return extract(extractor, nodes, **kwargs)
+
+        with patch.object(MetadataExtractors, '_create_llm', lambda self: llm), \
+                patch.object(MockLLM, 'apredict', side_effect=lambda *args, **kwargs: "new title"), \
+                patch.object(QuestionsAnsweredExtractor, 'extract', autospec=True, side_effect=record_questions), \
+                patch('models.metadata.run_jobs', wraps=run_jobs) as mock_run_jobs:
+            second = MetadataExtractors(documents, self.config_file).extract_metadata()
+        # Only the edited node is sent for questions.
+        self.assertEqual(questioned, [f"def g{edited}(value):\n    return value - {edited} * {edited} - {edited}"])
+        self.assertEqual(second[-1].metadata, first[-1].metadata)
+        return first, second, mock_run_jobs
+
+    def test_edit_within_title_nodes_re_titles_document(self):
+        first, second, mock_run_jobs = self._re_extract_edited(functions=4, edited=3)
+        # Only the changed document is re-titled, as one title job.
+        self.assertEqual(len(mock_run_jobs.call_args.args[0]), 1)
+        self.assertEqual(mock_run_jobs.call_args.kwargs['workers'], 2)
+        self.assertEqual({node.metadata['document_title'] for node in second[:4]}, {"new title"})
+        self.assertEqual([node.metadata['questions_this_excerpt_can_answer'] for node in second[:3]],
+                         [node.metadata['questions_this_excerpt_can_answer'] for node in first[:3]])
+
+    def test_edit_past_title_nodes_keeps_cached_title(self):
+        first, second, mock_run_jobs = self._re_extract_edited(functions=7, edited=6)
+        mock_run_jobs.assert_not_called()
+        self.assertEqual([node.metadata['document_title'] for node in second],
+                         [node.metadata['document_title'] for node in first])
+
+    def test_skip_extractors_only_splits(self):
+        with patch('models.metadata.run_jobs') as mock_run_jobs:
+            nodes = MetadataExtractors(self.documents, self.config_file, skip_extractors=True).extract_metadata()
+        mock_run_jobs.assert_not_called()
+        self.assertEqual(len(nodes), 3)
+        self.assertNotIn('document_title', nodes[0].metadata)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+from utils.metrics import Metrics
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics()
+
+    def test_stage_records_latency_and_counters(self):
+        with self.metrics.stage('embed', items=2) as stage:
+            stage.tokens = 40
+        self.metrics.count('embed', bytes=100)
+        entry = self.metrics.snapshot()['stages']['embed']
+        self.assertEqual((entry['count'], entry['items'], entry['bytes'], entry['tokens']), (1, 2, 100, 40))
+        self.assertEqual(sum(entry['buckets']), 1)
+
+    def test_stage_is_recorded_when_the_block_raises(self):
+        with self.assertRaises(RuntimeError):
+            with self.metrics.stage('fetch'):
+                raise RuntimeError
+        self.assertEqual(self.metrics.snapshot()['stages']['fetch']['count'], 1)
+
+    def test_cache_hit_rate(self):
+        self.metrics.cache('embeddings', hits=3, misses=1)
+        self.assertEqual(self.metrics.snapshot()['caches']['embeddings']['hit_rate'], 0.75)
+
+    def test_prometheus_histogram_is_cumulative(self):
+        for _ in range(3):
+            with self.metrics.stage('search'):
+                pass
+        text = self.metrics.to_prometheus()
+        self.assertIn('code_rag_stage_seconds_bucket{stage="search",le="+Inf"} 3', text)
+        self.assertIn('code_rag_stage_seconds_count{stage="search"} 3', text)
+
+    def test_serve_and_json_report(self):
+        with self.metrics.stage('insert', items=5):
+            pass
+        server = self.metrics.serve(0)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            self.assertIn('code_rag_stage_items_total{stage="insert"} 5', response.read().decode())
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'metrics.json')
+            self.metrics.report(path)
+            with open(path) as file:
+                self.assertEqual(json.load(file)['stages']['insert']['items'], 5)
+
+    def test_profiled_stages_write_pstats(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.metrics.configure(profile_stages=['split'], profile_dir=tmp_dir, trace_memory=True)
+            with self.metrics.stage('split'):
+                data = [str(i) for i in range(10000)]
+            with self.metrics.stage('embed'):
+                pass
+            self.assertEqual(self.metrics.dump_profiles(), [os.path.join(tmp_dir, 'split.pstats')])
+        self.assertGreater(self.metrics.snapshot()['stages']['split']['memory_peak_bytes'], 0)
+        self.assertEqual(len(data), 10000)
@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+import unittest
+import yaml
+from pipeline.multi_repo import MultiRepoIndexer, RepoQueue, parse_repository
+
+
+def fake_sync(config_file):
+    with open(config_file, 'r') as file:
+        config = yaml.safe_load(file)
+    if config['repository']['name'] == 'broken':
+        raise RuntimeError("listing failed")
+    return {'added': config['loader']['max_workers'], 'modified': 0, 'removed': 0}
+
+
+class TestMultiRepo(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.queue_file = os.path.join(self.tmp_dir.name, 'queue.json')
+        config = {
+            'repository': {'owner': 'single', 'name': 'repo', 'api_url': 'http://localhost:1'},
+            'loader': {'max_workers': 8},
+            'rate_limits': {'github': {'rate': 50, 'capacity': 100}},
+            'embeddings': {'max_concurrency': 4},
+            'metrics': {'json_file': os.path.join(self.tmp_dir.name, 'metrics.json'), 'prometheus_port': 9100},
+            'multi_repo': {'queue_file': self.queue_file, 'processes': 2, 'max_attempts': 2,
+                           'repositories': ['acme/api', 'acme/web@main', {'owner': 'acme', 'name': 'broken'}]},
+        }
+        self.config_file = os.path.join(self.tmp_dir.name, 'config.yaml')
+        with open(self.config_file, 'w') as file:
+            yaml.safe_dump(config, file)
+
+    def test_parse_repository(self):
+        self.assertEqual(parse_repository('acme/web@main'), {'owner': 'acme', 'name': 'web', 'ref': 'main'})
+        self.assertEqual(parse_repository({'owner': 'acme', 'name': 'api'})['ref'], 'HEAD')
+        with self.assertRaises(ValueError):
+            parse_repository('acme')
+
+    def test_queue_resumes_interrupted_run_and_starts_new_pass(self):
+        queue = RepoQueue(self.queue_file)
+        queue.sync_repositories(['acme/api', 'acme/web'], max_attempts=3)
+        queue.mark('acme/api', 'done', result={'added': 1})
+        queue.mark('acme/web', 'running')
+
+        reopened = RepoQueue(self.queue_file)
+        self.assertEqual(reopened.entries['acme/web']['status'], 'pending')
+        reopened.sync_repositories(['acme/api', 'acme/web'], max_attempts=3)
+        self.assertEqual(reopened.pending(max_attempts=3), ['acme/web'])
+        reopened.mark('acme/web', 'done')
+        reopened.sync_repositories(['acme/api', 'acme/web'], max_attempts=3)
+        self.assertEqual(reopened.pending(max_attempts=3), ['acme/api', 'acme/web'])
+
+    def test_worker_config_splits_global_budgets(self):
+        indexer = MultiRepoIndexer(self.config_file)
+        config = indexer._worker_config({'owner': 'acme', 'name': 'api', 'ref': 'HEAD'}, processes=4)
+        self.assertEqual(config['repository'], {'owner': 'acme', 'name': 'api', 'ref': 'HEAD',
+                                                'api_url': 'http://localhost:1'})
+        self.assertEqual(config['rate_limits']['github'], {'rate': 12.5, 'capacity': 25})
+        self.assertEqual(config['loader']['max_workers'], 2)
+        self.assertEqual(config['embeddings']['max_concurrency'], 1)
+        self.assertIsNone(config['metrics']['prometheus_port'])
+        self.assertTrue(config['metrics']['json_file'].endswith('metrics.acme_api.json'))
+
+    def test_run_retries_failures_and_skips_finished_repositories(self):
+        indexer = MultiRepoIndexer(self.config_file)
+        indexer.worker = fake_sync
+        self.assertEqual(indexer.run(), {'done': 2, 'failed': 1})
+        with open(self.queue_file, 'r') as file:
+            entries = json.load(file)
+        self.assertEqual(entries['acme/api']['result'], {'added': 4, 'modified': 0, 'removed': 0})
+        self.assertEqual(entries['acme/broken']['attempts'], 2)
+        self.assertIn('listing failed', entries['acme/broken']['error'])
+
+        # A driver killed while syncing acme/web resumes with it alone.
+        entries['acme/web']['status'] = 'running'
+        with open(self.queue_file, 'w') as file:
+            json.dump(entries, file)
+        self.assertEqual(indexer.run(), {'done': 2, 'failed': 1})
+        resumed = RepoQueue(self.queue_file).entries
+        self.assertEqual(resumed['acme/api']['updated'], entries['acme/api']['updated'])
+        self.assertEqual(resumed['acme/web']['attempts'], 2)
+        self.assertEqual(resumed['acme/broken']['attempts'], 2)
+
+        # Once nothing is left, the next run starts a new pass over every repository.
+        indexer.run()
+        self.assertEqual(RepoQueue(self.queue_file).entries['acme/web']['attempts'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import time
+import unittest
+from utils.rate_limiter import RateLimiter, get_rate_limiter
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_acquire_within_capacity_does_not_block(self):
+        limiter = RateLimiter(rate=1, capacity=5)
+        start = time.monotonic()
+        for _ in range(5):
+            limiter.acquire()
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_acquire_waits_for_refill(self):
+        limiter = RateLimiter(rate=20, capacity=1)
+        limiter.acquire()
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+    def test_retry_after_header_pauses_callers(self):
+        limiter = RateLimiter()
+        self.assertEqual(limiter.update_from_headers({'Retry-After': '0.1'}), 0.1)
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_github_reset_header(self):
+        limiter = RateLimiter()
+        delay = limiter.update_from_headers({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(time.time() + 30)})
+        self.assertAlmostEqual(delay, 30, delta=1)
+
+    def test_openai_reset_header(self):
+        limiter = RateLimiter()
+        delay = limiter.update_from_headers({'x-ratelimit-remaining-requests': '0', 'x-ratelimit-reset-requests': '1m2s'})
+        self.assertEqual(delay, 62)
+
+    def test_no_backoff_when_quota_remains(self):
+        limiter = RateLimiter()
+        self.assertIsNone(limiter.update_from_headers({'X-RateLimit-Remaining': '4999'}))
+        self.assertEqual(limiter.paused_until, 0.0)
+
+    def test_get_rate_limiter_is_shared(self):
+        self.assertIs(get_rate_limiter('test-shared'), get_rate_limiter('test-shared'))
+
+    def test_get_rate_limiter_applies_configured_limits_to_existing_limiter(self):
+        limiter = get_rate_limiter('test-reconfigure')
+        self.assertEqual((limiter.rate, limiter.capacity), (50.0, 100.0))
+        with self.assertLogs('utils.rate_limiter', level='WARNING'):
+            self.assertIs(get_rate_limiter('test-reconfigure', rate=5, capacity=10), limiter)
+        self.assertEqual((limiter.rate, limiter.capacity, limiter.tokens), (5.0, 10.0, 10.0))
+        # Callers without limits share the limiter as configured.
+        get_rate_limiter('test-reconfigure')
+        self.assertEqual((limiter.rate, limiter.capacity), (5.0, 10.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+from collections import namedtuple
+import yaml
+from src import main
+from src.server import QueryServer, QueryService
+from utils.ingest import invalidate
+
+Hit = namedtuple('Hit', ['id', 'distance', 'entity'])
+RerankResult = namedtuple('RerankResult', ['text', 'score', 'index'])
+
+
+class FakeDBHandle:
+    def __init__(self):
+        self.searches = []
+
+    def search_text(self, collection_name, query, top_k, metric_type, params, filters=None, postprocess=None,
+                    output_fields=None):
+        self.searches.append({'top_k': top_k, 'filters': filters, 'output_fields': output_fields, 'params': params})
+        hits = [Hit(i, 1.0 - i / 100, {'file_path': f"f{i}.py", 'text': f"chunk {i}"}) for i in range(top_k)]
+        return postprocess(query, [hits])
+
+    def rerank_results(self, query, texts, top_k=None):
+        # Reverse the ANN order so reranking is visible.
+        return [RerankResult(text, float(index), index) for index, text in reversed(list(enumerate(texts)))]
+
+
+class TestQueryServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.config_file = os.path.join(self.tmp_dir.name, 'config.yaml')
+        config = {'server': {'collection': 'chunks', 'top_k': 3, 'search_params': {'nprobe': 8},
+                             'output_fields': ['file_path'],
+                             'rerank': {'onnx_model': 'model.onnx', 'text_field': 'text', 'max_candidates': 5}}}
+        with open(self.config_file, 'w') as file:
+            yaml.safe_dump(config, file)
+        self.db_handle = FakeDBHandle()
+        self.server = QueryServer(QueryService(self.config_file, self.db_handle), port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = 'http://%s:%d' % self.server.server_address[:2]
+
+    def test_search_reranks_candidates_and_cuts_to_top_k(self):
+        response = main.search('parse yaml', self.url, filters={'repo': 'acme/api', 'extensions': ['.py']})
+        self.assertEqual([row['id'] for row in response['results']], [4, 3, 2])
+        self.assertEqual(response['results'][0]['file_path'], 'f4.py')
+        self.assertEqual(self.db_handle.searches[0], {'top_k': 5, 'output_fields': ['file_path', 'text'],
+                                                      'filters': 'githubrepo == "acme/api" && extension in [".py"]',
+                                                      'params': {'params': {'nprobe': 8}}})
+
+    def test_health_and_errors(self):
+        self.assertEqual(main.request(self.url, '/health'), {'status': 'ok', 'collection': 'chunks'})
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            main.request(self.url, '/search', {'top_k': 3})
+        self.assertEqual(context.exception.code, 400)
+        self.assertEqual(main.main(['parse', 'yaml', '--server', self.url, '--top_k', '1']), 0)
+        self.assertEqual(main.main(['parse', '--server', 'http://127.0.0.1:1']), 1)
+
+    def test_rerank_reads_code_chunk_text_field_by_default(self):
+        with open(self.config_file, 'w') as file:
+            yaml.safe_dump({'server': {'rerank': {'onnx_model': 'model.onnx'}}}, file)
+        service = QueryService(self.config_file, self.db_handle)
+        self.assertTrue(service.rerank)
+        self.assertEqual(service.output_fields, ['text'])
+
+    def test_invalidate_drops_cached_results(self):
+        invalidated = []
+        self.db_handle.query_cache = type('Cache', (), {'invalidate': lambda cache, name: invalidated.append(name)})()
+        self.assertEqual(invalidate('chunks', self.url), {'status': 'ok'})
+        invalidate(server=self.url)
+        self.assertEqual(invalidated, ['chunks', None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from utils.sqlite_cache import SQLiteCache
+
+
+class TestSQLiteCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.cache_file = os.path.join(self.tmp_dir.name, "cache.sqlite")
+
+    def test_put_and_get_many(self):
+        cache = SQLiteCache(self.cache_file)
+        cache.put_many({"a": b"1", "b": b"2"})
+        self.assertEqual(cache.get_many(["a", "c", "b"]), {"a": b"1", "b": b"2"})
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        self.assertEqual(SQLiteCache(self.cache_file).get_many(["a"]), {"a": b"1"})
+
+    def test_evicts_least_recently_used(self):
+        cache = SQLiteCache(self.cache_file, max_entries=2)
+        cache.put_many({"a": b"1"})
+        time.sleep(0.01)
+        cache.put_many({"b": b"2"})
+        time.sleep(0.01)
+        cache.get_many(["a"])
+        time.sleep(0.01)
+        cache.put_many({"c": b"3"})
+        self.assertEqual(set(cache.get_many(["a", "b", "c"])), {"a", "c"})
+
+    def test_waits_for_a_writer_in_another_connection(self):
+        first = SQLiteCache(self.cache_file)
+        # Parallel multi-repo workers share the file, so the default wait is well above sqlite3's 5 s.
+        self.assertEqual(first.connection.execute("PRAGMA busy_timeout").fetchone()[0], 60000)
+        second = SQLiteCache(self.cache_file, timeout=5)
+        first.connection.execute("BEGIN IMMEDIATE")
+        first.connection.execute("INSERT INTO entries (key, value, last_used) VALUES ('a', x'31', 0)")
+        threading.Timer(0.2, first.connection.commit).start()
+        second.put_many({"b": b"2"})
+        self.assertEqual(set(first.get_many(["a", "b"])), {"a", "b"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import itertools
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import yaml
+from pipeline.streaming import StreamingIngestPipeline
+
+
+class FakeLoader:
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def iter_repo(self, path, bulk=False):
+        try:
+            for index in itertools.count():
+                yield {'path': f"src/module_{index}.py", 'sha': str(index)}
+        finally:
+            self.closed.set()
+
+
+def fake_extract(self, document_batches):
+    for documents, shas in document_batches:
+        yield len(documents), shas, documents
+
+
+def fake_embed(self, node_batches):
+    for file_count, shas, nodes in node_batches:
+        yield file_count, list(shas), [[0.0]] * len(nodes), [{}] * len(nodes)
+
+
+class TestStreamingIngestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.config_file = os.path.join(self.tmp_dir.name, 'config.yaml')
+        with open(self.config_file, 'w') as file:
+            yaml.safe_dump({'repository': {'owner': 'acme', 'name': 'api'},
+                            'streaming': {'batch_size': 1, 'queue_size': 1}}, file)
+
+    @mock.patch.object(StreamingIngestPipeline, '_embed', fake_embed)
+    @mock.patch.object(StreamingIngestPipeline, '_extract', fake_extract)
+    @mock.patch.object(StreamingIngestPipeline, '_document_batches')
+    def test_failed_insert_stops_every_stage(self, document_batches):
+        document_batches.side_effect = lambda modules: (
+            ([module], {module['path']: module['sha']}) for module in modules)
+        loader = FakeLoader()
+        db_handle = mock.Mock()
+        db_handle.insert_vectors.side_effect = [None, RuntimeError("insert failed")]
+        threads_before = threading.active_count()
+        pipeline = StreamingIngestPipeline(self.config_file, loader=loader, db_handle=db_handle)
+
+        with self.assertRaises(RuntimeError):
+            pipeline.run()
+
+        self.assertTrue(loader.closed.is_set())
+        self.assertEqual(threading.active_count(), threads_before)
+        self.assertEqual(db_handle.insert_vectors.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
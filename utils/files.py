@@ -0,0 +1,13 @@
+import json
+import os
+
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """Write `data` as JSON through a temporary file and os.replace, so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'w') as file:
+        json.dump(data, file, **dump_kwargs)
+    os.replace(tmp_file, path)
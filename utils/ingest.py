@@ -0,0 +1,68 @@
+import json
+import logging
+import os
+import urllib.request
+
+# Only the standard library is imported at module level so the CLI client
+# (src/main.py) can use the query-server calls without loading the pipelines.
+DEFAULT_SERVER = os.getenv('CODE_RAG_SERVER', 'http://127.0.0.1:8765')
+
+logger = logging.getLogger(__name__)
+
+
+def request(server, path, payload=None, timeout=30):
+    """Call the query server and return its decoded JSON response."""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    http_request = urllib.request.Request(server.rstrip('/') + path, data=data,
+                                          headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(http_request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def invalidate(collection=None, server=DEFAULT_SERVER):
+    """Ask the server to drop cached results for `collection` (all collections when None)."""
+    return request(server, '/invalidate', {'collection': collection}, timeout=5)
+
+
+class IngestPipeline:
+    """Config and Milvus handle setup shared by the streaming and incremental pipelines.
+
+    Subclasses call `_parse_shared_config` from their `_parse_config` and set
+    `collection_name` from their own section.
+    """
+
+    def _parse_shared_config(self, config):
+        """Assign the repository, embedding, metrics and query-server settings."""
+        embeddings = config.get('embeddings') or {}
+        self.repo_owner = config.get('repository', {}).get('owner')
+        self.repo_name = config.get('repository', {}).get('name')
+        self.embedding_cache_file = embeddings.get('cache_file')
+        self.embedding_cache_max_entries = embeddings.get('cache_max_entries', 1000000)
+        self.dimensions = embeddings.get('dimensions')
+        self.rate_limit = (config.get('rate_limits') or {}).get('openai', {})
+        self.embedding_scheduler_options = {key: value for key, value in embeddings.items()
+                                            if key in ('max_tokens_per_request', 'max_batch_size', 'max_concurrency')}
+        self.metrics_options = config.get('metrics') or {}
+        server = config.get('server')
+        self.query_server = (server.get('url') or f"http://{server.get('host', '127.0.0.1')}:"
+                                                  f"{server.get('port', 8765)}") if server else None
+
+    def _create_db_handle(self):
+        # Imported here so the query-server client does not load pymilvus.
+        from vectordb.milvusdb_handle import MilvusDBHandle
+
+        db_handle = MilvusDBHandle(dimensions=self.dimensions, rate_limit=self.rate_limit)
+        db_handle.create_openai_embedding_function()
+        db_handle.create_embedding_scheduler(**self.embedding_scheduler_options)
+        if self.embedding_cache_file:
+            db_handle.enable_embedding_cache(self.embedding_cache_file, self.embedding_cache_max_entries)
+        return db_handle
+
+    def _invalidate_query_cache(self):
+        """Tell a running query server to drop its cached results for the collection this run wrote to."""
+        if not self.query_server:
+            return
+        try:
+            invalidate(self.collection_name, self.query_server)
+        except OSError as e:
+            logger.info("Query server at %s not notified: %s", self.query_server, e)
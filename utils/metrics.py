@@ -0,0 +1,236 @@
+import bisect
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_profile_lock = threading.Lock()
+
+
+class _Stage:
+    """Handle yielded by `Metrics.stage`; callers may fill in counts once they are known."""
+
+    def __init__(self, items=0, bytes=0, tokens=0):
+        self.items = items
+        self.bytes = bytes
+        self.tokens = tokens
+
+
+class Metrics:
+    """Thread-safe registry of per-stage latency histograms, counters and cache hit rates.
+
+    Stages are timed with the `stage` context manager. Snapshots can be
+    written as JSON or served in the Prometheus text format, and selected
+    stages can be profiled with cProfile and/or tracemalloc.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.caches = {}
+        self.profile_stages = set()
+        self.profile_dir = None
+        self.trace_memory = False
+        self.profiles = {}
+        self.server = None
+
+    def configure(self, profile_stages=None, profile_dir='../.cache/profiles', trace_memory=False,
+                  prometheus_port=None, **kwargs):
+        """Apply the `metrics` config section; unknown keys (e.g. json_file) are left to the caller."""
+        self.profile_stages = set(profile_stages or [])
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        if prometheus_port and self.server is None:
+            self.serve(prometheus_port)
+
+    def _stage_entry(self, name):
+        if name not in self.stages:
+            self.stages[name] = {'count': 0, 'seconds': 0.0, 'buckets': [0] * (len(BUCKETS) + 1),
+                                 'items': 0, 'bytes': 0, 'tokens': 0, 'memory_peak_bytes': 0}
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name, items=0, bytes=0, tokens=0):
+        """Time the enclosed block as one call of stage `name`."""
+        handle = _Stage(items, bytes, tokens)
+        profiler = self._start_profile(name)
+        memory_before = self._start_trace(name)
+        start = time.perf_counter()
+        try:
+            yield handle
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = self._stop_trace(memory_before)
+            self._stop_profile(name, profiler)
+            with self.lock:
+                entry = self._stage_entry(name)
+                entry['count'] += 1
+                entry['seconds'] += elapsed
+                entry['buckets'][bisect.bisect_left(BUCKETS, elapsed)] += 1
+                entry['items'] += handle.items
+                entry['bytes'] += handle.bytes
+                entry['tokens'] += handle.tokens
+                entry['memory_peak_bytes'] = max(entry['memory_peak_bytes'], peak)
+
+    def count(self, name, items=0, bytes=0, tokens=0):
+        """Add to a stage's counters without timing anything."""
+        with self.lock:
+            entry = self._stage_entry(name)
+            entry['items'] += items
+            entry['bytes'] += bytes
+            entry['tokens'] += tokens
+
+    def cache(self, name, hits=0, misses=0):
+        """Count lookups against cache `name`."""
+        with self.lock:
+            entry = self.caches.setdefault(name, {'hits': 0, 'misses': 0})
+            entry['hits'] += hits
+            entry['misses'] += misses
+
+    def _start_profile(self, name):
+        if name not in self.profile_stages:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            # Only one profiler can be active at a time on Python 3.12+.
+            profiler.enable()
+        except ValueError:
+            return None
+        return profiler
+
+    def _stop_profile(self, name, profiler):
+        if profiler is None:
+            return
+        profiler.disable()
+        with _profile_lock:
+            self.profiles.setdefault(name, []).append(profiler)
+
+    def _start_trace(self, name):
+        if not self.trace_memory or name not in self.profile_stages:
+            return None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def _stop_trace(self, memory_before):
+        # Peaks are process-wide, so concurrent stages inflate each other's numbers.
+        if memory_before is None:
+            return 0
+        return max(0, tracemalloc.get_traced_memory()[1] - memory_before)
+
+    def dump_profiles(self):
+        """Write one pstats file per profiled stage to `profile_dir` and return their paths."""
+        import pstats
+
+        paths = []
+        with _profile_lock:
+            profiles, self.profiles = self.profiles, {}
+        if not profiles:
+            return paths
+        os.makedirs(self.profile_dir, exist_ok=True)
+        for name, profilers in profiles.items():
+            stats = pstats.Stats(profilers[0])
+            for profiler in profilers[1:]:
+                stats.add(profiler)
+            path = os.path.join(self.profile_dir, f"{name}.pstats")
+            stats.dump_stats(path)
+            paths.append(path)
+        return paths
+
+    def snapshot(self):
+        """Return a JSON-serialisable copy of every stage and cache."""
+        with self.lock:
+            stages = {name: dict(entry, buckets=list(entry['buckets'])) for name, entry in self.stages.items()}
+            caches = {name: dict(entry) for name, entry in self.caches.items()}
+        for entry in stages.values():
+            entry['mean_seconds'] = entry['seconds'] / entry['count'] if entry['count'] else 0.0
+        for entry in caches.values():
+            total = entry['hits'] + entry['misses']
+            entry['hit_rate'] = entry['hits'] / total if total else 0.0
+        return {'buckets': list(BUCKETS), 'stages': stages, 'caches': caches}
+
+    def dump_json(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(self.snapshot(), file, indent=2)
+
+    def to_prometheus(self):
+        """Render the snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = ['# TYPE code_rag_stage_seconds histogram']
+        for name, entry in snapshot['stages'].items():
+            cumulative = 0
+            for bound, count in zip(list(BUCKETS) + ['+Inf'], entry['buckets']):
+                cumulative += count
+                lines.append(f'code_rag_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'code_rag_stage_seconds_sum{{stage="{name}"}} {entry["seconds"]}')
+            lines.append(f'code_rag_stage_seconds_count{{stage="{name}"}} {entry["count"]}')
+        for counter in ('items', 'bytes', 'tokens'):
+            lines.append(f'# TYPE code_rag_stage_{counter}_total counter')
+            lines.extend(f'code_rag_stage_{counter}_total{{stage="{name}"}} {entry[counter]}'
+                         for name, entry in snapshot['stages'].items())
+        lines.append('# TYPE code_rag_stage_memory_peak_bytes gauge')
+        lines.extend(f'code_rag_stage_memory_peak_bytes{{stage="{name}"}} {entry["memory_peak_bytes"]}'
+                     for name, entry in snapshot['stages'].items() if entry['memory_peak_bytes'])
+        for field, kind in (('hits', 'counter'), ('misses', 'counter'), ('hit_rate', 'gauge')):
+            suffix = '_total' if kind == 'counter' else ''
+            lines.append(f'# TYPE code_rag_cache_{field}{suffix} {kind}')
+            lines.extend(f'code_rag_cache_{field}{suffix}{{cache="{name}"}} {entry[field]}'
+                         for name, entry in snapshot['caches'].items())
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve `/metrics` in the Prometheus text format from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logger.info("Serving metrics on http://%s:%d/metrics", host, self.server.server_address[1])
+        return self.server
+
+    def report(self, json_file=None):
+        """Write the JSON snapshot (when `json_file` is set) and any collected profiles."""
+        if json_file:
+            self.dump_json(json_file)
+        self.dump_profiles()
+
+    def reset(self):
+        with self.lock:
+            self.stages = {}
+            self.caches = {}
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """Return the process-wide metrics registry."""
+    return _metrics
@@ -0,0 +1,118 @@
+import email.utils
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name, rate=None, capacity=None):
+    """Return the process-wide limiter registered under `name`, creating it on first use.
+
+    Unset limits default to 50 requests/s with a burst of 100. Passing limits
+    that differ from those of an existing limiter reconfigures it in place,
+    so every client sharing it picks up the configured budget.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _limiters[name] = RateLimiter(50.0 if rate is None else rate,
+                                                    100 if capacity is None else capacity)
+        elif (rate is not None and float(rate) != limiter.rate) or \
+                (capacity is not None and float(capacity) != limiter.capacity):
+            logger.warning("Reconfiguring rate limiter %r from rate=%s, capacity=%s to rate=%s, capacity=%s", name,
+                           limiter.rate, limiter.capacity, limiter.rate if rate is None else rate,
+                           limiter.capacity if capacity is None else capacity)
+            limiter.configure(rate, capacity)
+        return limiter
+
+
+def _parse_duration(value):
+    """Parse header durations such as "20", "1.5s", "6m0s" or an HTTP date into seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r'([\d.]+)(ms|h|m|s)', value)
+    if parts:
+        scale = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+        return sum(float(amount) * scale[unit] for amount, unit in parts)
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Thread-safe token bucket that also pauses when the remote service asks it to.
+
+    The bucket smooths request bursts; `update_from_headers` reads `Retry-After`
+    and `X-RateLimit-*` style headers and blocks further calls until the
+    remote side's window resets.
+    """
+
+    def __init__(self, rate=50.0, capacity=100):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def configure(self, rate=None, capacity=None):
+        """Change the refill rate and/or bucket size; tokens above the new capacity are dropped."""
+        with self.lock:
+            if rate is not None:
+                self.rate = float(rate)
+            if capacity is not None:
+                self.capacity = float(capacity)
+                self.tokens = min(self.tokens, self.capacity)
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available and no backoff is in effect."""
+        tokens = min(float(tokens), self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = max(self.paused_until - now, (tokens - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def backoff(self, seconds):
+        """Pause every caller sharing this limiter for `seconds`."""
+        if seconds is None or seconds <= 0:
+            return
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        logger.warning("Rate limited, backing off for %.1fs", seconds)
+
+    def update_from_headers(self, headers):
+        """Back off if the response headers say the quota is exhausted.
+
+        Returns the backoff in seconds, or None when no backoff is needed.
+        """
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        delay = None
+        if 'retry-after' in headers:
+            delay = _parse_duration(headers['retry-after'])
+        elif headers.get('x-ratelimit-remaining') == '0' and 'x-ratelimit-reset' in headers:
+            # GitHub sends the reset time as a unix timestamp.
+            delay = float(headers['x-ratelimit-reset']) - time.time()
+        else:
+            for kind in ('requests', 'tokens'):
+                if headers.get(f'x-ratelimit-remaining-{kind}') == '0':
+                    reset = _parse_duration(headers.get(f'x-ratelimit-reset-{kind}', '1'))
+                    delay = max(delay or 0, reset or 0)
+        if delay is not None and delay > 0:
+            self.backoff(delay)
+            return delay
+        return None
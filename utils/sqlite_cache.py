@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import threading
+import time
+
+from utils.metrics import get_metrics
+
+
+class SQLiteCache:
+    """Persistent key/value store backed by one SQLite file, evicting least recently used entries.
+
+    Lookups are reported to the metrics registry under `name` when one is given.
+    The file may be shared by several processes (e.g. multi-repo workers): it
+    runs in WAL mode and writers wait up to `timeout` seconds for the lock.
+    """
+
+    def __init__(self, path, max_entries=1000000, name=None, timeout=60.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, last_used REAL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self.connection.commit()
+
+    def get_many(self, keys):
+        """Return {key: value} for the keys that are cached and mark them as recently used."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self.lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.connection.execute(f"SELECT key, value FROM entries WHERE key IN ({placeholders})", chunk)
+                found.update(rows.fetchall())
+            now = time.time()
+            self.connection.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+            self.connection.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        if self.name:
+            get_metrics().cache(self.name, hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def put_many(self, items):
+        """Store a {key: value} mapping, then trim the table back to `max_entries`."""
+        now = time.time()
+        with self.lock:
+            self.connection.executemany("INSERT OR REPLACE INTO entries (key, value, last_used) VALUES (?, ?, ?)",
+                                        [(key, value, now) for key, value in items.items()])
+            count = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                self.connection.execute("DELETE FROM entries WHERE key IN "
+                                        "(SELECT key FROM entries ORDER BY last_used LIMIT ?)", (count - self.max_entries,))
+            self.connection.commit()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
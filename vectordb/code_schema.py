@@ -0,0 +1,86 @@
+import json
+
+from pymilvus import DataType
+
+# Chunk metadata written by LlamaDoc, stored as scalar fields next to the vector.
+SCALAR_FIELDS = [
+    {'name': 'githubrepo', 'dtype': DataType.VARCHAR, 'max_length': 256, 'is_partition_key': True},
+    {'name': 'file_path', 'dtype': DataType.VARCHAR, 'max_length': 1024},
+    {'name': 'file_name', 'dtype': DataType.VARCHAR, 'max_length': 256},
+    {'name': 'extension', 'dtype': DataType.VARCHAR, 'max_length': 32},
+    {'name': 'github_url', 'dtype': DataType.VARCHAR, 'max_length': 2048},
+    {'name': 'lines', 'dtype': DataType.INT64},
+    {'name': 'size', 'dtype': DataType.INT64},
+]
+
+# Raw chunk text for rerankers, which score (query, text) pairs. Milvus caps VARCHAR at 65535 bytes.
+TEXT_FIELD = {'name': 'text', 'dtype': DataType.VARCHAR, 'max_length': 65535}
+
+# Scalar indexes let Milvus prune candidates on these fields before vector scoring.
+SCALAR_INDEXES = {
+    'githubrepo': 'INVERTED',
+    'file_path': 'INVERTED',
+    'file_name': 'INVERTED',
+    'extension': 'INVERTED',
+    'lines': 'STL_SORT',
+    'size': 'STL_SORT',
+}
+
+
+def code_chunk_fields(dimensions=512, vector_dtype=DataType.FLOAT_VECTOR):
+    """Field definitions for `define_schema`: primary id, vector, the scalar chunk metadata and the chunk text."""
+    return [
+        {'name': 'id', 'dtype': DataType.INT64, 'is_primary': True},
+        {'name': 'vector_field', 'dtype': vector_dtype, 'dim': dimensions},
+    ] + [dict(field) for field in SCALAR_FIELDS] + [dict(TEXT_FIELD)]
+
+
+def _owner_name(githubrepo):
+    """LlamaDoc writes `githubrepo` as name/owner; store it as owner/name, the form filters and the CLI use."""
+    name, _, owner = str(githubrepo or '').partition('/')
+    return f"{owner}/{name}" if owner else name
+
+
+def chunk_metadata(metadata, text=None):
+    """Map a node's metadata and text onto the scalar fields, truncating strings to their max_length."""
+    row = {TEXT_FIELD['name']: (text or '').encode('utf-8')[:TEXT_FIELD['max_length']].decode('utf-8', 'ignore')}
+    for field in SCALAR_FIELDS:
+        value = metadata.get(field['name'])
+        if field['name'] == 'githubrepo':
+            value = _owner_name(value)
+        if field['dtype'] == DataType.VARCHAR:
+            row[field['name']] = str(value if value is not None else '')[:field['max_length']]
+        else:
+            row[field['name']] = int(value or 0)
+    return row
+
+
+def _quote(value):
+    return json.dumps(str(value))
+
+
+def build_filter(repo=None, extensions=None, path_prefix=None, file_name=None, min_lines=None, max_lines=None,
+                 max_size=None):
+    """Build a Milvus boolean expression over the scalar fields, or None when nothing is constrained.
+
+    `repo` is owner/name, as `chunk_metadata` stores `githubrepo`; `extensions`
+    may be one extension or a list.
+    """
+    clauses = []
+    if repo:
+        clauses.append(f"githubrepo == {_quote(repo)}")
+    if extensions:
+        if isinstance(extensions, str):
+            extensions = [extensions]
+        clauses.append(f"extension in [{', '.join(_quote(extension) for extension in extensions)}]")
+    if path_prefix:
+        clauses.append(f"file_path like {_quote(path_prefix.replace('%', '') + '%')}")
+    if file_name:
+        clauses.append(f"file_name == {_quote(file_name)}")
+    if min_lines is not None:
+        clauses.append(f"lines >= {int(min_lines)}")
+    if max_lines is not None:
+        clauses.append(f"lines <= {int(max_lines)}")
+    if max_size is not None:
+        clauses.append(f"size <= {int(max_size)}")
+    return ' && '.join(clauses) or None
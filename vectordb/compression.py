@@ -0,0 +1,174 @@
+import json
+import logging
+import math
+import time
+
+import fire
+import numpy as np
+from pymilvus import DataType
+
+from vectordb.faiss_vdb import factory_string, training_minimum
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+# Vector storage and index presets, from full precision to most compressed.
+# Build and search params that depend on the corpus are filled in by `compression_profile`.
+PROFILES = {
+    # Full-precision IVF, the reference the other profiles are measured against.
+    'float32': {'vector_dtype': DataType.FLOAT_VECTOR, 'index_type': 'IVF_FLAT'},
+    # Half-precision vectors: half the memory, recall within rounding of float32.
+    'float16': {'vector_dtype': DataType.FLOAT16_VECTOR, 'index_type': 'IVF_FLAT'},
+    # One byte per dimension (scalar quantization).
+    'int8': {'vector_dtype': DataType.FLOAT_VECTOR, 'index_type': 'IVF_SQ8'},
+    # Product quantization: one byte per 4 dimensions by default.
+    'pq': {'vector_dtype': DataType.FLOAT_VECTOR, 'index_type': 'IVF_PQ'},
+    # Graph index: no compression, trades extra memory for low latency at high recall.
+    'hnsw': {'vector_dtype': DataType.FLOAT_VECTOR, 'index_type': 'HNSW'},
+}
+
+
+def _nlist(num_vectors):
+    """IVF list count of about 4 * sqrt(N), the usual starting point; 1024 when N is unknown."""
+    if not num_vectors:
+        return 1024
+    return max(1, min(65536, int(4 * math.sqrt(num_vectors))))
+
+
+def _pq_m(dimensions, dimensions_per_code=4):
+    """Largest sub-quantizer count dividing `dimensions` with at least `dimensions_per_code` dims each."""
+    m = max(1, dimensions // dimensions_per_code)
+    while dimensions % m:
+        m -= 1
+    return m
+
+
+def compression_profile(name, dimensions=512, num_vectors=None, metric_type='IP', **overrides):
+    """Resolve profile `name` into a vector dtype, Milvus index params and search params.
+
+    `num_vectors` sizes the IVF lists; keyword arguments override individual
+    build or search params (e.g. m=32, M=32, nprobe=64, ef=256).
+    """
+    if name not in PROFILES:
+        raise ValueError(f"Unknown compression profile: {name} (expected one of {', '.join(PROFILES)})")
+    profile = PROFILES[name]
+    index_type = profile['index_type']
+    if index_type == 'HNSW':
+        params = {'M': 16, 'efConstruction': 200}
+        search_params = {'ef': 128}
+    else:
+        params = {'nlist': _nlist(num_vectors)}
+        if index_type == 'IVF_PQ':
+            params.update(m=_pq_m(dimensions), nbits=8)
+        search_params = {'nprobe': max(1, min(params['nlist'], max(16, params['nlist'] // 16)))}
+    for key, value in overrides.items():
+        (search_params if key in ('nprobe', 'ef') else params)[key] = value
+    return {
+        'name': name,
+        'vector_dtype': profile['vector_dtype'],
+        'index_params': {'index_type': index_type, 'metric_type': metric_type, 'params': params},
+        'search_params': {'params': search_params},
+    }
+
+
+def _set_search_params(index, search_params):
+    if 'nprobe' in search_params:
+        faiss.extract_index_ivf(index).nprobe = search_params['nprobe']
+    if 'ef' in search_params:
+        faiss.downcast_index(index).hnsw.efSearch = search_params['ef']
+
+
+def recall_report(vectors, profiles=None, metric_type='IP', num_queries=200, top_k=10, seed=0, **overrides):
+    """Measure recall@top_k against exact search and the memory footprint of each profile.
+
+    `num_queries` vectors are held out of the sample as queries; the rest are
+    indexed once per profile with the equivalent FAISS index. Memory is the
+    serialized index size, so it includes IVF centroids and graph links.
+    """
+    if faiss is None:
+        raise ImportError("The recall report requires the faiss package")
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if metric_type == 'COSINE':
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    metric = faiss.METRIC_L2 if metric_type == 'L2' else faiss.METRIC_INNER_PRODUCT
+    order = np.random.default_rng(seed).permutation(len(vectors))
+    queries, base = vectors[order[:num_queries]], vectors[order[num_queries:]]
+    dimensions = vectors.shape[1]
+
+    exact = faiss.IndexFlat(dimensions, metric)
+    exact.add(base)
+    start = time.perf_counter()
+    _, truth = exact.search(queries, top_k)
+    exact_seconds = time.perf_counter() - start
+    float32_bytes = 4 * dimensions
+    report = [{'profile': 'exact', 'index': 'Flat', 'recall': 1.0, 'bytes_per_vector': float32_bytes,
+               'compression': 1.0, 'index_mb': float32_bytes * len(base) / 2 ** 20, 'build_seconds': 0.0,
+               'query_ms': exact_seconds * 1000 / len(queries)}]
+
+    for name in profiles or PROFILES:
+        profile = compression_profile(name, dimensions, len(base), metric_type, **overrides)
+        index_type = profile['index_params']['index_type']
+        params = profile['index_params']['params']
+        if len(base) < training_minimum(index_type, params):
+            logger.warning("Skipping %s: %d vectors are too few to train %s", name, len(base), index_type)
+            continue
+        factory = factory_string(index_type, params, profile['vector_dtype'] == DataType.FLOAT16_VECTOR)
+        start = time.perf_counter()
+        index = faiss.index_factory(dimensions, factory, metric)
+        if index_type == 'HNSW':
+            faiss.downcast_index(index).hnsw.efConstruction = params['efConstruction']
+        if not index.is_trained:
+            index.train(base[:100000])
+        index.add(base)
+        build_seconds = time.perf_counter() - start
+        _set_search_params(index, profile['search_params']['params'])
+        start = time.perf_counter()
+        _, found = index.search(queries, top_k)
+        query_seconds = time.perf_counter() - start
+        hits = sum(len(np.intersect1d(row, expected[expected >= 0])) for row, expected in zip(found, truth))
+        index_bytes = faiss.serialize_index(index).nbytes
+        report.append({
+            'profile': name,
+            'index': factory,
+            'index_params': profile['index_params'],
+            'search_params': profile['search_params'],
+            'recall': hits / max(1, int((truth >= 0).sum())),
+            'bytes_per_vector': index_bytes / len(base),
+            'compression': float32_bytes * len(base) / index_bytes,
+            'index_mb': index_bytes / 2 ** 20,
+            'build_seconds': build_seconds,
+            'query_ms': query_seconds * 1000 / len(queries),
+        })
+        logger.info("%s (%s): recall@%d %.3f, %.1f bytes/vector (%.1fx), %.3f ms/query", name, factory, top_k,
+                    report[-1]['recall'], report[-1]['bytes_per_vector'], report[-1]['compression'],
+                    report[-1]['query_ms'])
+    return report
+
+
+def report(vectors=None, collection_name=None, host='localhost', port='19530', sample_size=20000, profiles=None,
+           metric_type='IP', num_queries=200, top_k=10, output=None, **overrides):
+    """Write the recall-versus-memory report for a .npy sample or the first `sample_size` rows of a collection."""
+    if vectors is not None:
+        sample = np.load(vectors, mmap_mode='r')[:sample_size]
+    elif collection_name:
+        # Imported here so a .npy report does not need a Milvus server.
+        from vectordb.milvusdb_handle import MilvusDBHandle
+        sample = MilvusDBHandle(host, port).sample_vectors(collection_name, sample_size)
+    else:
+        raise ValueError("Pass either a .npy file of vectors or a collection_name")
+    if isinstance(profiles, str):
+        profiles = profiles.split(',')
+    rows = recall_report(sample, profiles, metric_type, num_queries, top_k, **overrides)
+    if output:
+        with open(output, 'w') as file:
+            json.dump(rows, file, indent=2)
+    return rows
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    fire.Fire({'report': report})
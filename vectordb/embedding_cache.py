@@ -0,0 +1,30 @@
+import hashlib
+from array import array
+
+from utils.sqlite_cache import SQLiteCache
+
+
+class EmbeddingCache:
+    """Content-addressed store of embeddings keyed on text, model name and dimensions.
+
+    Identical chunks (license headers, vendored code, the same file across
+    forks and branches) are embedded once and then served from disk.
+    """
+
+    def __init__(self, cache_file, model_name, dimensions, max_entries=1000000):
+        self.model_name = model_name
+        self.dimensions = dimensions
+        self.store = SQLiteCache(cache_file, max_entries, name='embeddings')
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}:{self.dimensions}:{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, texts):
+        """Return one embedding (list of floats) or None per input text, in input order."""
+        keys = [self._key(text) for text in texts]
+        found = self.store.get_many(keys)
+        return [list(array('f', found[key])) if key in found else None for key in keys]
+
+    def put_many(self, texts, embeddings):
+        self.store.put_many({self._key(text): array('f', embedding).tobytes()
+                             for text, embedding in zip(texts, embeddings)})
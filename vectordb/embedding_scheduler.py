@@ -0,0 +1,122 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.metrics import get_metrics
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingScheduler:
+    """Embed documents in token-bounded batches with several requests in flight.
+
+    Batches are packed lazily under `max_tokens_per_request` and the current
+    batch-size limit. The limit is halved whenever a request is rejected as
+    rate limited or oversized (the failed batch is split and retried) and
+    grows back slowly after successes. `run` yields finished batches as soon
+    as they complete so callers can insert them while later ones are still
+    being embedded.
+    """
+
+    def __init__(self, embed_fn, max_tokens_per_request=8000, max_batch_size=256, max_concurrency=4,
+                 max_retries=5, rate_limiter=None):
+        self.embed_fn = embed_fn
+        self.max_tokens_per_request = max_tokens_per_request
+        self.max_batch_size = max_batch_size
+        self.batch_limit = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.get_encoding('cl100k_base')
+            except Exception as e:
+                # tiktoken downloads its vocabulary on first use.
+                logger.warning("Falling back to approximate token counts: %s", e)
+
+    def count_tokens(self, text):
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        # Roughly four characters per token for English text and code.
+        return len(text) // 4 + 1
+
+    def _pack(self, documents, ids):
+        """Yield (ids, documents) batches that fit the token budget and the current size limit."""
+        batch_ids, batch_documents, batch_tokens = [], [], 0
+        for row_id, document in zip(ids, documents):
+            tokens = self.count_tokens(document)
+            if batch_ids and (len(batch_ids) >= self.batch_limit
+                              or batch_tokens + tokens > self.max_tokens_per_request):
+                yield batch_ids, batch_documents
+                batch_ids, batch_documents, batch_tokens = [], [], 0
+            batch_ids.append(row_id)
+            batch_documents.append(document)
+            batch_tokens += tokens
+            get_metrics().count('embed', tokens=tokens)
+        if batch_ids:
+            yield batch_ids, batch_documents
+
+    def _classify(self, error):
+        """Return 'rate_limit', 'oversize' or None for errors that should not be retried."""
+        status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+        if status == 429:
+            return 'rate_limit'
+        message = str(error).lower()
+        if status in (400, 413) and ('token' in message or 'too large' in message or 'context length' in message):
+            return 'oversize'
+        return None
+
+    def run(self, documents, ids):
+        """Embed `documents`, yielding (batch_ids, embeddings) in completion order."""
+        batches = self._pack(documents, ids)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            pending = {}
+
+            def submit(batch, attempt):
+                pending[executor.submit(self.embed_fn, batch[1])] = (batch, attempt)
+
+            def refill():
+                while len(pending) < self.max_concurrency:
+                    batch = next(batches, None)
+                    if batch is None:
+                        return
+                    submit(batch, 0)
+
+            refill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch, attempt = pending.pop(future)
+                    try:
+                        embeddings = future.result()
+                    except Exception as e:
+                        kind = self._classify(e)
+                        if kind is None or attempt >= self.max_retries or (kind == 'oversize' and len(batch[0]) == 1):
+                            raise
+                        self._shrink(kind, e, attempt)
+                        for half in self._split(batch):
+                            submit(half, attempt + 1)
+                        continue
+                    self.batch_limit = min(self.max_batch_size, self.batch_limit + max(1, self.batch_limit // 10))
+                    yield batch[0], embeddings
+                refill()
+
+    def _shrink(self, kind, error, attempt):
+        self.batch_limit = max(1, self.batch_limit // 2)
+        logger.warning("Embedding request failed (%s), batch limit now %d", kind, self.batch_limit)
+        if kind == 'rate_limit' and self.rate_limiter is not None:
+            headers = getattr(getattr(error, 'response', None), 'headers', None)
+            if self.rate_limiter.update_from_headers(headers) is None:
+                self.rate_limiter.backoff(2 ** attempt)
+
+    def _split(self, batch):
+        batch_ids, batch_documents = batch
+        if len(batch_ids) == 1:
+            return [batch]
+        middle = len(batch_ids) // 2
+        return [(batch_ids[:middle], batch_documents[:middle]), (batch_ids[middle:], batch_documents[middle:])]
@@ -0,0 +1,522 @@
+import ast
+import functools
+import json
+import logging
+import operator
+import os
+import re
+import shutil
+from collections import namedtuple
+
+import numpy as np
+
+from utils.metrics import get_metrics
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+# `entity` holds the requested output fields, like a pymilvus Hit.
+Hit = namedtuple('Hit', ['id', 'distance', 'entity'])
+
+
+_COMPARISONS = {ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt, ast.LtE: operator.le,
+                ast.Gt: operator.gt, ast.GtE: operator.ge}
+
+
+def field_columns(rows):
+    """Turn per-row field dicts into {name: (values, present)} NumPy columns for `parse_filter`.
+
+    Integer fields become int64 arrays and strings fixed-width unicode arrays,
+    so comparisons run as single vectorized operations; rows without a field
+    hold a placeholder and are False in `present`.
+    """
+    names = {name for row in rows for name in row}
+    columns = {}
+    for name in names:
+        values = [row.get(name) for row in rows]
+        present = np.fromiter((value is not None for value in values), dtype=bool, count=len(values))
+        kinds = {type(value) for value in values if value is not None}
+        if kinds <= {int}:
+            array = np.array([value or 0 for value in values], dtype=np.int64)
+        elif kinds <= {int, float}:
+            array = np.array([value or 0 for value in values], dtype=np.float64)
+        elif kinds <= {str}:
+            array = np.array([value or '' for value in values], dtype=str)
+        else:
+            array = np.array(values, dtype=object)
+        columns[name] = (array, present)
+    return columns
+
+
+def _like_mask(values, pattern):
+    """Milvus `like` over a column: `%` matches any run of characters."""
+    if values.dtype.kind != 'U':
+        values = values.astype(str)
+    parts = pattern.split('%')
+    if len(parts) == 2 and not parts[1]:
+        # Truncating to the prefix width is a single C-level cast, far faster than np.char.startswith.
+        return values.astype(f"U{max(1, len(parts[0]))}") == parts[0] if parts[0] else np.ones(len(values), bool)
+    if len(parts) == 1:
+        return values == pattern
+    regex = re.compile('.*'.join(re.escape(part) for part in parts), re.DOTALL)
+    # Match each distinct value once; repo, extension and path columns repeat heavily.
+    unique, inverse = np.unique(values, return_inverse=True)
+    matched = np.fromiter((regex.fullmatch(value) is not None for value in unique), dtype=bool, count=len(unique))
+    return matched[inverse]
+
+
+@functools.lru_cache(maxsize=256)
+def parse_filter(filters):
+    """Parse a Milvus-style boolean expression into a vectorized mask function over `field_columns`.
+
+    Only comparisons, `in [...]`, `like "pattern"`, `&&`/`||`/`not`, field
+    names and literals are accepted; anything else raises ValueError, so the
+    expression is never executed as Python. The returned function takes the
+    columns and the row count; rows missing a referenced field never match.
+    """
+    expression = re.sub(r'(\w+)\s+like\s+("(?:[^"\\]|\\.)*"|\'[^\']*\')', r'_like(\1, \2)', filters)
+    expression = expression.replace('&&', ' and ').replace('||', ' or ')
+    try:
+        tree = ast.parse(expression, '<filter>', 'eval')
+    except SyntaxError as e:
+        raise ValueError(f"Invalid filter expression: {filters}") from e
+    names = set()
+    like_calls = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            if not (isinstance(node.func, ast.Name) and node.func.id == '_like' and not node.keywords and
+                    len(node.args) == 2 and isinstance(node.args[0], ast.Name) and
+                    isinstance(node.args[1], ast.Constant) and isinstance(node.args[1].value, str)):
+                raise ValueError(f"Unsupported call in filter expression: {filters}")
+        elif isinstance(node, ast.UnaryOp):
+            if not isinstance(node.op, (ast.Not, ast.USub)) or \
+                    (isinstance(node.op, ast.USub) and not isinstance(node.operand, ast.Constant)):
+                raise ValueError(f"Unsupported operator in filter expression: {filters}")
+        elif isinstance(node, ast.Compare):
+            for op, comparator in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.In, ast.NotIn)) and not isinstance(comparator, (ast.List, ast.Tuple)):
+                    raise ValueError(f"`in` needs a list of values in filter expression: {filters}")
+        elif isinstance(node, ast.Name):
+            if id(node) in like_calls:
+                continue
+            if node.id.startswith('_'):
+                raise ValueError(f"Unsupported name in filter expression: {filters}")
+            names.add(node.id)
+        elif not isinstance(node, (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.Not, ast.USub, ast.Constant,
+                                   ast.List, ast.Tuple, ast.Load, ast.In, ast.NotIn, *_COMPARISONS)):
+            raise ValueError(f"Unsupported {type(node).__name__} in filter expression: {filters}")
+
+    def evaluate(node, columns, count):
+        if isinstance(node, ast.BoolOp):
+            masks = [evaluate(value, columns, count) for value in node.values]
+            return np.logical_and.reduce(masks) if isinstance(node.op, ast.And) else np.logical_or.reduce(masks)
+        if isinstance(node, ast.UnaryOp):
+            return ~evaluate(node.operand, columns, count) if isinstance(node.op, ast.Not) else -node.operand.value
+        if isinstance(node, ast.Compare):
+            mask = np.ones(count, dtype=bool)
+            left = evaluate(node.left, columns, count)
+            for op, comparator in zip(node.ops, node.comparators):
+                right = evaluate(comparator, columns, count)
+                if isinstance(op, (ast.In, ast.NotIn)):
+                    result = np.isin(left, right)
+                    result = ~result if isinstance(op, ast.NotIn) else result
+                else:
+                    result = _COMPARISONS[type(op)](left, right)
+                mask &= np.broadcast_to(np.asarray(result, dtype=bool), (count,))
+                left = right
+            return mask
+        if isinstance(node, ast.Call):
+            return _like_mask(evaluate(node.args[0], columns, count), node.args[1].value)
+        if isinstance(node, ast.Name):
+            return columns[node.id][0]
+        if isinstance(node, (ast.List, ast.Tuple)):
+            return [evaluate(element, columns, count) for element in node.elts]
+        return node.value
+
+    def mask(columns, count):
+        if any(name not in columns for name in names):
+            return np.zeros(count, dtype=bool)
+        present = np.logical_and.reduce([columns[name][1] for name in names] + [np.ones(count, dtype=bool)])
+        return evaluate(tree.body, columns, count) & present
+
+    return mask
+
+
+def factory_string(index_type, params=None, float16=False):
+    """FAISS index_factory string equivalent to a Milvus index type and its build params.
+
+    `float16` stores full vectors as half floats (Milvus FLOAT16_VECTOR).
+    """
+    params = params or {}
+    storage = 'SQfp16' if float16 else 'Flat'
+    nlist = params.get('nlist', 128)
+    if index_type == 'FLAT':
+        return storage
+    if index_type == 'IVF_FLAT':
+        return f"IVF{nlist},{storage}"
+    if index_type == 'IVF_SQ8':
+        return f"IVF{nlist},SQ8"
+    if index_type == 'IVF_PQ':
+        return f"IVF{nlist},PQ{params['m']}x{params.get('nbits', 8)}"
+    if index_type == 'HNSW':
+        return f"HNSW{params.get('M', 16)}" + (',SQfp16' if float16 else '')
+    raise ValueError(f"Unsupported index type: {index_type}")
+
+
+def training_minimum(index_type, params=None):
+    """Fewest vectors an index of this type can be trained on (one per IVF list and PQ centroid)."""
+    params = params or {}
+    minimum = params.get('nlist', 128) if index_type.startswith('IVF') else 0
+    if index_type == 'IVF_PQ':
+        minimum = max(minimum, 2 ** params.get('nbits', 8))
+    return minimum
+
+
+class FaissDBHandle:
+    """In-process vector store with the MilvusDBHandle method surface.
+
+    Each collection is a directory holding raw float32 vectors and int64 ids
+    that are appended on insert and memory-mapped on load, plus an optional
+    FAISS index file read with IO_FLAG_MMAP. Inserts extend the index in
+    memory; it is written by `flush` or `create_index`, and rows appended
+    after the last write are added back when the collection is reopened.
+    Without FAISS installed every search is an exact NumPy scan.
+    """
+    dimensions = 512
+
+    def __init__(self, data_dir="../.cache/faiss", dimensions=None):
+        logger.info(f"Opening local vector store at {data_dir} (faiss {'enabled' if faiss else 'unavailable'})")
+        self.data_dir = data_dir
+        self.dimensions = dimensions or self.dimensions
+        self.collections = {}
+        os.makedirs(data_dir, exist_ok=True)
+
+    def _path(self, collection_name, file_name=""):
+        return os.path.join(self.data_dir, collection_name, file_name)
+
+    def define_schema(self, fields):
+        logger.debug(f"Defining schema with fields: {fields}")
+        return [dict(field) for field in fields]
+
+    def get_schema(self, collection_name):
+        return self._load(collection_name)['schema']
+
+    def create_collection(self, collection_name, schema=None, dimensions=None):
+        logger.info(f"Creating collection: {collection_name}")
+        for field in schema or []:
+            if 'dim' in field:
+                dimensions = dimensions or field['dim']
+        os.makedirs(self._path(collection_name), exist_ok=True)
+        meta = {'dimensions': dimensions or self.dimensions, 'schema': schema, 'index_params': None}
+        self._write_meta(collection_name, meta)
+        for file_name in ('ids.i64', 'vectors.f32', 'fields.jsonl'):
+            open(self._path(collection_name, file_name), 'ab').close()
+        self.collections.pop(collection_name, None)
+        return self._load(collection_name)
+
+    def drop_collection(self, collection_name):
+        logger.info(f"Dropping collection: {collection_name}")
+        self.collections.pop(collection_name, None)
+        shutil.rmtree(self._path(collection_name), ignore_errors=True)
+
+    def list_collections(self):
+        return sorted(name for name in os.listdir(self.data_dir)
+                      if os.path.exists(self._path(name, 'meta.json')))
+
+    def collection_exists(self, collection_name):
+        return os.path.exists(self._path(collection_name, 'meta.json'))
+
+    def _write_meta(self, collection_name, meta):
+        with open(self._path(collection_name, 'meta.json'), 'w') as file:
+            json.dump(meta, file)
+
+    def _load(self, collection_name):
+        """Return the cached collection state, memory-mapping its files on first access."""
+        if collection_name in self.collections:
+            return self.collections[collection_name]
+        if not self.collection_exists(collection_name):
+            raise ValueError(f"Collection {collection_name} does not exist")
+        with open(self._path(collection_name, 'meta.json'), 'r') as file:
+            meta = json.load(file)
+        collection = {**meta, 'index': None, 'sq_norms': None, 'columns': None}
+        self._map_arrays(collection_name, collection)
+        collection['fields'] = self._read_fields(collection_name, len(collection['ids']))
+        index_file = self._path(collection_name, 'index.faiss')
+        if faiss is not None and os.path.exists(index_file):
+            collection['index'] = faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            collection['index_mmapped'] = True
+            collection['index_dirty'] = False
+            if collection['index'].ntotal != len(collection['ids']):
+                # Rows inserted after the index was last flushed.
+                self._catch_up_index(collection_name, collection)
+        self.collections[collection_name] = collection
+        return collection
+
+    def _read_fields(self, collection_name, count):
+        """Load the per-row scalar fields; rows written before fields were stored get empty ones."""
+        fields = []
+        if os.path.exists(self._path(collection_name, 'fields.jsonl')):
+            with open(self._path(collection_name, 'fields.jsonl'), 'r') as file:
+                fields = [json.loads(line) for line in file]
+        return [{}] * (count - len(fields)) + fields
+
+    def _map_arrays(self, collection_name, collection):
+        dimensions = collection['dimensions']
+        if os.path.getsize(self._path(collection_name, 'ids.i64')) == 0:
+            collection['ids'] = np.empty(0, dtype=np.int64)
+            collection['vectors'] = np.empty((0, dimensions), dtype=np.float32)
+        else:
+            collection['ids'] = np.memmap(self._path(collection_name, 'ids.i64'), dtype=np.int64, mode='r')
+            collection['vectors'] = np.memmap(self._path(collection_name, 'vectors.f32'), dtype=np.float32,
+                                              mode='r').reshape(-1, dimensions)
+        collection['sq_norms'] = None
+        collection['columns'] = None
+
+    def insert_vectors(self, collection_name, vectors, ids, metadata=None):
+        """Append rows; `metadata` is an optional list of scalar field dicts, one per row."""
+        logger.info(f"Inserting {len(ids)} vectors into collection: {collection_name}")
+        collection = self._load(collection_name)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, collection['dimensions'])
+        ids = np.ascontiguousarray(ids, dtype=np.int64)
+        if len(ids) != len(vectors):
+            raise ValueError(f"Got {len(vectors)} vectors for {len(ids)} ids")
+        metadata = list(metadata) if metadata is not None else [{}] * len(ids)
+        if len(metadata) != len(ids):
+            raise ValueError(f"Got {len(metadata)} metadata rows for {len(ids)} ids")
+        with get_metrics().stage('insert', items=len(ids), bytes=vectors.nbytes + ids.nbytes):
+            with open(self._path(collection_name, 'vectors.f32'), 'ab') as file:
+                file.write(vectors.tobytes())
+            with open(self._path(collection_name, 'ids.i64'), 'ab') as file:
+                file.write(ids.tobytes())
+            with open(self._path(collection_name, 'fields.jsonl'), 'a') as file:
+                file.writelines(json.dumps(row) + '\n' for row in metadata)
+            self._map_arrays(collection_name, collection)
+            collection['fields'].extend(metadata)
+            if collection['index'] is not None:
+                self._catch_up_index(collection_name, collection)
+
+    def _catch_up_index(self, collection_name, collection):
+        """Add rows missing from the index in memory, or rebuild it once a fallback Flat index can be trained."""
+        index_params = collection['index_params'] or {}
+        index_type = index_params.get('index_type', 'FLAT')
+        if collection['index'].ntotal > len(collection['ids']) or (
+                self._is_fallback(collection) and
+                len(collection['ids']) >= training_minimum(index_type, index_params.get('params', {}))):
+            self._build_index(collection_name, collection)
+            return
+        # FAISS labels are row positions, so appended rows keep their order.
+        index = self._writable_index(collection_name, collection)
+        index.add(self._prepare(collection['vectors'][index.ntotal:], index_params))
+        collection['index_dirty'] = True
+
+    def _is_fallback(self, collection):
+        """True when the index is the exact Flat stand-in for a type that was too small to train."""
+        index_type = (collection['index_params'] or {}).get('index_type', 'FLAT')
+        return index_type != 'FLAT' and isinstance(faiss.downcast_index(collection['index']), faiss.IndexFlat)
+
+    def flush(self, collection_name):
+        """Persist the index if inserts have extended it since it was last written."""
+        collection = self._load(collection_name)
+        if collection['index'] is not None and collection.get('index_dirty'):
+            faiss.write_index(collection['index'], self._path(collection_name, 'index.faiss'))
+            collection['index_dirty'] = False
+
+    def delete_vectors(self, collection_name, ids):
+        logger.info(f"Deleting {len(ids)} vectors from collection: {collection_name}")
+        collection = self._load(collection_name)
+        keep = ~np.isin(collection['ids'], np.asarray(ids, dtype=np.int64))
+        if keep.all():
+            return
+        kept_ids = np.array(collection['ids'][keep])
+        kept_vectors = np.array(collection['vectors'][keep])
+        for file_name, array in (('ids.i64', kept_ids), ('vectors.f32', kept_vectors)):
+            tmp_file = self._path(collection_name, f"{file_name}.tmp")
+            with open(tmp_file, 'wb') as file:
+                file.write(array.tobytes())
+            os.replace(tmp_file, self._path(collection_name, file_name))
+        collection['fields'] = [row for row, kept in zip(collection['fields'], keep) if kept]
+        tmp_file = self._path(collection_name, 'fields.jsonl.tmp')
+        with open(tmp_file, 'w') as file:
+            file.writelines(json.dumps(row) + '\n' for row in collection['fields'])
+        os.replace(tmp_file, self._path(collection_name, 'fields.jsonl'))
+        self._map_arrays(collection_name, collection)
+        if collection['index'] is not None:
+            self._build_index(collection_name, collection)
+
+    def create_index(self, collection_name, field_name, index_params):
+        logger.info(f"Creating index on collection: {collection_name}, field: {field_name}")
+        logger.debug(f"Index params: {index_params}")
+        collection = self._load(collection_name)
+        collection['index_params'] = dict(index_params)
+        self._write_meta(collection_name, {key: collection[key] for key in ('dimensions', 'schema', 'index_params')})
+        index_type = index_params.get('index_type', 'FLAT')
+        if faiss is None:
+            if index_type != 'FLAT':
+                logger.warning(f"faiss is not installed, {index_type} falls back to exact NumPy search")
+            return
+        self._build_index(collection_name, collection)
+
+    def drop_index(self, collection_name, field_name):
+        logger.info(f"Dropping index from collection: {collection_name}, field: {field_name}")
+        collection = self._load(collection_name)
+        collection['index'] = None
+        collection['index_params'] = None
+        self._write_meta(collection_name, {key: collection[key] for key in ('dimensions', 'schema', 'index_params')})
+        if os.path.exists(self._path(collection_name, 'index.faiss')):
+            os.remove(self._path(collection_name, 'index.faiss'))
+
+    def _faiss_metric(self, metric_type):
+        return faiss.METRIC_L2 if metric_type == 'L2' else faiss.METRIC_INNER_PRODUCT
+
+    def _prepare(self, vectors, index_params):
+        """Normalise vectors for COSINE so it can be served by an inner-product index."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if (index_params or {}).get('metric_type') == 'COSINE':
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+        return vectors
+
+    def _build_index(self, collection_name, collection):
+        """(Re)build the FAISS index from all stored vectors and persist it."""
+        index_params = collection['index_params'] or {}
+        index_type = index_params.get('index_type', 'FLAT')
+        params = index_params.get('params', {})
+        dimensions = collection['dimensions']
+        metric = self._faiss_metric(index_params.get('metric_type', 'L2'))
+        vectors = self._prepare(collection['vectors'], index_params)
+        minimum = training_minimum(index_type, params)
+        if len(vectors) < minimum:
+            logger.warning(f"{len(vectors)} vectors are too few to train {index_type}, using exact search")
+            index = faiss.index_factory(dimensions, 'Flat', metric)
+        else:
+            index = faiss.index_factory(dimensions, factory_string(index_type, params), metric)
+        if index_type == 'HNSW':
+            index.hnsw.efConstruction = params.get('efConstruction', 200)
+        if not index.is_trained:
+            sample = vectors[np.random.default_rng(0).permutation(len(vectors))[:100000]]
+            index.train(sample)
+        index.add(vectors)
+        faiss.write_index(index, self._path(collection_name, 'index.faiss'))
+        collection['index'] = index
+        collection['index_mmapped'] = False
+        collection['index_dirty'] = False
+
+    def _writable_index(self, collection_name, collection):
+        if collection.get('index_mmapped'):
+            collection['index'] = faiss.read_index(self._path(collection_name, 'index.faiss'))
+            collection['index_mmapped'] = False
+        return collection['index']
+
+    def search_vectors(self, collection_name, query_vector, top_k, metric_type, params, output_fields=None):
+        logger.info(f"Searching vectors in collection: {collection_name}")
+        return self._search(collection_name, [query_vector], top_k, metric_type, params, output_fields=output_fields)
+
+    def hybrid_search(self, collection_name, query_vector, filters, top_k, metric_type, params, output_fields=None):
+        logger.info(f"Performing hybrid search in collection: {collection_name}")
+        return self._search(collection_name, [query_vector], top_k, metric_type, params, filters, output_fields)
+
+    def search_many(self, collection_name, query_vectors, top_k, metric_type, params, max_nq=1024):
+        return self.hybrid_search_many(collection_name, query_vectors, None, top_k, metric_type, params, max_nq)
+
+    def hybrid_search_many(self, collection_name, query_vectors, filters, top_k, metric_type, params, max_nq=1024):
+        """Batched search with an optional filter per query; results are aligned with the inputs."""
+        query_vectors = list(query_vectors)
+        if filters is None or isinstance(filters, str):
+            filters = [filters] * len(query_vectors)
+        groups = {}
+        for position, expr in enumerate(filters):
+            groups.setdefault(expr, []).append(position)
+        results = [None] * len(query_vectors)
+        for expr, positions in groups.items():
+            for start in range(0, len(positions), max_nq):
+                group = positions[start:start + max_nq]
+                hits = self._search(collection_name, [query_vectors[position] for position in group],
+                                    top_k, metric_type, params, expr)
+                for position, query_hits in zip(group, hits):
+                    results[position] = query_hits
+        return results
+
+    def _search(self, collection_name, query_vectors, top_k, metric_type, params, filters=None, output_fields=None):
+        """Return one list of Hits per query; each Hit's entity holds the stored `output_fields` of its row."""
+        collection = self._load(collection_name)
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, collection['dimensions'])
+        with get_metrics().stage('search', items=len(queries)):
+            if filters:
+                # Prune candidates first, then score only the surviving rows exactly.
+                rows = np.flatnonzero(self._filter_mask(collection, filters))
+                found = self._exact_search(collection, queries, top_k, metric_type, rows)
+            else:
+                index_params = collection['index_params'] or {}
+                if collection['index'] is not None and index_params.get('metric_type', 'L2') == metric_type:
+                    found = self._index_search(collection, queries, top_k, params)
+                else:
+                    found = self._exact_search(collection, queries, top_k, metric_type)
+            ids, fields = collection['ids'], collection['fields']
+            return [[Hit(int(ids[row]), distance, {name: fields[row].get(name) for name in output_fields or ()})
+                     for row, distance in query_hits] for query_hits in found]
+
+    def _index_search(self, collection, queries, top_k, params):
+        index = collection['index']
+        search_params = params.get('params', params)
+        if 'nprobe' in search_params and hasattr(index, 'nprobe'):
+            index.nprobe = search_params['nprobe']
+        if 'ef' in search_params and hasattr(index, 'hnsw'):
+            index.hnsw.efSearch = search_params['ef']
+        distances, rows = index.search(self._prepare(queries, collection['index_params']), top_k)
+        return [[(int(row), float(distance)) for row, distance in zip(query_rows, query_distances) if row >= 0]
+                for query_rows, query_distances in zip(rows, distances)]
+
+    def _exact_search(self, collection, queries, top_k, metric_type, rows=None):
+        """(row position, score) pairs of the top_k rows per query, scanning only `rows` when given."""
+        vectors = collection['vectors'] if rows is None else collection['vectors'][rows]
+        ids = collection['ids'] if rows is None else collection['ids'][rows]
+        if len(ids) == 0:
+            return [[] for _ in queries]
+        if metric_type == 'L2':
+            if rows is None:
+                if collection['sq_norms'] is None:
+                    collection['sq_norms'] = np.einsum('ij,ij->i', vectors, vectors)
+                sq_norms = collection['sq_norms']
+            else:
+                sq_norms = np.einsum('ij,ij->i', vectors, vectors)
+            scores = sq_norms[None, :] - 2 * queries @ vectors.T + np.einsum('ij,ij->i', queries, queries)[:, None]
+            order_scores = scores
+        else:
+            if metric_type == 'COSINE':
+                vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+                queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+            scores = queries @ vectors.T
+            order_scores = -scores
+        k = min(top_k, len(ids))
+        top = np.argpartition(order_scores, k - 1, axis=1)[:, :k]
+        results = []
+        for query, candidates in enumerate(top):
+            candidates = candidates[np.argsort(order_scores[query, candidates])]
+            positions = candidates if rows is None else rows[candidates]
+            results.append([(int(position), float(scores[query, row])) for position, row in zip(positions, candidates)])
+        return results
+
+    def _filter_mask(self, collection, filters):
+        """Evaluate a Milvus-style boolean expression over `id` and the scalar fields, stored as NumPy columns.
+
+        Supports comparisons, `in [...]`, `like "prefix%"`, and `&&`/`||`/`not`,
+        e.g. 'extension in [".py"] && file_path like "src/%" && id > 0'.
+        """
+        if collection['columns'] is None:
+            # Rebuilt lazily after writes; filtered searches between writes reuse it.
+            collection['columns'] = field_columns(collection['fields'])
+            collection['columns']['id'] = (np.asarray(collection['ids']), np.ones(len(collection['ids']), dtype=bool))
+        return parse_filter(filters)(collection['columns'], len(collection['ids']))
+
+    def get_collection_stats(self, collection_name):
+        collection = self._load(collection_name)
+        return {'row_count': len(collection['ids']), 'index_params': collection['index_params'],
+                'backend': 'faiss' if collection['index'] is not None else 'numpy'}
+
+    def count_vectors(self, collection_name):
+        logger.info(f"Counting vectors in collection: {collection_name}")
+        return len(self._load(collection_name)['ids'])
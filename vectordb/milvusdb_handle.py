@@ -1,7 +1,18 @@
+import functools
+import itertools
 import logging
+import time
+import numpy as np
+from collections import deque
 from pymilvus import connections, Collection, CollectionSchema, FieldSchema, DataType
-from pymilvus import model
-from openai_embedding_function import OpenAIEmbeddingFunction
+from vectordb.code_schema import SCALAR_INDEXES, code_chunk_fields
+from vectordb.compression import compression_profile
+from vectordb.embedding_cache import EmbeddingCache
+from vectordb.embedding_scheduler import EmbeddingScheduler
+from vectordb.query_cache import QueryCache
+from vectordb.reranker import ONNXCrossEncoder, RerankStage, bge_scorer
+from utils.metrics import get_metrics
+from utils.rate_limiter import get_rate_limiter
 
 import os
 
@@ -10,40 +21,104 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(level
 logger = logging.getLogger(__name__)
 
 
+def OpenAIEmbeddingFunction(*args, **kwargs):
+    # pymilvus.model takes about a second to import; load it only when a client is created.
+    from pymilvus.model.dense import OpenAIEmbeddingFunction
+    return OpenAIEmbeddingFunction(*args, **kwargs)
+
+
+def BGERerankFunction(*args, **kwargs):
+    from pymilvus.model.reranker import BGERerankFunction
+    return BGERerankFunction(*args, **kwargs)
+
+
 # Connect to Milvus server
 class MilvusDBHandle:
     openai_api_key = os.getenv('OPENAI_API_KEY')
     model_name = 'text-embedding-3-large'
     dimensions = 512
+    max_retries = 3
 
-    def __init__(self, host="localhost", port="19530"):
+    def __init__(self, host="localhost", port="19530", dimensions=None, rate_limit=None):
+        # rate_limit: {'rate', 'capacity'} of the shared 'openai' limiter, i.e. rate_limits.openai in the config.
         logger.info(f"Connecting to Milvus at {host}:{port}")
         self.connection = connections.connect("default", host=host, port=port)
+        self.dimensions = dimensions or self.dimensions
+        self.rate_limiter = get_rate_limiter('openai', **(rate_limit or {}))
+        self.collections = {}
+        # collection name -> DataType of vector_field, so float16 collections get float16 vectors.
+        self.vector_dtypes = {}
+        self.openai_ef = None
+        self.embedding_cache = None
+        self.embedding_scheduler = None
+        self.rerank_stage = None
+        self.query_cache = None
+
+    def _get_collection(self, collection_name):
+        """Return a cached Collection handle so its schema is fetched once, not on every call."""
+        collection = self.collections.get(collection_name)
+        if collection is None:
+            collection = self.collections[collection_name] = Collection(name=collection_name)
+        return collection
 
     def define_schema(self, fields):
         logger.debug(f"Defining schema with fields: {fields}")
-        field_schemas = [FieldSchema(name=field['name'], dtype=field['dtype'], is_primary=field.get('is_primary', False)) for field in fields]
+        # Extra keys (dim, max_length, is_partition_key, ...) are passed through to FieldSchema.
+        field_schemas = [FieldSchema(name=field['name'], dtype=field['dtype'], is_primary=field.get('is_primary', False),
+                                     **{key: value for key, value in field.items()
+                                        if key not in ('name', 'dtype', 'is_primary')})
+                         for field in fields]
         schema = CollectionSchema(fields=field_schemas)
         logger.debug(f"Defined schema: {schema}")
         return schema
 
     def get_schema(self, collection_name):
         logger.debug(f"Getting schema for collection: {collection_name}")
-        collection = Collection(name=collection_name)
+        collection = self._get_collection(collection_name)
         schema = collection.schema
         logger.debug(f"Schema for collection {collection_name}: {schema}")
         return schema
         
-    def create_collection(self, collection_name, schema):
+    def create_collection(self, collection_name, schema, **kwargs):
         logger.info(f"Creating collection: {collection_name} with schema: {schema}")
-        collection = Collection(name=collection_name, schema=schema)
+        collection = Collection(name=collection_name, schema=schema, **kwargs)
+        self.collections[collection_name] = collection
         logger.debug(f"Created collection: {collection}")
         return collection
 
+    def create_code_collection(self, collection_name, dimensions=None, num_partitions=64, compression=None,
+                               num_vectors=None, metric_type='IP'):
+        """Create a collection with the code-chunk schema, partitioned by repo, with scalar indexes.
+
+        `compression` names a profile from vectordb.compression; its vector
+        dtype is used in the schema and its index is built on vector_field,
+        sized for about `num_vectors` rows.
+        """
+        dimensions = dimensions or self.dimensions
+        profile = compression_profile(compression, dimensions, num_vectors, metric_type) if compression else None
+        vector_dtype = profile['vector_dtype'] if profile else DataType.FLOAT_VECTOR
+        schema = self.define_schema(code_chunk_fields(dimensions, vector_dtype))
+        collection = self.create_collection(collection_name, schema, num_partitions=num_partitions)
+        self.vector_dtypes[collection_name] = vector_dtype
+        self.create_scalar_indexes(collection_name)
+        if profile:
+            self.create_index(collection_name, 'vector_field', profile['index_params'])
+        return collection
+
+    def create_scalar_indexes(self, collection_name, indexes=None):
+        """Index scalar fields ({field: index_type}) so filters prune rows before vector scoring."""
+        collection = self._get_collection(collection_name)
+        for field_name, index_type in (indexes or SCALAR_INDEXES).items():
+            logger.info("Creating %s index on collection: %s, field: %s", index_type, collection_name, field_name)
+            collection.create_index(field_name, {'index_type': index_type}, index_name=f"{field_name}_index")
+
     def drop_collection(self, collection_name):
         logger.info(f"Dropping collection: {collection_name}")
-        collection = Collection(name=collection_name)
+        collection = self._get_collection(collection_name)
         collection.drop()
+        self.collections.pop(collection_name, None)
+        self.vector_dtypes.pop(collection_name, None)
+        self._invalidate_queries(collection_name)
         logger.debug(f"Dropped collection: {collection_name}")
 
     def list_collections(self):
@@ -58,99 +133,381 @@ class MilvusDBHandle:
         logger.debug(f"Collection {collection_name} exists: {exists}")
         return exists
 
-    def insert_vectors(self, collection_name, vectors, ids):
-        logger.info(f"Inserting vectors into collection: {collection_name}")
-        logger.debug(f"Vectors: {vectors}, IDs: {ids}")
-        collection = Collection(name=collection_name)
-        collection.insert([ids, vectors])
-        logger.debug(f"Inserted vectors into collection: {collection_name}")
+    def _vector_dtype(self, collection_name):
+        if collection_name not in self.vector_dtypes:
+            fields = self._get_collection(collection_name).schema.fields
+            self.vector_dtypes[collection_name] = next((field.dtype for field in fields if field.name == 'vector_field'),
+                                                       DataType.FLOAT_VECTOR)
+        return self.vector_dtypes[collection_name]
+
+    def _as_stored(self, collection_name, vectors):
+        """Convert vectors to float16 arrays for FLOAT16_VECTOR collections; others pass through unchanged."""
+        if self._vector_dtype(collection_name) != DataType.FLOAT16_VECTOR:
+            return vectors
+        return [np.asarray(vector, dtype=np.float16) for vector in vectors]
+
+    def insert_vectors(self, collection_name, vectors, ids, metadata=None):
+        """Insert rows; `metadata` is an optional list of scalar field dicts, one per row."""
+        logger.info("Inserting %d vectors into collection: %s", len(ids), collection_name)
+        collection = self._get_collection(collection_name)
+        vectors = self._as_stored(collection_name, vectors)
+        with get_metrics().stage('insert', items=len(ids)):
+            collection.insert(self._insert_data(ids, vectors, metadata))
+        self._invalidate_queries(collection_name)
+        logger.debug("Inserted vectors into collection: %s", collection_name)
+
+    @staticmethod
+    def _insert_data(ids, vectors, metadata=None):
+        """Column data for id/vector-only collections, or row dicts when scalar fields come along."""
+        if metadata is None:
+            return [ids, vectors]
+        return [{'id': row_id, 'vector_field': vector, **fields}
+                for row_id, vector, fields in zip(ids, vectors, metadata)]
+
+    @staticmethod
+    def _column_data(schema, ids, vectors, metadata=None):
+        """Column data in schema field order; pymilvus inserts row dicts synchronously, never with _async."""
+        if metadata is None:
+            return [ids, vectors]
+        columns = {'id': ids, 'vector_field': vectors}
+        return [columns[field.name] if field.name in columns else [fields[field.name] for fields in metadata]
+                for field in schema.fields]
+
+    def bulk_insert(self, collection_name, vectors, ids, batch_size=1000, max_batch_bytes=16 * 1024 * 1024,
+                    max_in_flight=4, flush=True, index_field=None, index_params=None, metadata=None):
+        """Insert rows in size-bounded batches with several asynchronous inserts in flight.
+
+        `vectors`, `ids` and `metadata` (scalar field dicts, as for
+        `insert_vectors`) may be any iterables, so a generator can stream rows
+        straight through. The collection is flushed (and optionally indexed)
+        once at the end. Returns the row count and throughput.
+        """
+        logger.info("Bulk inserting into collection: %s", collection_name)
+        collection = self._get_collection(collection_name)
+        schema = collection.schema if metadata is not None else None
+        start = time.perf_counter()
+        with get_metrics().stage('insert') as stage:
+            pending = deque()
+            rows = 0
+            for batch_ids, batch_vectors, batch_metadata in self._batches(vectors, ids, batch_size, max_batch_bytes,
+                                                                          metadata):
+                if len(pending) >= max_in_flight:
+                    future, count = pending.popleft()
+                    future.result()
+                    rows += count
+                batch_vectors = self._as_stored(collection_name, batch_vectors)
+                data = self._column_data(schema, batch_ids, batch_vectors, batch_metadata)
+                pending.append((collection.insert(data, _async=True), len(batch_ids)))
+            while pending:
+                future, count = pending.popleft()
+                future.result()
+                rows += count
+            if flush:
+                collection.flush()
+            if index_params:
+                collection.create_index(index_field, index_params)
+            stage.items = rows
+        self._invalidate_queries(collection_name)
+        elapsed = time.perf_counter() - start
+        rows_per_second = rows / elapsed if elapsed > 0 else float('inf')
+        logger.info("Bulk inserted %d rows into %s in %.2fs (%.0f rows/s)", rows, collection_name, elapsed,
+                    rows_per_second)
+        return {'rows': rows, 'seconds': elapsed, 'rows_per_second': rows_per_second}
+
+    @staticmethod
+    def _batches(vectors, ids, batch_size, max_batch_bytes, metadata=None):
+        """Group (id, vector, fields) rows into batches bounded by row count and approximate payload size.
+
+        Batches carry None instead of a metadata list when no `metadata` is given.
+        """
+        rows = zip(ids, vectors, metadata if metadata is not None else itertools.repeat(None))
+        batch_ids, batch_vectors, batch_metadata, batch_bytes = [], [], [], 0
+        for row_id, vector, fields in rows:
+            row_bytes = 8 + 4 * len(vector) + sum(len(str(value)) for value in (fields or {}).values())
+            if batch_ids and (len(batch_ids) >= batch_size or batch_bytes + row_bytes > max_batch_bytes):
+                yield batch_ids, batch_vectors, batch_metadata if metadata is not None else None
+                batch_ids, batch_vectors, batch_metadata, batch_bytes = [], [], [], 0
+            batch_ids.append(row_id)
+            batch_vectors.append(vector)
+            batch_metadata.append(fields)
+            batch_bytes += row_bytes
+        if batch_ids:
+            yield batch_ids, batch_vectors, batch_metadata if metadata is not None else None
 
     def delete_vectors(self, collection_name, ids):
-        logger.info(f"Deleting vectors from collection: {collection_name}")
-        logger.debug(f"IDs: {ids}")
-        collection = Collection(name=collection_name)
+        logger.info("Deleting %d vectors from collection: %s", len(ids), collection_name)
+        collection = self._get_collection(collection_name)
         expr = f"id in {ids}"
         collection.delete(expr)
-        logger.debug(f"Deleted vectors from collection: {collection_name}")
+        self._invalidate_queries(collection_name)
+        logger.debug("Deleted vectors from collection: %s", collection_name)
 
     def create_index(self, collection_name, field_name, index_params):
         logger.info(f"Creating index on collection: {collection_name}, field: {field_name}")
         logger.debug(f"Index params: {index_params}")
-        collection = Collection(name=collection_name)
+        collection = self._get_collection(collection_name)
         collection.create_index(field_name, index_params)
         logger.debug(f"Created index on collection: {collection_name}, field: {field_name}")
 
     def drop_index(self, collection_name, field_name):
         logger.info(f"Dropping index from collection: {collection_name}, field: {field_name}")
-        collection = Collection(name=collection_name)
+        collection = self._get_collection(collection_name)
         collection.drop_index(field_name)
         logger.debug(f"Dropped index from collection: {collection_name}, field: {field_name}")
 
-    def search_vectors(self, collection_name, query_vector, top_k, metric_type, params):
-        logger.info(f"Searching vectors in collection: {collection_name}")
-        logger.debug(f"Query vector: {query_vector}, top_k: {top_k}, metric_type: {metric_type}, params: {params}")
-        collection = Collection(name=collection_name)
+    def load_collection(self, collection_name):
+        """Load the collection into query nodes' memory so the first search does not pay for it."""
+        logger.info(f"Loading collection: {collection_name}")
+        self._get_collection(collection_name).load()
+
+    def search_vectors(self, collection_name, query_vector, top_k, metric_type, params, output_fields=None):
+        logger.info("Searching vectors in collection: %s", collection_name)
+        logger.debug("top_k: %s, metric_type: %s, params: %s", top_k, metric_type, params)
+        collection = self._get_collection(collection_name)
         search_params = {"metric_type": metric_type, **params}
-        results = collection.search([query_vector], "vector_field", search_params, top_k)
-        logger.debug(f"Search results: {results}")
+        kwargs = {'output_fields': output_fields} if output_fields else {}
+        with get_metrics().stage('search', items=1):
+            results = collection.search(self._as_stored(collection_name, [query_vector]), "vector_field", search_params,
+                                        top_k, **kwargs)
         return results
 
-    def hybrid_search(self, collection_name, query_vector, filters, top_k, metric_type, params):
-        logger.info(f"Performing hybrid search in collection: {collection_name}")
-        logger.debug(f"Query vector: {query_vector}, filters: {filters}, top_k: {top_k}, metric_type: {metric_type}, params: {params}")
-        collection = Collection(name=collection_name)
+    def hybrid_search(self, collection_name, query_vector, filters, top_k, metric_type, params, output_fields=None):
+        logger.info("Performing hybrid search in collection: %s", collection_name)
+        logger.debug("filters: %s, top_k: %s, metric_type: %s, params: %s", filters, top_k, metric_type, params)
+        collection = self._get_collection(collection_name)
         search_params = {"metric_type": metric_type, **params}
-        results = collection.search([query_vector], "vector_field", search_params, top_k, expr=filters)
-        logger.debug(f"Hybrid search results: {results}")
+        kwargs = {'output_fields': output_fields} if output_fields else {}
+        with get_metrics().stage('search', items=1):
+            results = collection.search(self._as_stored(collection_name, [query_vector]), "vector_field", search_params,
+                                        top_k, expr=filters, **kwargs)
         return results
     
+    def search_many(self, collection_name, query_vectors, top_k, metric_type, params, max_nq=1024):
+        """Search a matrix of query vectors in batched requests; results are aligned with the inputs."""
+        return self.hybrid_search_many(collection_name, query_vectors, None, top_k, metric_type, params, max_nq)
+
+    def hybrid_search_many(self, collection_name, query_vectors, filters, top_k, metric_type, params, max_nq=1024):
+        """Batched hybrid search with an optional filter per query.
+
+        `filters` is None, one expression shared by every query, or a list with
+        one expression (or None) per query. Queries sharing a filter go out as
+        one request of at most `max_nq` vectors.
+        """
+        query_vectors = list(query_vectors)
+        logger.info("Searching %d query vectors in collection: %s", len(query_vectors), collection_name)
+        if filters is None or isinstance(filters, str):
+            filters = [filters] * len(query_vectors)
+        if len(filters) != len(query_vectors):
+            raise ValueError(f"Got {len(filters)} filters for {len(query_vectors)} query vectors")
+        groups = {}
+        for position, expr in enumerate(filters):
+            groups.setdefault(expr, []).append(position)
+        collection = self._get_collection(collection_name)
+        search_params = {"metric_type": metric_type, **params}
+        results = [None] * len(query_vectors)
+        for expr, positions in groups.items():
+            kwargs = {'expr': expr} if expr else {}
+            for start in range(0, len(positions), max_nq):
+                group = positions[start:start + max_nq]
+                with get_metrics().stage('search', items=len(group)):
+                    hits = collection.search(self._as_stored(collection_name, [query_vectors[position]
+                                                                               for position in group]),
+                                             "vector_field", search_params, top_k, **kwargs)
+                for position, query_hits in zip(group, hits):
+                    results[position] = query_hits
+        return results
+
     def get_collection_stats(self, collection_name):    
         logger.info(f"Getting statistics for collection: {collection_name}")
-        collection = Collection(name=collection_name)
+        collection = self._get_collection(collection_name)
         stats = collection.stats()
         logger.debug(f"Collection stats: {stats}")
         return stats
     
+    def sample_vectors(self, collection_name, limit=20000, batch_size=1000):
+        """Read up to `limit` stored vectors as a float32 matrix, e.g. for the compression recall report."""
+        collection = self._get_collection(collection_name)
+        iterator = collection.query_iterator(batch_size=batch_size, limit=limit, output_fields=['vector_field'])
+        vectors = []
+        try:
+            while True:
+                batch = iterator.next()
+                if not batch:
+                    break
+                for row in batch:
+                    vector = row['vector_field']
+                    # float16 vectors come back as raw bytes.
+                    if isinstance(vector, bytes):
+                        vector = np.frombuffer(vector, dtype=np.float16)
+                    vectors.append(np.asarray(vector, dtype=np.float32))
+        finally:
+            iterator.close()
+        return np.stack(vectors) if vectors else np.empty((0, self.dimensions), dtype=np.float32)
+
     def count_vectors(self, collection_name):
         logger.info(f"Counting vectors in collection: {collection_name}")
-        collection = Collection(name=collection_name)
+        collection = self._get_collection(collection_name)
         count = collection.num_entities
         logger.debug(f"Number of vectors in collection: {count}")
         return count
 
     def create_openai_embedding_function(self):
         logger.info("Creating OpenAIEmbeddingFunction")
-        openai_ef = OpenAIEmbeddingFunction(api_key = self.openai_api_key, model_name = self.model_name)    
+        openai_ef = OpenAIEmbeddingFunction(api_key = self.openai_api_key, model_name = self.model_name,
+                                            dimensions = self.dimensions)    
+        self.openai_ef = openai_ef
         logger.debug("Created OpenAIEmbeddingFunction")
         return openai_ef
-    
-    def create_embeddings(self, documents):
+
+    def enable_embedding_cache(self, cache_file="../.cache/embeddings.sqlite", max_entries=1000000):
+        logger.info(f"Enabling embedding cache at {cache_file}")
+        self.embedding_cache = EmbeddingCache(cache_file, self.model_name, self.dimensions, max_entries)
+        return self.embedding_cache
+
+    def create_embeddings(self, documents, max_retries=None):
+        """Embed `documents`, serving repeats from the embedding cache.
+
+        429s are retried up to `max_retries` times (default `self.max_retries`);
+        the embedding scheduler passes 0 so its own split-and-shrink is the
+        only retry layer.
+        """
         if not self.openai_ef:
             raise ValueError("OpenAIEmbeddingFunction is not initialized. Please provide an API key.")
-        logger.info(f"Creating embeddings for documents: {documents}")
-        embeddings = self.openai_ef.encode_documents(documents)
-        logger.debug(f"Created embeddings: {embeddings}")
+        logger.info("Creating embeddings for %d documents", len(documents))
+        if self.embedding_cache is None:
+            embeddings = self._encode_documents(documents, max_retries)
+        else:
+            embeddings = self.embedding_cache.get_many(documents)
+            # Only distinct cache misses reach the embedding API.
+            missing = list(dict.fromkeys(document for document, embedding in zip(documents, embeddings)
+                                         if embedding is None))
+            if missing:
+                encoded = self._encode_documents(missing, max_retries)
+                self.embedding_cache.put_many(missing, encoded)
+                encoded = dict(zip(missing, encoded))
+                embeddings = [encoded[document] if embedding is None else embedding
+                              for document, embedding in zip(documents, embeddings)]
+            logger.info("Embedding cache served %d of %d documents", len(documents) - len(missing), len(documents))
         return embeddings
 
-    def insert_documents_with_embeddings(self, collection_name, documents, ids):
-        logger.info(f"Inserting documents with embeddings into collection: {collection_name}")
-        embeddings = self.create_embeddings(documents)
-        self.insert_vectors(collection_name, embeddings, ids)
-        logger.debug(f"Inserted documents with embeddings into collection: {collection_name}")
+    def _encode_documents(self, documents, max_retries=None):
+        """Call the embedding function through the shared rate limiter, retrying on 429s."""
+        max_retries = self.max_retries if max_retries is None else max_retries
+        for attempt in range(max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                with get_metrics().stage('embed', items=len(documents),
+                                         bytes=sum(len(document) for document in documents)):
+                    return self.openai_ef.encode_documents(documents)
+            except Exception as e:
+                if getattr(e, 'status_code', None) != 429 or attempt == max_retries:
+                    raise
+                response = getattr(e, 'response', None)
+                if self.rate_limiter.update_from_headers(getattr(response, 'headers', None)) is None:
+                    self.rate_limiter.backoff(2 ** attempt)
+
+    def enable_query_cache(self, max_entries=10000, ttl=3600, similarity_threshold=0.97):
+        logger.info(f"Enabling query cache with max_entries: {max_entries}, ttl: {ttl}, "
+                    f"similarity_threshold: {similarity_threshold}")
+        self.query_cache = QueryCache(max_entries, ttl, similarity_threshold)
+        return self.query_cache
 
+    def _invalidate_queries(self, collection_name):
+        if self.query_cache is not None:
+            self.query_cache.invalidate(collection_name)
 
+    def embed_query(self, query):
+        """Embed one query text through the shared rate limiter."""
+        if not self.openai_ef:
+            raise ValueError("OpenAIEmbeddingFunction is not initialized. Please provide an API key.")
+        self.rate_limiter.acquire()
+        with get_metrics().stage('embed', items=1, bytes=len(query)):
+            return self.openai_ef.encode_queries([query])[0]
 
-    def create_reranker(self, model_name="BAAI/bge-reranker-v2-m3", use_fp16=True, batch_size=32, normalize=True, device=None):
+    def search_text(self, collection_name, query, top_k, metric_type, params, filters=None, postprocess=None,
+                    output_fields=None):
+        """Embed and search a text query, serving repeated and near-identical queries from the query cache.
+
+        `postprocess(query, results)` (e.g. reranking) runs before results are
+        cached, so cache hits skip it as well as the embedding and the search.
+        """
+        cache = self.query_cache
+        if cache is not None:
+            results = cache.get(collection_name, query, filters, top_k)
+            if results is not None:
+                return results
+        embedding = self.embed_query(query)
+        if cache is not None:
+            results = cache.get_similar(collection_name, embedding, filters, top_k)
+            if results is not None:
+                cache.put(collection_name, query, results, filters, top_k)
+                return results
+        if filters:
+            results = self.hybrid_search(collection_name, embedding, filters, top_k, metric_type, params, output_fields)
+        else:
+            results = self.search_vectors(collection_name, embedding, top_k, metric_type, params, output_fields)
+        if postprocess is not None:
+            results = postprocess(query, results)
+        if cache is not None:
+            cache.put(collection_name, query, results, filters, top_k, embedding)
+        return results
+
+    def create_embedding_scheduler(self, max_tokens_per_request=8000, max_batch_size=256, max_concurrency=4):
+        logger.info(f"Creating EmbeddingScheduler with max_tokens_per_request: {max_tokens_per_request}, "
+                    f"max_batch_size: {max_batch_size}, max_concurrency: {max_concurrency}")
+        # The scheduler splits, shrinks and retries rejected batches itself, so calls fail fast on 429.
+        embed_fn = functools.partial(self.create_embeddings, max_retries=0)
+        self.embedding_scheduler = EmbeddingScheduler(embed_fn, max_tokens_per_request=max_tokens_per_request,
+                                                      max_batch_size=max_batch_size, max_concurrency=max_concurrency,
+                                                      rate_limiter=self.rate_limiter)
+        return self.embedding_scheduler
+
+    def insert_documents_with_embeddings(self, collection_name, documents, ids, scheduler=None, metadata=None):
+        logger.info("Inserting %d documents with embeddings into collection: %s", len(documents), collection_name)
+        scheduler = scheduler or self.embedding_scheduler
+        if scheduler is None:
+            embeddings = self.create_embeddings(documents)
+            if metadata is None:
+                self.insert_vectors(collection_name, embeddings, ids)
+            else:
+                self.insert_vectors(collection_name, embeddings, ids, metadata=metadata)
+        else:
+            metadata_by_id = dict(zip(ids, metadata)) if metadata is not None else None
+            # Insert each batch as soon as it is embedded while later batches are still in flight.
+            for batch_ids, embeddings in scheduler.run(documents, ids):
+                if metadata_by_id is None:
+                    self.insert_vectors(collection_name, embeddings, batch_ids)
+                else:
+                    self.insert_vectors(collection_name, embeddings, batch_ids,
+                                        metadata=[metadata_by_id[row_id] for row_id in batch_ids])
+        logger.debug("Inserted documents with embeddings into collection: %s", collection_name)
+
+
+
+    def create_reranker(self, model_name="BAAI/bge-reranker-v2-m3", use_fp16=True, batch_size=32, normalize=True, device=None,
+                        max_candidates=50, cache_size=100000):
         logger.info(f"Creating BGERerankFunction with model_name: {model_name}, use_fp16: {use_fp16}, batch_size: {batch_size}, normalize: {normalize}, device: {device}")
         self.reranker = BGERerankFunction(model_name=model_name, use_fp16=use_fp16, batch_size=batch_size, normalize=normalize, device=device)
+        self.rerank_stage = RerankStage(bge_scorer(self.reranker), max_candidates, cache_size)
         logger.debug("Created BGERerankFunction")
         return self.reranker
 
-    def rerank_results(self, query, results):
+    def create_onnx_reranker(self, model_path, tokenizer_path=None, batch_size=32, normalize=True, num_threads=None,
+                             max_candidates=50, cache_size=100000):
+        """Rerank with an exported (e.g. int8-quantized) ONNX cross-encoder instead of the PyTorch model."""
+        logger.info(f"Creating ONNX reranker from {model_path}")
+        self.reranker = ONNXCrossEncoder(model_path, tokenizer_path, batch_size=batch_size, normalize=normalize,
+                                         num_threads=num_threads)
+        self.rerank_stage = RerankStage(self.reranker, max_candidates, cache_size)
+        return self.reranker
+
+    def rerank_results(self, query, results, top_k=None):
+        """Rerank result texts; with a rerank stage only its top `max_candidates` are scored."""
+        if self.rerank_stage is not None:
+            return self.rerank_stage.rerank(query, results, top_k)
         if not hasattr(self, 'reranker'):
             raise ValueError("BGERerankFunction is not initialized. Please create a reranker first.")
-        logger.info(f"Reranking results for query: {query}")
-        reranked_results = self.reranker.rerank(query, results)
-        logger.debug(f"Reranked results: {reranked_results}")
+        logger.info("Reranking %d results", len(results))
+        with get_metrics().stage('rerank', items=len(results)):
+            reranked_results = self.reranker.rerank(query, results)
         return reranked_results
-    
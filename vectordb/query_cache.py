@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.metrics import get_metrics
+
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive form of a query used for exact matching."""
+    return ' '.join(query.lower().split())
+
+
+class QueryCache:
+    """Two-level cache of search results in front of the vector store.
+
+    The exact level keys on (collection, normalized query, filters, top_k).
+    The semantic level returns the results of a cached query whose embedding
+    has cosine similarity >= `similarity_threshold` with the new one and the
+    same collection, filters and top_k. Entries expire after `ttl` seconds;
+    beyond `max_entries` the least recently used are evicted. Writers call
+    `invalidate` so a re-ingested collection never serves stale results.
+    """
+
+    def __init__(self, max_entries=10000, ttl=3600, similarity_threshold=0.97):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.entries = OrderedDict()
+        # (collection, filters, top_k) -> {key: unit-norm embedding} for the semantic level.
+        self.groups = {}
+        self.lock = threading.Lock()
+
+    def _key(self, collection_name, query, filters, top_k):
+        return collection_name, normalize_query(query), filters or '', top_k
+
+    def _remove(self, key):
+        self.entries.pop(key, None)
+        group = self.groups.get((key[0], key[2], key[3]))
+        if group is not None:
+            group.pop(key, None)
+            if not group:
+                del self.groups[(key[0], key[2], key[3])]
+
+    def _live(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry['expires'] < time.monotonic():
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def get(self, collection_name, query, filters=None, top_k=None):
+        """Return cached results for the same normalized query, or None."""
+        with self.lock:
+            entry = self._live(self._key(collection_name, query, filters, top_k))
+        get_metrics().cache('query_exact', hits=int(entry is not None), misses=int(entry is None))
+        return entry['results'] if entry else None
+
+    def get_similar(self, collection_name, embedding, filters=None, top_k=None):
+        """Return the results of the most similar cached query above the threshold, or None."""
+        vector = self._unit(embedding)
+        best = None
+        with self.lock:
+            group = self.groups.get((collection_name, filters or '', top_k))
+            if group:
+                keys = list(group)
+                similarities = np.stack([group[key] for key in keys]) @ vector
+                for position in np.argsort(-similarities):
+                    if similarities[position] < self.similarity_threshold:
+                        break
+                    best = self._live(keys[position])
+                    if best is not None:
+                        break
+        get_metrics().cache('query_semantic', hits=int(best is not None), misses=int(best is None))
+        return best['results'] if best else None
+
+    def put(self, collection_name, query, results, filters=None, top_k=None, embedding=None):
+        """Cache `results`; with an `embedding` the entry also serves semantically similar queries."""
+        key = self._key(collection_name, query, filters, top_k)
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = {'results': results, 'expires': time.monotonic() + self.ttl}
+            if embedding is not None:
+                self.groups.setdefault((collection_name, filters or '', top_k), {})[key] = self._unit(embedding)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate(self, collection_name=None):
+        """Drop every entry for `collection_name` (all entries when None)."""
+        with self.lock:
+            for key in [key for key in self.entries if collection_name is None or key[0] == collection_name]:
+                self._remove(key)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
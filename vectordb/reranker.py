@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from utils.metrics import get_metrics
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+logger = logging.getLogger(__name__)
+
+# Same attributes as pymilvus' RerankResult; `index` is the candidate's position in the input.
+RerankResult = namedtuple('RerankResult', ['text', 'score', 'index'])
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def bge_scorer(reranker):
+    """Adapt a BGERerankFunction to the `scorer(query, documents) -> scores` interface."""
+    def score(query, documents):
+        scores = [0.0] * len(documents)
+        for result in reranker.rerank(query, documents, top_k=len(documents)):
+            scores[result.index] = float(result.score)
+        return scores
+    return score
+
+
+class ONNXCrossEncoder:
+    """Cross-encoder scorer running an exported (optionally int8-quantized) ONNX model on CPU.
+
+    `model_path` is either a .onnx file or a directory holding model.onnx
+    and the tokenizer files. Pairs are sorted by length before batching so
+    each batch pads to similar lengths.
+    """
+
+    def __init__(self, model_path, tokenizer_path=None, max_length=512, batch_size=32, normalize=True,
+                 num_threads=None):
+        if onnxruntime is None:
+            raise ImportError("ONNX reranking requires the onnxruntime package")
+        # transformers is slow to import and only needed here.
+        from transformers import AutoTokenizer
+
+        model_file = os.path.join(model_path, 'model.onnx') if os.path.isdir(model_path) else model_path
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(model_file, options, providers=['CPUExecutionProvider'])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_path or os.path.dirname(model_file))
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.normalize = normalize
+
+    def __call__(self, query, documents):
+        order = sorted(range(len(documents)), key=lambda position: len(documents[position]))
+        scores = [0.0] * len(documents)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            inputs = self.tokenizer([query] * len(batch), [documents[position] for position in batch], padding=True,
+                                    truncation=True, max_length=self.max_length, return_tensors='np')
+            feeds = {name: np.asarray(inputs[name], dtype=np.int64) for name in self.input_names if name in inputs}
+            logits = np.asarray(self.session.run(None, feeds)[0], dtype=np.float32).reshape(len(batch), -1)[:, 0]
+            if self.normalize:
+                logits = 1.0 / (1.0 + np.exp(-logits))
+            for position, score in zip(batch, logits):
+                scores[position] = float(score)
+        return scores
+
+
+class RerankStage:
+    """Rerank the top `max_candidates` ANN results with a cross-encoder, caching pair scores.
+
+    Scores are cached in memory (LRU, `cache_size` pairs) keyed on the hashes
+    of the query and the chunk text, so repeated and overlapping queries only
+    score new pairs. Time spent in the model is reported as the
+    `rerank_model` stage, separately from the whole `rerank` stage.
+    """
+
+    def __init__(self, scorer, max_candidates=50, cache_size=100000):
+        self.scorer = scorer
+        self.max_candidates = max_candidates
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.last_latency = None
+
+    def _cached_scores(self, keys):
+        with self.lock:
+            scores = {}
+            for key in keys:
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+                    scores[key] = self.cache[key]
+        get_metrics().cache('rerank', hits=len(scores), misses=len(keys) - len(scores))
+        return scores
+
+    def _store(self, scores):
+        with self.lock:
+            self.cache.update(scores)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def rerank(self, query, candidates, top_k=None):
+        """Return RerankResults for the first `max_candidates` texts, best first, cut to `top_k`."""
+        start = time.perf_counter()
+        candidates = list(candidates)[:self.max_candidates]
+        with get_metrics().stage('rerank', items=len(candidates)):
+            query_hash = _digest(query)
+            keys = [(query_hash, _digest(text)) for text in candidates]
+            scores = self._cached_scores(set(keys))
+            missing = list(dict.fromkeys(key for key in keys if key not in scores))
+            if missing:
+                texts = {key: text for key, text in zip(keys, candidates)}
+                with get_metrics().stage('rerank_model', items=len(missing)):
+                    new_scores = self.scorer(query, [texts[key] for key in missing])
+                new_scores = dict(zip(missing, new_scores))
+                self._store(new_scores)
+                scores.update(new_scores)
+            results = sorted((RerankResult(text, scores[key], position)
+                              for position, (text, key) in enumerate(zip(candidates, keys))),
+                             key=lambda result: result.score, reverse=True)
+        self.last_latency = time.perf_counter() - start
+        logger.debug("Reranked %d candidates (%d scored) in %.1f ms", len(candidates), len(missing),
+                     self.last_latency * 1000)
+        return results[:top_k] if top_k else results
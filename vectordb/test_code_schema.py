@@ -0,0 +1,42 @@
+import unittest
+from code_RAG.models.code_chunker import LlamaDoc
+from code_RAG.vectordb.code_schema import build_filter, chunk_metadata
+
+
+class TestCodeSchema(unittest.TestCase):
+
+    def test_build_filter(self):
+        expr = build_filter(repo='InfluxDays2021_Demo/pitchdarkdata', extensions=['.py', '.pyi'], path_prefix='src/',
+                            max_lines=500)
+        self.assertEqual(expr, 'githubrepo == "InfluxDays2021_Demo/pitchdarkdata" && extension in [".py", ".pyi"] '
+                               '&& file_path like "src/%" && lines <= 500')
+        self.assertEqual(build_filter(extensions='.py'), 'extension in [".py"]')
+        self.assertIsNone(build_filter())
+
+    def test_build_filter_escapes_quotes(self):
+        self.assertEqual(build_filter(file_name='a"b.py'), 'file_name == "a\\"b.py"')
+
+    def test_chunk_metadata(self):
+        row = chunk_metadata({'file_name': 'a.py', 'extension': '.py', 'lines': '12', 'modifiedOn': 'now',
+                              'file_path': 'x' * 2000})
+        self.assertEqual(row['lines'], 12)
+        self.assertEqual(row['size'], 0)
+        self.assertEqual(row['githubrepo'], '')
+        self.assertEqual(len(row['file_path']), 1024)
+        self.assertNotIn('modifiedOn', row)
+        self.assertEqual(row['text'], '')
+        self.assertEqual(len(chunk_metadata({}, 'é' * 40000)['text'].encode('utf-8')), 65534)
+
+    def test_repo_filter_matches_stored_chunk_metadata(self):
+        llama_doc = LlamaDoc.__new__(LlamaDoc)
+        llama_doc.repo_owner, llama_doc.repo_name = 'InfluxDays2021_Demo', 'pitchdarkdata'
+        document = llama_doc.build_doc({'name': 'a.py', 'path': 'src/a.py', 'extension': '.py', 'size': 10,
+                                        'html_url': 'https://github.com/x', 'lines_of_code': 1, 'content': ['x = 1']})
+        row = chunk_metadata(document.metadata)
+        self.assertEqual(row['githubrepo'], 'InfluxDays2021_Demo/pitchdarkdata')
+        self.assertEqual(build_filter(repo='InfluxDays2021_Demo/pitchdarkdata'),
+                         f'githubrepo == "{row["githubrepo"]}"')
+
+
+if __name__ == '__main__':
+    unittest.main()
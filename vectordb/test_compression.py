@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from pymilvus import DataType
+from code_RAG.vectordb import compression
+from code_RAG.vectordb.compression import compression_profile, recall_report
+from code_RAG.vectordb.faiss_vdb import factory_string, training_minimum
+
+
+class TestCompression(unittest.TestCase):
+
+    def test_profiles_resolve_against_corpus(self):
+        profile = compression_profile('pq', dimensions=96, num_vectors=10000)
+        self.assertEqual(profile['index_params']['index_type'], 'IVF_PQ')
+        self.assertEqual(profile['index_params']['params'], {'nlist': 400, 'm': 24, 'nbits': 8})
+        self.assertEqual(profile['search_params'], {'params': {'nprobe': 25}})
+        self.assertEqual(compression_profile('float16')['vector_dtype'], DataType.FLOAT16_VECTOR)
+        self.assertEqual(compression_profile('pq', dimensions=100)['index_params']['params']['m'], 25)
+        hnsw = compression_profile('hnsw', M=32, ef=256)
+        self.assertEqual(hnsw['index_params']['params'], {'M': 32, 'efConstruction': 200})
+        self.assertEqual(hnsw['search_params'], {'params': {'ef': 256}})
+        with self.assertRaises(ValueError):
+            compression_profile('zstd')
+
+    def test_factory_strings(self):
+        self.assertEqual(factory_string('IVF_FLAT', {'nlist': 64}, float16=True), 'IVF64,SQfp16')
+        self.assertEqual(factory_string('IVF_SQ8', {'nlist': 64}), 'IVF64,SQ8')
+        self.assertEqual(factory_string('IVF_PQ', {'nlist': 64, 'm': 8}), 'IVF64,PQ8x8')
+        self.assertEqual(factory_string('HNSW', {'M': 32}), 'HNSW32')
+        self.assertEqual(training_minimum('IVF_PQ', {'nlist': 64, 'nbits': 8}), 256)
+        self.assertEqual(training_minimum('HNSW', {'M': 32}), 0)
+
+    @unittest.skipIf(compression.faiss is None, "faiss is not installed")
+    def test_recall_report(self):
+        rng = np.random.default_rng(0)
+        centers = rng.standard_normal((20, 32)).astype(np.float32)
+        vectors = centers[rng.integers(0, 20, 3000)] + 0.1 * rng.standard_normal((3000, 32)).astype(np.float32)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            np.save(os.path.join(tmp_dir, 'sample.npy'), vectors)
+            rows = compression.report(os.path.join(tmp_dir, 'sample.npy'), profiles='float32,float16,int8,pq,hnsw',
+                                      metric_type='L2', num_queries=50, output=os.path.join(tmp_dir, 'report.json'))
+            self.assertTrue(os.path.exists(os.path.join(tmp_dir, 'report.json')))
+        report = {row['profile']: row for row in rows}
+        self.assertEqual(report['exact']['recall'], 1.0)
+        self.assertEqual(report['exact']['bytes_per_vector'], 128)
+        self.assertGreater(report['float16']['recall'], 0.95)
+        self.assertGreater(report['hnsw']['recall'], 0.9)
+        self.assertLess(report['float16']['bytes_per_vector'], report['float32']['bytes_per_vector'])
+        self.assertLess(report['int8']['bytes_per_vector'], report['float16']['bytes_per_vector'])
+        self.assertLess(report['pq']['bytes_per_vector'], report['int8']['bytes_per_vector'])
+        self.assertEqual(len(recall_report(vectors[:300], ['pq'], num_queries=50)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
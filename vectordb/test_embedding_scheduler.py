@@ -0,0 +1,57 @@
+import threading
+import unittest
+from code_RAG.vectordb.embedding_scheduler import EmbeddingScheduler
+
+
+class _APIError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TestEmbeddingScheduler(unittest.TestCase):
+
+    def _embed(self, documents):
+        return [[float(len(document))] for document in documents]
+
+    def test_packs_batches_under_token_budget(self):
+        scheduler = EmbeddingScheduler(self._embed, max_tokens_per_request=10, max_batch_size=100)
+        scheduler.count_tokens = lambda text: len(text)
+        batches = list(scheduler._pack(['aaaa', 'bbbb', 'cccc', 'dd'], [1, 2, 3, 4]))
+        self.assertEqual(batches, [([1, 2], ['aaaa', 'bbbb']), ([3, 4], ['cccc', 'dd'])])
+
+    def test_run_returns_every_embedding(self):
+        scheduler = EmbeddingScheduler(self._embed, max_batch_size=3, max_concurrency=2)
+        documents = ['x' * i for i in range(1, 11)]
+        results = dict(pair for batch_ids, embeddings in scheduler.run(documents, range(10))
+                       for pair in zip(batch_ids, embeddings))
+        self.assertEqual(results, {i: [float(i + 1)] for i in range(10)})
+
+    def test_oversized_batch_is_split_and_limit_shrinks(self):
+        calls = []
+        lock = threading.Lock()
+
+        def embed(documents):
+            with lock:
+                calls.append(len(documents))
+            if len(documents) > 2:
+                raise _APIError("This model's maximum context length is 8192 tokens", 400)
+            return self._embed(documents)
+
+        scheduler = EmbeddingScheduler(embed, max_batch_size=8, max_concurrency=1)
+        ids = [row_id for batch_ids, _ in scheduler.run(['doc'] * 8, range(8)) for row_id in batch_ids]
+        self.assertEqual(sorted(ids), list(range(8)))
+        self.assertEqual(calls[0], 8)
+        self.assertLess(scheduler.batch_limit, 8)
+
+    def test_non_retryable_errors_propagate(self):
+        def embed(documents):
+            raise _APIError("invalid api key", 401)
+
+        scheduler = EmbeddingScheduler(embed)
+        with self.assertRaises(_APIError):
+            list(scheduler.run(['doc'], [1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
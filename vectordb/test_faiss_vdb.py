@@ -0,0 +1,169 @@
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+from code_RAG.vectordb import faiss_vdb
+from code_RAG.vectordb.faiss_vdb import FaissDBHandle
+
+
+class TestFaissDBHandle(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.db_handle = FaissDBHandle(data_dir=self.tmp_dir.name, dimensions=8)
+        rng = np.random.default_rng(0)
+        self.vectors = rng.random((300, 8), dtype=np.float32)
+        self.ids = list(range(1000, 1300))
+        self.db_handle.create_collection('test_collection')
+        self.db_handle.insert_vectors('test_collection', self.vectors, self.ids)
+
+    def test_create_and_list_collections(self):
+        self.assertTrue(self.db_handle.collection_exists('test_collection'))
+        self.assertEqual(self.db_handle.list_collections(), ['test_collection'])
+        self.db_handle.drop_collection('test_collection')
+        self.assertFalse(self.db_handle.collection_exists('test_collection'))
+
+    def test_count_and_delete_vectors(self):
+        self.assertEqual(self.db_handle.count_vectors('test_collection'), 300)
+        self.db_handle.delete_vectors('test_collection', [1000, 1001])
+        self.assertEqual(self.db_handle.count_vectors('test_collection'), 298)
+
+    def test_search_vectors_returns_exact_neighbour(self):
+        results = self.db_handle.search_vectors('test_collection', self.vectors[42], 3, 'L2', {})
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0][0].id, 1042)
+        self.assertAlmostEqual(results[0][0].distance, 0.0, places=4)
+
+    def test_hybrid_search_prunes_with_filter(self):
+        results = self.db_handle.hybrid_search('test_collection', self.vectors[42], 'id > 1100 && id < 1110', 20, 'IP', {})
+        self.assertEqual(len(results[0]), 9)
+        self.assertTrue(all(1100 < hit.id < 1110 for hit in results[0]))
+
+    def test_search_many_aligns_results_with_queries(self):
+        filters = [None, 'id >= 1200', None]
+        results = self.db_handle.hybrid_search_many('test_collection', self.vectors[[3, 4, 250]], filters, 1, 'L2', {},
+                                                    max_nq=1)
+        self.assertEqual([results[0][0].id, results[2][0].id], [1003, 1250])
+        self.assertGreaterEqual(results[1][0].id, 1200)
+
+    def test_persisted_collection_reloads_memory_mapped(self):
+        reopened = FaissDBHandle(data_dir=self.tmp_dir.name, dimensions=8)
+        self.assertEqual(reopened.count_vectors('test_collection'), 300)
+        self.assertIsInstance(reopened._load('test_collection')['vectors'], np.memmap)
+
+    def test_numpy_fallback_without_faiss(self):
+        with patch.object(faiss_vdb, 'faiss', None):
+            self.db_handle.create_index('test_collection', 'vector_field', {'index_type': 'HNSW', 'metric_type': 'L2'})
+            results = self.db_handle.search_vectors('test_collection', self.vectors[7], 1, 'L2', {})
+        self.assertEqual(results[0][0].id, 1007)
+
+    def test_hybrid_search_filters_on_scalar_fields(self):
+        self.db_handle.create_collection('chunks')
+        metadata = [{'extension': '.py' if i % 2 else '.md', 'file_path': f"src/{i}.py" if i < 100 else f"docs/{i}"}
+                    for i in range(300)]
+        self.db_handle.insert_vectors('chunks', self.vectors, self.ids, metadata=metadata)
+        self.db_handle.insert_vectors('chunks', self.vectors[:1], [9999])
+        results = self.db_handle.hybrid_search('chunks', self.vectors[42], 'extension in [".py"] && file_path like "src/%"',
+                                               100, 'L2', {})
+        self.assertEqual(sorted(hit.id for hit in results[0]), [1000 + i for i in range(1, 100, 2)])
+        self.db_handle.delete_vectors('chunks', [1001])
+        reopened = FaissDBHandle(data_dir=self.tmp_dir.name, dimensions=8)
+        results = reopened.hybrid_search('chunks', self.vectors[3], 'extension == ".py" && id < 1004', 10, 'L2', {})
+        self.assertEqual([hit.id for hit in results[0]], [1003])
+
+    def test_output_fields_are_returned_as_hit_entities(self):
+        self.db_handle.create_collection('chunks')
+        metadata = [{'file_path': f"src/{i}.py", 'text': f"chunk {i}"} for i in range(300)]
+        self.db_handle.insert_vectors('chunks', self.vectors, self.ids, metadata=metadata)
+        hit = self.db_handle.search_vectors('chunks', self.vectors[42], 1, 'L2', {}, output_fields=['text'])[0][0]
+        self.assertEqual((hit.id, hit.entity), (1042, {'text': 'chunk 42'}))
+        hit = self.db_handle.hybrid_search('chunks', self.vectors[42], 'id > 1100', 1, 'L2', {},
+                                           output_fields=['file_path', 'text'])[0][0]
+        self.assertEqual(hit.entity.get('file_path'), f"src/{hit.id - 1000}.py")
+        self.assertEqual(hit.entity.get('text'), f"chunk {hit.id - 1000}")
+        self.assertEqual(self.db_handle.search_vectors('chunks', self.vectors[0], 1, 'L2', {})[0][0].entity, {})
+
+    def test_filter_expressions_are_parsed_not_executed(self):
+        rows = [{'lines': 20, 'file_name': 'c.py'}, {'lines': 5, 'file_name': 'a.py'},
+                {'lines': 5, 'file_name': 'c.py'}, {'file_name': 'c.py'}]
+        mask = faiss_vdb.parse_filter('not (lines > -1 && lines <= 10) || file_name in ["a.py", "b.py"]')
+        self.assertEqual(mask(faiss_vdb.field_columns(rows), 4).tolist(), [True, True, False, False])
+        mask = faiss_vdb.parse_filter('file_name like "%.py" && file_name not in ["a.py"] && file_name like "c%"')
+        self.assertEqual(mask(faiss_vdb.field_columns(rows), 4).tolist(), [True, False, True, True])
+        for expression in ('__import__("os").system("true")', 'id.__class__ == 1', '(lambda: 1)() == 1',
+                           '[x for x in id] == []', 'id like file_name', 'id > ', '_like == 1', 'id in file_name'):
+            with self.assertRaises(ValueError):
+                self.db_handle.hybrid_search('test_collection', self.vectors[0], expression, 1, 'L2', {})
+
+    def test_filters_are_evaluated_as_column_masks(self):
+        self.db_handle.create_collection('chunks')
+        metadata = [{'githubrepo': f"o/r{i % 3}", 'lines': i} for i in range(300)]
+        self.db_handle.insert_vectors('chunks', self.vectors, self.ids, metadata=metadata)
+        with patch.object(faiss_vdb, 'field_columns', wraps=faiss_vdb.field_columns) as mock_field_columns:
+            for _ in range(3):
+                results = self.db_handle.hybrid_search('chunks', self.vectors[42], 'githubrepo == "o/r0" && lines < 10',
+                                                       10, 'L2', {})
+        # The columns are built once and reused until the next write.
+        mock_field_columns.assert_called_once()
+        self.assertEqual(sorted(hit.id for hit in results[0]), [1000, 1003, 1006, 1009])
+
+    @unittest.skipIf(faiss_vdb.faiss is None, "faiss is not installed")
+    def test_faiss_indexes(self):
+        for index_params in ({'index_type': 'IVF_FLAT', 'metric_type': 'L2', 'params': {'nlist': 4}},
+                             {'index_type': 'HNSW', 'metric_type': 'COSINE', 'params': {'M': 8}},
+                             {'index_type': 'IVF_SQ8', 'metric_type': 'L2', 'params': {'nlist': 4}}):
+            self.db_handle.create_index('test_collection', 'vector_field', index_params)
+            self.db_handle.insert_vectors('test_collection', self.vectors[:1] + 10, [5000])
+            results = self.db_handle.search_vectors('test_collection', self.vectors[42], 1, index_params['metric_type'],
+                                                    {'params': {'nprobe': 4, 'ef': 64}})
+            self.assertEqual(results[0][0].id, 1042)
+            reopened = FaissDBHandle(data_dir=self.tmp_dir.name, dimensions=8)
+            self.assertEqual(reopened.get_collection_stats('test_collection')['backend'], 'faiss')
+            self.db_handle.delete_vectors('test_collection', [5000])
+
+
+    @unittest.skipIf(faiss_vdb.faiss is None, "faiss is not installed")
+    def test_ivf_pq_falls_back_to_exact_search_until_trainable(self):
+        index_params = {'index_type': 'IVF_PQ', 'metric_type': 'L2', 'params': {'nlist': 4, 'm': 4, 'nbits': 8}}
+        self.db_handle.create_collection('pq')
+        self.db_handle.insert_vectors('pq', self.vectors[:200], self.ids[:200])
+        self.db_handle.create_index('pq', 'vector_field', index_params)
+        self.assertIsInstance(self.db_handle._load('pq')['index'], faiss_vdb.faiss.IndexFlat)
+        self.db_handle.insert_vectors('pq', self.vectors[200:], self.ids[200:])
+        self.db_handle.create_index('pq', 'vector_field', index_params)
+        self.assertEqual(faiss_vdb.faiss.extract_index_ivf(self.db_handle._load('pq')['index']).nlist, 4)
+        results = self.db_handle.search_vectors('pq', self.vectors[42], 10, 'L2', {'params': {'nprobe': 4}})
+        self.assertIn(1042, [hit.id for hit in results[0]])
+
+    @unittest.skipIf(faiss_vdb.faiss is None, "faiss is not installed")
+    def test_inserts_defer_index_writes_until_flush(self):
+        index_file = self.db_handle._path('test_collection', 'index.faiss')
+        self.db_handle.create_index('test_collection', 'vector_field', {'index_type': 'FLAT', 'metric_type': 'L2'})
+        with patch.object(faiss_vdb.faiss, 'write_index') as mock_write_index:
+            for i in range(5):
+                self.db_handle.insert_vectors('test_collection', self.vectors[i:i + 1] + 10, [5000 + i])
+        mock_write_index.assert_not_called()
+        self.assertEqual(self.db_handle._load('test_collection')['index'].ntotal, 305)
+        # Rows appended after the last write are added back on reopen.
+        reopened = FaissDBHandle(data_dir=self.tmp_dir.name, dimensions=8)
+        self.assertEqual(reopened._load('test_collection')['index'].ntotal, 305)
+        self.assertEqual(faiss_vdb.faiss.read_index(index_file).ntotal, 300)
+        self.db_handle.flush('test_collection')
+        self.assertEqual(faiss_vdb.faiss.read_index(index_file).ntotal, 305)
+
+    @unittest.skipIf(faiss_vdb.faiss is None, "faiss is not installed")
+    def test_fallback_index_is_trained_once_enough_vectors_arrive(self):
+        index_params = {'index_type': 'IVF_PQ', 'metric_type': 'L2', 'params': {'nlist': 4, 'm': 4, 'nbits': 8}}
+        self.db_handle.create_collection('pq')
+        self.db_handle.insert_vectors('pq', self.vectors[:200], self.ids[:200])
+        self.db_handle.create_index('pq', 'vector_field', index_params)
+        self.db_handle.insert_vectors('pq', self.vectors[200:250], self.ids[200:250])
+        self.assertIsInstance(self.db_handle._load('pq')['index'], faiss_vdb.faiss.IndexFlat)
+        self.db_handle.insert_vectors('pq', self.vectors[250:], self.ids[250:])
+        index = self.db_handle._load('pq')['index']
+        self.assertEqual(faiss_vdb.faiss.extract_index_ivf(index).nlist, 4)
+        self.assertEqual(index.ntotal, 300)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
+import numpy as np
 from pymilvus import CollectionSchema, FieldSchema, DataType
+from code_RAG.vectordb.code_schema import SCALAR_INDEXES
 from code_RAG.vectordb.milvusdb_handle import MilvusDBHandle
 
 class TestMilvusDBHandle(unittest.TestCase):
@@ -10,6 +14,13 @@ class TestMilvusDBHandle(unittest.TestCase):
         self.db_handle = MilvusDBHandle()
         mock_connect.assert_called_once_with("default", host="localhost", port="19530")
 
+    @patch('code_RAG.vectordb.milvusdb_handle.get_rate_limiter')
+    @patch('code_RAG.vectordb.milvusdb_handle.connections.connect')
+    def test_configured_rate_limit_reaches_openai_limiter(self, mock_connect, mock_get_rate_limiter):
+        db_handle = MilvusDBHandle(rate_limit={'rate': 5, 'capacity': 10})
+        mock_get_rate_limiter.assert_called_once_with('openai', rate=5, capacity=10)
+        self.assertIs(db_handle.rate_limiter, mock_get_rate_limiter.return_value)
+
     @patch('code_RAG.vectordb.milvusdb_handle.Collection')
     def test_define_schema(self, mock_collection):
         fields = [{'name': 'field1', 'dtype': DataType.INT64, 'is_primary': True}]
@@ -58,6 +69,93 @@ class TestMilvusDBHandle(unittest.TestCase):
         self.db_handle.insert_vectors('test_collection', [[1, 2, 3]], [1])
         collection.insert.assert_called_once_with([[1], [[1, 2, 3]]])
 
+    @patch('code_RAG.vectordb.milvusdb_handle.Collection')
+    def test_insert_vectors_with_metadata(self, mock_collection):
+        collection = MagicMock()
+        mock_collection.return_value = collection
+        self.db_handle.insert_vectors('test_collection', [[1, 2, 3]], [1], metadata=[{'extension': '.py'}])
+        collection.insert.assert_called_once_with([{'id': 1, 'vector_field': [1, 2, 3], 'extension': '.py'}])
+
+    @patch('code_RAG.vectordb.milvusdb_handle.Collection')
+    def test_create_code_collection(self, mock_collection):
+        self.db_handle.create_code_collection('chunks', dimensions=8, num_partitions=16)
+        schema = mock_collection.call_args.kwargs['schema']
+        self.assertEqual(mock_collection.call_args.kwargs['num_partitions'], 16)
+        fields = {field.name: field for field in schema.fields}
+        self.assertEqual(fields['vector_field'].params['dim'], 8)
+        self.assertTrue(fields['githubrepo'].is_partition_key)
+        self.assertEqual(fields['extension'].params['max_length'], 32)
+        self.assertEqual(fields['text'].params['max_length'], 65535)
+        indexed = [call.args[0] for call in mock_collection.return_value.create_index.call_args_list]
+        self.assertEqual(sorted(indexed), sorted(SCALAR_INDEXES))
+
+    @patch('code_RAG.vectordb.milvusdb_handle.Collection')
+    def test_create_code_collection_with_compression(self, mock_collection):
+        self.db_handle.create_code_collection('chunks', dimensions=8, compression='float16', num_vectors=10000)
+        fields = {field.name: field for field in mock_collection.call_args.kwargs['schema'].fields}
+        self.assertEqual(fields['vector_field'].dtype, DataType.FLOAT16_VECTOR)
+        collection = mock_collection.return_value
+        collection.create_index.assert_called_with('vector_field', {'index_type': 'IVF_FLAT', 'metric_type': 'IP',
+                                                                    'params': {'nlist': 400}})
+        self.db_handle.insert_vectors('chunks', [[0.5] * 8], [1])
+        self.db_handle.search_vectors('chunks', [0.5] * 8, 10, 'IP', {})
+        inserted = collection.insert.call_args.args[0][1][0]
+        searched = collection.search.call_args.args[0][0]
+        self.assertEqual(inserted.dtype, np.float16)
+        self.assertEqual(searched.dtype, np.float16)
+
+    @patch('code_RAG.vectordb.milvusdb_handle.Collection')
+    def test_collection_handle_is_cached(self, mock_collection):
+        self.db_handle.insert_vectors('test_collection', [[1, 2, 3]], [1])
+        self.db_handle.count_vectors('test_collection')
+        self.db_handle.search_vectors('test_collection', [1, 2, 3], 10, 'L2', {})
+        mock_collection.assert_called_once_with(name='test_collection')
+        self.db_handle.drop_collection('test_collection')
+        self.db_handle.count_vectors('test_collection')
+        self.assertEqual(mock_collection.call_count, 2)
+
+    @patch('code_RAG.vectordb.milvusdb_handle.Collection')
+    def test_bulk_insert_batches_and_flushes_once(self, mock_collection):
+        collection = MagicMock()
+        mock_collection.return_value = collection
+        vectors = ([float(i)] * 4 for i in range(25))
+        stats = self.db_handle.bulk_insert('test_collection', vectors, range(25), batch_size=10, max_in_flight=2,
+                                           index_field='vector_field', index_params={'index_type': 'FLAT'})
+        self.assertEqual(stats['rows'], 25)
+        batch_sizes = [len(call.args[0][0]) for call in collection.insert.call_args_list]
+        self.assertEqual(batch_sizes, [10, 10, 5])
+        self.assertTrue(all(call.kwargs == {'_async': True} for call in collection.insert.call_args_list))
+        collection.flush.assert_called_once()
+        collection.create_index.assert_called_once_with('vector_field', {'index_type': 'FLAT'})
+
+    def test_batches_respect_byte_limit(self):
+        batches = list(self.db_handle._batches([[0.0] * 4] * 5, range(5), batch_size=100, max_batch_bytes=50))
+        self.assertEqual([len(batch_ids) for batch_ids, _, _ in batches], [2, 2, 1])
+        self.assertEqual({batch_metadata for _, _, batch_metadata in batches}, {None})
+
+    @patch('code_RAG.vectordb.milvusdb_handle.Collection')
+    def test_bulk_insert_sends_scalar_fields_as_columns(self, mock_collection):
+        collection = MagicMock()
+        collection.schema = self.db_handle.define_schema([
+            {'name': 'id', 'dtype': DataType.INT64, 'is_primary': True},
+            {'name': 'vector_field', 'dtype': DataType.FLOAT_VECTOR, 'dim': 4},
+            {'name': 'githubrepo', 'dtype': DataType.VARCHAR, 'max_length': 256},
+            {'name': 'lines', 'dtype': DataType.INT64}])
+
+        def insert(data, _async=False):
+            # pymilvus inserts row dicts synchronously and returns a MutationResult, which has no result().
+            self.assertTrue(_async and all(isinstance(column, list) for column in data))
+            return MagicMock()
+
+        collection.insert.side_effect = insert
+        mock_collection.return_value = collection
+        metadata = ({'githubrepo': 'acme/api', 'lines': i} for i in range(3))
+        stats = self.db_handle.bulk_insert('test_collection', ([float(i)] * 4 for i in range(3)), range(3),
+                                           batch_size=2, metadata=metadata)
+        self.assertEqual(stats['rows'], 3)
+        self.assertEqual(collection.insert.call_args_list[1].args[0], [[2], [[2.0] * 4], ['acme/api'], [2]])
+        self.assertEqual([len(call.args[0][0]) for call in collection.insert.call_args_list], [2, 1])
+
     @patch('code_RAG.vectordb.milvusdb_handle.Collection')
     def test_delete_vectors(self, mock_collection):
         collection = MagicMock()
@@ -97,6 +195,25 @@ class TestMilvusDBHandle(unittest.TestCase):
         collection.search.assert_called_once_with([[1, 2, 3]], 'vector_field', {'metric_type': 'L2', 'param': 'value'}, 10, expr='id > 0')
         self.assertEqual(results, 'hybrid_search_results')
 
+    @patch('code_RAG.vectordb.milvusdb_handle.Collection')
+    def test_search_many_splits_into_server_sized_requests(self, mock_collection):
+        collection = MagicMock()
+        mock_collection.return_value = collection
+        collection.search.side_effect = lambda vectors, *args, **kwargs: [f"hits-{v[0]}" for v in vectors]
+        results = self.db_handle.search_many('test_collection', [[i] for i in range(5)], 10, 'L2', {}, max_nq=2)
+        self.assertEqual(results, [f"hits-{i}" for i in range(5)])
+        self.assertEqual(collection.search.call_count, 3)
+
+    @patch('code_RAG.vectordb.milvusdb_handle.Collection')
+    def test_hybrid_search_many_groups_by_filter(self, mock_collection):
+        collection = MagicMock()
+        mock_collection.return_value = collection
+        collection.search.side_effect = lambda vectors, *args, **kwargs: [(v[0], kwargs.get('expr')) for v in vectors]
+        filters = ['id > 0', None, 'id > 0', 'id < 5']
+        results = self.db_handle.hybrid_search_many('test_collection', [[i] for i in range(4)], filters, 10, 'L2', {})
+        self.assertEqual(results, [(0, 'id > 0'), (1, None), (2, 'id > 0'), (3, 'id < 5')])
+        self.assertEqual(collection.search.call_count, 3)
+
     @patch('code_RAG.vectordb.milvusdb_handle.Collection')
     def test_get_collection_stats(self, mock_collection):
         collection = MagicMock()
@@ -117,7 +234,8 @@ class TestMilvusDBHandle(unittest.TestCase):
     def test_create_openai_embedding_function(self, mock_openai_embedding_function):
         self.db_handle.openai_api_key = 'test_key'
         openai_ef = self.db_handle.create_openai_embedding_function()
-        mock_openai_embedding_function.assert_called_once_with(api_key='test_key', model_name='text-embedding-3-large')
+        mock_openai_embedding_function.assert_called_once_with(api_key='test_key', model_name='text-embedding-3-large',
+                                                               dimensions=512)
         self.assertEqual(openai_ef, mock_openai_embedding_function.return_value)
 
     @patch('code_RAG.vectordb.milvusdb_handle.OpenAIEmbeddingFunction')
@@ -127,6 +245,17 @@ class TestMilvusDBHandle(unittest.TestCase):
         embeddings = self.db_handle.create_embeddings(['doc1', 'doc2'])
         self.assertEqual(embeddings, 'embeddings')
 
+    def test_create_embeddings_only_embeds_cache_misses(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.db_handle.enable_embedding_cache(os.path.join(tmp_dir.name, 'embeddings.sqlite'))
+        self.db_handle.openai_ef = MagicMock()
+        self.db_handle.openai_ef.encode_documents.side_effect = lambda docs: [[float(len(doc))] * 2 for doc in docs]
+        self.assertEqual(self.db_handle.create_embeddings(['a', 'bb', 'a']), [[1.0, 1.0], [2.0, 2.0], [1.0, 1.0]])
+        self.db_handle.openai_ef.encode_documents.assert_called_once_with(['a', 'bb'])
+        self.assertEqual(self.db_handle.create_embeddings(['ccc', 'bb']), [[3.0, 3.0], [2.0, 2.0]])
+        self.db_handle.openai_ef.encode_documents.assert_called_with(['ccc'])
+
     @patch('code_RAG.vectordb.milvusdb_handle.MilvusDBHandle.insert_vectors')
     @patch('code_RAG.vectordb.milvusdb_handle.MilvusDBHandle.create_embeddings')
     def test_insert_documents_with_embeddings(self, mock_create_embeddings, mock_insert_vectors):
@@ -135,6 +264,24 @@ class TestMilvusDBHandle(unittest.TestCase):
         mock_create_embeddings.assert_called_once_with(['doc1', 'doc2'])
         mock_insert_vectors.assert_called_once_with('test_collection', 'embeddings', [1, 2])
 
+    def test_embedding_scheduler_calls_fail_fast_on_429(self):
+        error = Exception('rate limited')
+        error.status_code = 429
+        self.db_handle.openai_ef = MagicMock()
+        self.db_handle.openai_ef.encode_documents.side_effect = error
+        scheduler = self.db_handle.create_embedding_scheduler()
+        with self.assertRaises(Exception):
+            scheduler.embed_fn(['doc1'])
+        self.db_handle.openai_ef.encode_documents.assert_called_once_with(['doc1'])
+
+    @patch('code_RAG.vectordb.milvusdb_handle.MilvusDBHandle.insert_vectors')
+    def test_insert_documents_with_embedding_scheduler(self, mock_insert_vectors):
+        scheduler = MagicMock()
+        scheduler.run.return_value = iter([([1], ['e1']), ([2], ['e2'])])
+        self.db_handle.insert_documents_with_embeddings('test_collection', ['doc1', 'doc2'], [1, 2], scheduler=scheduler)
+        self.assertEqual(mock_insert_vectors.call_count, 2)
+        mock_insert_vectors.assert_called_with('test_collection', ['e2'], [2])
+
     @patch('code_RAG.vectordb.milvusdb_handle.BGERerankFunction')
     def test_create_reranker(self, mock_bge_rerank_function):
         reranker = self.db_handle.create_reranker()
@@ -148,5 +295,33 @@ class TestMilvusDBHandle(unittest.TestCase):
         results = self.db_handle.rerank_results('query', 'results')
         self.assertEqual(results, 'reranked_results')
 
+    @patch('code_RAG.vectordb.milvusdb_handle.BGERerankFunction')
+    def test_rerank_stage_caps_candidates(self, mock_bge_rerank_function):
+        self.db_handle.create_reranker(max_candidates=2)
+        mock_bge_rerank_function.return_value.rerank.side_effect = lambda query, documents, top_k: [
+            MagicMock(index=index, score=float(index)) for index in range(len(documents))]
+        results = self.db_handle.rerank_results('query', ['a', 'b', 'c'], top_k=1)
+        self.assertEqual([(result.text, result.score) for result in results], [('b', 1.0)])
+        mock_bge_rerank_function.return_value.rerank.assert_called_once_with('query', ['a', 'b'], top_k=2)
+
+    @patch('code_RAG.vectordb.milvusdb_handle.Collection')
+    def test_search_text_serves_repeated_queries_from_cache(self, mock_collection):
+        mock_collection.return_value.search.return_value = 'results'
+        self.db_handle.openai_ef = MagicMock()
+        self.db_handle.openai_ef.encode_queries.side_effect = lambda queries: [[1.0, 0.0] if 'yaml' in queries[0]
+                                                                               else [0.0, 1.0]]
+        self.db_handle.enable_query_cache(similarity_threshold=0.9)
+        postprocess = MagicMock(side_effect=lambda query, results: f"reranked {results}")
+        search = lambda query: self.db_handle.search_text('c', query, 5, 'IP', {}, postprocess=postprocess)
+        self.assertEqual(search('parse yaml'), 'reranked results')
+        self.assertEqual(search('Parse  YAML'), 'reranked results')
+        self.assertEqual(self.db_handle.openai_ef.encode_queries.call_count, 1)
+        self.assertEqual(search('parse a yaml file'), 'reranked results')
+        self.assertEqual(mock_collection.return_value.search.call_count, 1)
+        self.assertEqual(postprocess.call_count, 1)
+        self.db_handle.insert_vectors('c', [[1.0, 0.0]], [1])
+        search('parse yaml')
+        self.assertEqual(mock_collection.return_value.search.call_count, 2)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
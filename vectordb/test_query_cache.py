@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import patch
+from code_RAG.vectordb.query_cache import QueryCache
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = QueryCache(max_entries=2, ttl=60, similarity_threshold=0.9)
+
+    def test_exact_level_normalizes_query_text(self):
+        self.cache.put('c', 'How do I  parse YAML?', ['r'], filters='x', top_k=5)
+        self.assertEqual(self.cache.get('c', 'how do i parse yaml?', 'x', 5), ['r'])
+        self.assertIsNone(self.cache.get('c', 'how do i parse yaml?', 'y', 5))
+        self.assertIsNone(self.cache.get('c', 'how do i parse yaml?', 'x', 10))
+
+    def test_semantic_level_uses_cosine_threshold(self):
+        self.cache.put('c', 'parse yaml', ['r'], top_k=5, embedding=[1.0, 0.0])
+        self.assertEqual(self.cache.get_similar('c', [0.95, 0.1], top_k=5), ['r'])
+        self.assertIsNone(self.cache.get_similar('c', [0.5, 0.5], top_k=5))
+        self.assertIsNone(self.cache.get_similar('other', [1.0, 0.0], top_k=5))
+
+    def test_lru_eviction_and_ttl(self):
+        with patch('code_RAG.vectordb.query_cache.time.monotonic', return_value=0):
+            self.cache.put('c', 'a', [1], embedding=[1.0, 0.0])
+            self.cache.put('c', 'b', [2])
+            self.cache.get('c', 'a')
+            self.cache.put('c', 'c', [3])
+            self.assertIsNone(self.cache.get('c', 'b'))
+            self.assertEqual(self.cache.get('c', 'a'), [1])
+        with patch('code_RAG.vectordb.query_cache.time.monotonic', return_value=61):
+            self.assertIsNone(self.cache.get('c', 'a'))
+            self.assertIsNone(self.cache.get_similar('c', [1.0, 0.0]))
+        self.assertEqual(len(self.cache), 1)
+
+    def test_invalidate_collection(self):
+        self.cache.put('c', 'a', [1], embedding=[1.0, 0.0])
+        self.cache.put('d', 'a', [2])
+        self.cache.invalidate('c')
+        self.assertIsNone(self.cache.get('c', 'a'))
+        self.assertIsNone(self.cache.get_similar('c', [1.0, 0.0]))
+        self.assertEqual(self.cache.get('d', 'a'), [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import numpy as np
+from code_RAG.vectordb import reranker
+from code_RAG.vectordb.reranker import ONNXCrossEncoder, RerankStage, bge_scorer
+
+
+class TestRerankStage(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def scorer(query, documents):
+            self.calls.append(list(documents))
+            return [float(len(document)) for document in documents]
+
+        self.stage = RerankStage(scorer, max_candidates=3, cache_size=10)
+
+    def test_caps_candidates_and_sorts_by_score(self):
+        results = self.stage.rerank('q', ['a', 'abcd', 'ab', 'abcdefgh'], top_k=2)
+        self.assertEqual(self.calls, [['a', 'abcd', 'ab']])
+        self.assertEqual([(result.text, result.index) for result in results], [('abcd', 1), ('ab', 2)])
+
+    def test_cached_pairs_are_not_rescored(self):
+        self.stage.rerank('q', ['a', 'ab'])
+        self.stage.rerank('q', ['ab', 'abc'])
+        self.stage.rerank('other', ['ab'])
+        self.assertEqual(self.calls, [['a', 'ab'], ['abc'], ['ab']])
+
+    def test_bge_scorer_maps_scores_back_to_input_order(self):
+        bge = MagicMock()
+        bge.rerank.return_value = [SimpleNamespace(index=1, score=0.9), SimpleNamespace(index=0, score=0.1)]
+        self.assertEqual(bge_scorer(bge)('q', ['x', 'y']), [0.1, 0.9])
+        bge.rerank.assert_called_once_with('q', ['x', 'y'], top_k=2)
+
+
+class TestONNXCrossEncoder(unittest.TestCase):
+
+    def test_scores_length_sorted_batches(self):
+        runtime = MagicMock()
+        runtime.InferenceSession.return_value.get_inputs.return_value = [SimpleNamespace(name='input_ids')]
+        runtime.InferenceSession.return_value.run.side_effect = lambda _, feeds: [feeds['input_ids'][:, :1] * 1.0]
+        tokenizer = MagicMock(side_effect=lambda queries, documents, **kwargs: {
+            'input_ids': np.array([[len(document)] for document in documents])})
+        # A stand-in module, so the optional transformers package is never imported.
+        transformers = SimpleNamespace(AutoTokenizer=SimpleNamespace(from_pretrained=lambda path: tokenizer))
+        with patch.object(reranker, 'onnxruntime', runtime), patch.dict(sys.modules, {'transformers': transformers}):
+            encoder = ONNXCrossEncoder('/models/reranker.onnx', batch_size=2, normalize=False)
+            scores = encoder('q', ['aaa', 'a', 'aa'])
+        self.assertEqual(scores, [3.0, 1.0, 2.0])
+        batches = [list(call.args[1]) for call in tokenizer.call_args_list]
+        self.assertEqual(batches, [['a', 'aa'], ['aaa']])
+
+
+if __name__ == '__main__':
+    unittest.main()